@@ -1,11 +1,46 @@
-from fastapi import APIRouter
-from app.models import ChatRequest, ChatResponse
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models import ChatRequest, ChatResponse, SearchRequest, SearchResponse
 from app.services.chat_service import ChatService
+from app.database import get_db
+from app.services.admission_service import chat_admission
+from app.services.message_logger import message_logger
+import uuid
 
 router = APIRouter()
 chat_service = ChatService()
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    response_data = chat_service.get_random_response(request.message)
-    return ChatResponse(**response_data)
\ No newline at end of file
+@router.post("/chat", response_model=ChatResponse, dependencies=[Depends(chat_admission)])
+async def chat(request: ChatRequest, db: AsyncSession = Depends(get_db)):
+    session_id = request.session_id or str(uuid.uuid4())
+    kb_ids = request.target_knowledge_bases()
+    if len(kb_ids) > settings.federated_max_knowledge_bases:
+        raise HTTPException(status_code=400, detail=f"一次最多检索{settings.federated_max_knowledge_bases}个知识库")
+    context = []
+    if kb_ids:
+        context = await chat_service.retrieve_context(db, request.message, kb_ids, request.filters)
+    if context:
+        response_data = chat_service.get_context_response(context)
+    else:
+        response_data = chat_service.get_random_response(request.message)
+    
+    # 聊天记录由后台批量写入，不占用请求耗时
+    message_logger.log_turn(session_id, request.message, response_data, kb_ids[0] if kb_ids else None, context)
+    return ChatResponse(**response_data, session_id=session_id)
+
+@router.post("/search", response_model=SearchResponse, dependencies=[Depends(chat_admission)])
+async def search(request: SearchRequest, db: AsyncSession = Depends(get_db)):
+    """跨知识库检索，超时或未就绪的知识库被跳过并在 skipped_knowledge_bases 中返回"""
+    kb_ids = list(dict.fromkeys(request.knowledge_base_ids))
+    if not kb_ids:
+        raise HTTPException(status_code=400, detail="至少指定一个知识库")
+    if len(kb_ids) > settings.federated_max_knowledge_bases:
+        raise HTTPException(status_code=400, detail=f"一次最多检索{settings.federated_max_knowledge_bases}个知识库")
+    results, skipped = await chat_service.search(db, request.query, kb_ids, request.filters, request.top_k)
+    return SearchResponse(results=results, skipped_knowledge_bases=skipped)
+
+@router.get("/chat/stats")
+async def chat_stats():
+    """聊天链路运行统计（查询向量化批处理、重排缓存、跨知识库检索、聊天记录写入等）"""
+    return {**chat_service.get_stats(), "message_log": message_logger.stats}
\ No newline at end of file
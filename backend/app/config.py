@@ -16,18 +16,74 @@ class Settings:
     max_file_size: int = int(os.getenv("MAX_FILE_SIZE", "10485760"))  # 10MB
     allowed_extensions: list = [".pdf", ".doc", ".docx", ".txt", ".md", ".html"]
     
+    # 文档处理配置
+    chunk_size: int = int(os.getenv("CHUNK_SIZE", "1000"))
+    chunk_overlap: int = int(os.getenv("CHUNK_OVERLAP", "200"))
+    ingestion_embed_batch_size: int = int(os.getenv("INGESTION_EMBED_BATCH_SIZE", "64"))
+    ingestion_max_concurrency: int = int(os.getenv("INGESTION_MAX_CONCURRENCY", "2"))  # 后台文档处理并发上限，与导入接口准入分开
+    progress_write_interval_ms: int = int(os.getenv("PROGRESS_WRITE_INTERVAL_MS", "2000"))
+    document_processing_timeout_seconds: int = int(os.getenv("DOCUMENT_PROCESSING_TIMEOUT_SECONDS", "1800"))  # 超时无进度的处理中文档可重新认领
+    
     # API配置
     api_host: str = os.getenv("API_HOST", "0.0.0.0")
     api_port: int = int(os.getenv("API_PORT", "8000"))
     debug: bool = os.getenv("DEBUG", "True").lower() == "true"
     
+    # 启动配置
+    api_modules: list = os.getenv("API_MODULES", "chat,knowledge").split(",")  # 只挂载列出的路由模块，如仅聊天: chat
+    migrate_on_startup: bool = os.getenv("MIGRATE_ON_STARTUP", "False").lower() == "true"
+    preload_models: bool = os.getenv("PRELOAD_MODELS", "False").lower() == "true"
+    
     # AI配置
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
     embedding_model: str = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
     
+    # 检索配置
+    retrieval_top_k: int = int(os.getenv("RETRIEVAL_TOP_K", "20"))
+    embedding_batch_max_size: int = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+    embedding_batch_max_wait_ms: float = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+    quantization_rescore_factor: int = int(os.getenv("QUANTIZATION_RESCORE_FACTOR", "4"))
+    filter_index_refresh_seconds: int = int(os.getenv("FILTER_INDEX_REFRESH_SECONDS", "300"))
+    federated_max_knowledge_bases: int = int(os.getenv("FEDERATED_MAX_KNOWLEDGE_BASES", "8"))
+    federated_search_timeout_ms: float = float(os.getenv("FEDERATED_SEARCH_TIMEOUT_MS", "500"))
+    federated_min_score: float = float(os.getenv("FEDERATED_MIN_SCORE", "0.0"))  # 合并结果的余弦相似度下限
+    
+    # 文档块内容缓存配置
+    chunk_cache_max_bytes: int = int(os.getenv("CHUNK_CACHE_MAX_BYTES", "67108864"))  # 64MB
+    chunk_cache_disk_enabled: bool = os.getenv("CHUNK_CACHE_DISK_ENABLED", "True").lower() == "true"
+    chunk_cache_disk_max_bytes: int = int(os.getenv("CHUNK_CACHE_DISK_MAX_BYTES", "1073741824"))  # 1GB，0 表示不限制
+    chunk_cache_dict_samples: int = int(os.getenv("CHUNK_CACHE_DICT_SAMPLES", "2000"))
+    chunk_cache_dict_size: int = int(os.getenv("CHUNK_CACHE_DICT_SIZE", "65536"))
+    
+    # 重排配置
+    rerank_enabled: bool = os.getenv("RERANK_ENABLED", "False").lower() == "true"
+    rerank_model: str = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")  # 设为 "fake" 使用确定性打分器
+    rerank_top_n: int = int(os.getenv("RERANK_TOP_N", "5"))
+    rerank_timeout_ms: int = int(os.getenv("RERANK_TIMEOUT_MS", "150"))
+    rerank_cache_size: int = int(os.getenv("RERANK_CACHE_SIZE", "10000"))
+    rerank_max_workers: int = int(os.getenv("RERANK_MAX_WORKERS", "1"))
+    
     # 缓存配置
     redis_host: str = os.getenv("REDIS_HOST", "localhost")
     redis_port: int = int(os.getenv("REDIS_PORT", "6379"))
     redis_db: int = int(os.getenv("REDIS_DB", "0"))
+    
+    # 聊天记录配置
+    message_log_batch_size: int = int(os.getenv("MESSAGE_LOG_BATCH_SIZE", "200"))
+    message_log_flush_interval_ms: int = int(os.getenv("MESSAGE_LOG_FLUSH_INTERVAL_MS", "1000"))
+    message_log_max_buffer: int = int(os.getenv("MESSAGE_LOG_MAX_BUFFER", "20000"))
+    
+    # 准入控制配置
+    admission_backend: str = os.getenv("ADMISSION_BACKEND", "memory")  # memory 或 redis
+    rate_limit_chat_rps: float = float(os.getenv("RATE_LIMIT_CHAT_RPS", "5"))
+    rate_limit_chat_burst: float = float(os.getenv("RATE_LIMIT_CHAT_BURST", "20"))
+    rate_limit_ingest_rps: float = float(os.getenv("RATE_LIMIT_INGEST_RPS", "1"))
+    rate_limit_ingest_burst: float = float(os.getenv("RATE_LIMIT_INGEST_BURST", "10"))
+    rate_limit_kb_rps: float = float(os.getenv("RATE_LIMIT_KB_RPS", "50"))
+    rate_limit_kb_burst: float = float(os.getenv("RATE_LIMIT_KB_BURST", "100"))
+    admission_chat_concurrency: int = int(os.getenv("ADMISSION_CHAT_CONCURRENCY", "20"))
+    admission_ingest_concurrency: int = int(os.getenv("ADMISSION_INGEST_CONCURRENCY", "4"))
+    admission_queue_budget_ms: int = int(os.getenv("ADMISSION_QUEUE_BUDGET_MS", "500"))
+    admission_api_keys: list = [k for k in os.getenv("ADMISSION_API_KEYS", "").split(",") if k]  # 已登记的租户 API Key，未登记的 Key 按客户端地址限流
 
 settings = Settings()
\ No newline at end of file
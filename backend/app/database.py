@@ -52,9 +52,4 @@ async def test_connection():
             return result.scalar() == 1
     except Exception as e:
         print(f"数据库连接失败: {e}")
-        return False
-
-# 初始化数据库
-async def init_database():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+        return False
\ No newline at end of file
@@ -1,14 +1,22 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Form
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.database_models import ProcessingTask
 from ..services.document_service import DocumentService
-from ..schemas import DocumentResponse
+from ..services.ingestion_service import ingestion_pipeline
+from ..services.progress_service import progress_broker
+from ..schemas import DocumentResponse, ProcessingTaskResponse
 from app.database import get_db
 from app.config import settings
+from app.services.admission_service import ingest_admission
+import asyncio
+import json
 
 router = APIRouter()
 
-@router.post("/bases/{kb_id}/documents/upload", response_model=DocumentResponse)
+@router.post("/bases/{kb_id}/documents/upload", response_model=DocumentResponse, dependencies=[Depends(ingest_admission)])
 async def upload_document(
     kb_id: str, 
     file: UploadFile = File(...), 
@@ -85,16 +93,56 @@ async def delete_document(doc_id: str, db: AsyncSession = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail="删除文档失败")
 
-@router.post("/documents/{doc_id}/process")
+@router.post("/documents/{doc_id}/process", dependencies=[Depends(ingest_admission)])
 async def process_document(doc_id: str, db: AsyncSession = Depends(get_db)):
     """处理文档（RAG解析和向量化）"""
     try:
         doc_service = DocumentService(db)
         success = await doc_service.process_document(doc_id)
         if not success:
-            raise HTTPException(status_code=404, detail="文档不存在")
+            raise HTTPException(status_code=404, detail="文档不存在或正在处理中")
+        ingestion_pipeline.submit(doc_id)
         return {"message": "文档处理已启动"}
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail="文档处理启动失败")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="文档处理启动失败")
+
+@router.get("/documents/{doc_id}/tasks", response_model=List[ProcessingTaskResponse])
+async def get_document_tasks(doc_id: str, db: AsyncSession = Depends(get_db)):
+    """获取文档各处理阶段的任务记录"""
+    try:
+        result = await db.execute(
+            select(ProcessingTask).where(ProcessingTask.document_id == doc_id).order_by(ProcessingTask.created_at)
+        )
+        return result.scalars().all()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="获取处理任务失败")
+
+@router.get("/bases/{kb_id}/progress")
+async def stream_progress(kb_id: str):
+    """以 SSE 推送知识库内文档的处理进度，替代轮询文档列表
+
+    本 worker 处理的文档实时推送，其他 worker 处理的文档由本 worker 对该知识库的共享轮询补充。
+    """
+    async def event_stream():
+        queue = progress_broker.subscribe(kb_id)
+        try:
+            for event in progress_broker.snapshot(kb_id):
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # 保活注释，防止代理断开空闲连接
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+        finally:
+            progress_broker.unsubscribe(kb_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
\ No newline at end of file
@@ -1,9 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
+from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..services.knowledge_base_service import KnowledgeBaseService
-from ..schemas import KnowledgeBaseCreate, KnowledgeBaseUpdate, KnowledgeBaseResponse
+from ..services.transfer_service import KnowledgeBaseTransferService
+from ..services.vector_store import get_vector_store
+from ..schemas import KnowledgeBaseCreate, KnowledgeBaseUpdate, KnowledgeBaseResponse, QuantizationConfig
 from app.database import get_db
+from app.services.admission_service import ingest_admission
+import asyncio
+import os
+import shutil
+import tempfile
 
 router = APIRouter()
 
@@ -74,4 +83,81 @@ async def delete_knowledge_base(kb_id: str, hard_delete: bool = False, db: Async
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail="删除知识库失败")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="删除知识库失败")
+
+@router.get("/bases/{kb_id}/export")
+async def export_knowledge_base(kb_id: str, db: AsyncSession = Depends(get_db)):
+    """导出知识库（文档、文档块、向量和原始文件）为归档文件"""
+    fd, archive_path = tempfile.mkstemp(suffix=".kb.tar")
+    os.close(fd)
+    try:
+        transfer_service = KnowledgeBaseTransferService(db)
+        await transfer_service.export_knowledge_base(kb_id, archive_path)
+    except ValueError as e:
+        os.remove(archive_path)
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        os.remove(archive_path)
+        raise HTTPException(status_code=500, detail="导出知识库失败")
+    return FileResponse(
+        archive_path,
+        media_type="application/x-tar",
+        filename=f"{kb_id}.kb.tar",
+        background=BackgroundTask(os.remove, archive_path)
+    )
+
+@router.post("/bases/import", response_model=KnowledgeBaseResponse, dependencies=[Depends(ingest_admission)])
+async def import_knowledge_base(
+    file: UploadFile = File(...),
+    name: Optional[str] = Form(None),
+    keep_ids: bool = Form(False),
+    reembed: bool = Form(False),
+    db: AsyncSession = Depends(get_db)
+):
+    """从归档文件导入知识库，直接加载文档块和向量，无需重新处理
+
+    归档向量的模型与当前模型不一致时返回 400，指定 reembed 时用当前模型重新向量化文档块。
+    """
+    fd, archive_path = tempfile.mkstemp(suffix=".kb.tar")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            await asyncio.get_running_loop().run_in_executor(None, shutil.copyfileobj, file.file, buffer)
+        transfer_service = KnowledgeBaseTransferService(db)
+        return await transfer_service.import_knowledge_base(
+            archive_path, name=name, keep_ids=keep_ids, reembed=reembed
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="导入知识库失败")
+    finally:
+        os.remove(archive_path)
+
+@router.get("/bases/{kb_id}/quantization")
+async def get_quantization(kb_id: str):
+    """获取知识库向量的量化方式和内存占用"""
+    store = get_vector_store(kb_id)
+    quantizer = store.quantizer
+    return {
+        "type": quantizer.kind if quantizer else None,
+        "vector_count": len(store),
+        **store.memory_usage()
+    }
+
+@router.put("/bases/{kb_id}/quantization", dependencies=[Depends(ingest_admission)])
+async def set_quantization(kb_id: str, request: QuantizationConfig, db: AsyncSession = Depends(get_db)):
+    """设置知识库向量的量化方式（int8 / pq），并重新编码已有向量"""
+    try:
+        kb_service = KnowledgeBaseService(db)
+        if not await kb_service.get_knowledge_base(kb_id):
+            raise HTTPException(status_code=404, detail="知识库不存在")
+        store = get_vector_store(kb_id)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, store.configure_quantization, request.type, request.m, request.nbits)
+        return await get_quantization(kb_id)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="设置向量量化失败")
\ No newline at end of file
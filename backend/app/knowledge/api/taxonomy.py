@@ -0,0 +1,98 @@
+from fastapi import APIRouter, HTTPException, Depends
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..services.taxonomy_service import TaxonomyService
+from ..schemas import TagCreate, TagResponse, CategoryCreate, CategoryResponse
+from app.database import get_db
+
+router = APIRouter()
+
+@router.post("/bases/{kb_id}/tags", response_model=TagResponse)
+async def create_tag(kb_id: str, request: TagCreate, db: AsyncSession = Depends(get_db)):
+    """创建标签"""
+    try:
+        taxonomy_service = TaxonomyService(db)
+        return await taxonomy_service.create_tag(kb_id, request.name, request.color)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="创建标签失败")
+
+@router.get("/bases/{kb_id}/tags", response_model=List[TagResponse])
+async def list_tags(kb_id: str, db: AsyncSession = Depends(get_db)):
+    """获取知识库标签列表"""
+    try:
+        taxonomy_service = TaxonomyService(db)
+        return await taxonomy_service.get_tags(kb_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="获取标签列表失败")
+
+@router.post("/bases/{kb_id}/categories", response_model=CategoryResponse)
+async def create_category(kb_id: str, request: CategoryCreate, db: AsyncSession = Depends(get_db)):
+    """创建分类"""
+    try:
+        taxonomy_service = TaxonomyService(db)
+        return await taxonomy_service.create_category(
+            kb_id, request.name, request.description, request.parent_id, request.sort_order
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="创建分类失败")
+
+@router.get("/bases/{kb_id}/categories", response_model=List[CategoryResponse])
+async def list_categories(kb_id: str, db: AsyncSession = Depends(get_db)):
+    """获取知识库分类列表"""
+    try:
+        taxonomy_service = TaxonomyService(db)
+        return await taxonomy_service.get_categories(kb_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="获取分类列表失败")
+
+@router.put("/documents/{doc_id}/tags/{tag_id}")
+async def add_document_tag(doc_id: str, tag_id: str, db: AsyncSession = Depends(get_db)):
+    """为文档添加标签"""
+    try:
+        taxonomy_service = TaxonomyService(db)
+        if not await taxonomy_service.add_document_tag(doc_id, tag_id):
+            raise HTTPException(status_code=404, detail="文档或标签不存在")
+        return {"message": "标签添加成功"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="添加标签失败")
+
+@router.delete("/documents/{doc_id}/tags/{tag_id}")
+async def remove_document_tag(doc_id: str, tag_id: str, db: AsyncSession = Depends(get_db)):
+    """移除文档标签"""
+    try:
+        taxonomy_service = TaxonomyService(db)
+        if not await taxonomy_service.remove_document_tag(doc_id, tag_id):
+            raise HTTPException(status_code=404, detail="文档标签不存在")
+        return {"message": "标签移除成功"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="移除标签失败")
+
+@router.put("/documents/{doc_id}/categories/{category_id}")
+async def add_document_category(doc_id: str, category_id: str, db: AsyncSession = Depends(get_db)):
+    """将文档加入分类"""
+    try:
+        taxonomy_service = TaxonomyService(db)
+        if not await taxonomy_service.add_document_category(doc_id, category_id):
+            raise HTTPException(status_code=404, detail="文档或分类不存在")
+        return {"message": "分类添加成功"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="添加分类失败")
+
+@router.delete("/documents/{doc_id}/categories/{category_id}")
+async def remove_document_category(doc_id: str, category_id: str, db: AsyncSession = Depends(get_db)):
+    """将文档移出分类"""
+    try:
+        taxonomy_service = TaxonomyService(db)
+        if not await taxonomy_service.remove_document_category(doc_id, category_id):
+            raise HTTPException(status_code=404, detail="文档分类不存在")
+        return {"message": "分类移除成功"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="移除分类失败")
\ No newline at end of file
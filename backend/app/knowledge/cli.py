@@ -0,0 +1,122 @@
+"""知识库命令行工具
+
+用法:
+    python -m app.knowledge.cli export <kb_id> <archive_path>
+    python -m app.knowledge.cli import <archive_path> [--name NAME] [--keep-ids] [--reembed]
+    python -m app.knowledge.cli quantize <kb_id> --type {int8,pq,none} [--m M] [--nbits NBITS]
+    python -m app.knowledge.cli evaluate-quantization <kb_id> [--queries N] [--k K]
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.database import AsyncSessionLocal, engine
+from app.knowledge.services.quantization import evaluate_quantization
+from app.knowledge.services.transfer_service import KnowledgeBaseTransferService
+from app.knowledge.services.vector_store import get_vector_store
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def export_command(args):
+    async with AsyncSessionLocal() as session:
+        started = time.perf_counter()
+        manifest = await KnowledgeBaseTransferService(session).export_knowledge_base(args.kb_id, args.archive)
+        logger.info(
+            f"Exported knowledge base {args.kb_id}: {manifest['document_count']} documents, "
+            f"{manifest['chunk_count']} chunks in {time.perf_counter() - started:.1f}s -> {args.archive}"
+        )
+
+
+async def import_command(args):
+    async with AsyncSessionLocal() as session:
+        started = time.perf_counter()
+        kb = await KnowledgeBaseTransferService(session).import_knowledge_base(
+            args.archive, name=args.name, keep_ids=args.keep_ids, reembed=args.reembed
+        )
+        logger.info(f"Imported knowledge base {kb.id} ({kb.name}) in {time.perf_counter() - started:.1f}s")
+
+
+async def quantize_command(args):
+    store = get_vector_store(args.kb_id)
+    started = time.perf_counter()
+    store.configure_quantization(None if args.type == "none" else args.type, m=args.m, nbits=args.nbits)
+    usage = store.memory_usage()
+    logger.info(
+        f"Quantized {len(store)} vectors of knowledge base {args.kb_id} as {args.type} "
+        f"in {time.perf_counter() - started:.1f}s: resident {usage['resident_bytes']} bytes, "
+        f"full precision {usage['full_precision_bytes']} bytes"
+    )
+
+
+async def evaluate_quantization_command(args):
+    store = get_vector_store(args.kb_id)
+    if len(store) < 2:
+        logger.error(f"Knowledge base {args.kb_id} needs at least 2 vectors for evaluation")
+        return
+    vectors = np.asarray(store.embeddings, dtype=np.float32)
+    configs = [(None, None, None), ("int8", None, 8)]
+    configs += [("pq", m, 8) for m in args.m if vectors.shape[1] % m == 0]
+    results = evaluate_quantization(
+        vectors, configs, query_count=args.queries, k=args.k, rescore_factor=settings.quantization_rescore_factor
+    )
+    queries = results[0]["queries"]
+    print(f"{len(vectors) - queries} vectors, dim {vectors.shape[1]}, {queries} held-out queries, "
+          f"recall@{args.k}, rescore x{settings.quantization_rescore_factor}")
+    print(f"{'type':<6}{'m':>5}{'memory':>14}{'ratio':>8}{'recall':>9}{'rescored':>10}")
+    for row in results:
+        print(
+            f"{row['type']:<6}{row['m'] or '-':>5}{row['memory_bytes']:>14}"
+            f"{results[0]['memory_bytes'] / row['memory_bytes']:>7.1f}x"
+            f"{row['recall']:>9.3f}{row['recall_rescored']:>10.3f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="知识库管理工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="导出知识库为归档文件")
+    export_parser.add_argument("kb_id")
+    export_parser.add_argument("archive")
+    export_parser.set_defaults(handler=export_command)
+
+    import_parser = subparsers.add_parser("import", help="从归档文件导入知识库")
+    import_parser.add_argument("archive")
+    import_parser.add_argument("--name", help="导入后的知识库名称，默认沿用原名称")
+    import_parser.add_argument("--keep-ids", action="store_true", help="保留原知识库、文档和文档块ID")
+    import_parser.add_argument("--reembed", action="store_true", help="丢弃归档中的向量，用当前模型重新向量化")
+    import_parser.set_defaults(handler=import_command)
+
+    quantize_parser = subparsers.add_parser("quantize", help="设置知识库向量的量化方式")
+    quantize_parser.add_argument("kb_id")
+    quantize_parser.add_argument("--type", choices=["int8", "pq", "none"], required=True)
+    quantize_parser.add_argument("--m", type=int, default=16, help="乘积量化子空间数")
+    quantize_parser.add_argument("--nbits", type=int, default=8, help="乘积量化每个子空间的编码位数")
+    quantize_parser.set_defaults(handler=quantize_command)
+
+    evaluate_parser = subparsers.add_parser("evaluate-quantization", help="评估各量化方式的召回率与内存占用")
+    evaluate_parser.add_argument("kb_id")
+    evaluate_parser.add_argument("--queries", type=int, default=200, help="抽样查询数")
+    evaluate_parser.add_argument("--k", type=int, default=10)
+    evaluate_parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32, 64], help="评估的乘积量化子空间数")
+    evaluate_parser.set_defaults(handler=evaluate_quantization_command)
+
+    args = parser.parse_args()
+
+    async def run():
+        try:
+            await args.handler(args)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
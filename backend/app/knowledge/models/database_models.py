@@ -91,4 +91,86 @@ class DocumentChunk(Base):
     created_at = Column(TIMESTAMP, server_default=func.current_timestamp())
     
     # 关系
-    document = relationship("Document", back_populates="chunks")
\ No newline at end of file
+    document = relationship("Document", back_populates="chunks")
+
+class ProcessingTask(Base):
+    __tablename__ = "processing_tasks"
+    
+    id = Column(String(36), primary_key=True)
+    document_id = Column(String(36), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    task_type = Column(Enum('parse', 'vectorize', 'index', name='tasktype'), nullable=False)
+    status = Column(Enum('pending', 'running', 'completed', 'failed', name='taskstatus'), default='pending')
+    progress = Column(Integer, default=0)
+    error_message = Column(Text)
+    started_at = Column(TIMESTAMP)
+    completed_at = Column(TIMESTAMP)
+    created_at = Column(TIMESTAMP, server_default=func.current_timestamp())
+    updated_at = Column(TIMESTAMP, server_default=func.current_timestamp(), onupdate=func.current_timestamp())
+
+class Category(Base):
+    __tablename__ = "categories"
+    
+    id = Column(String(36), primary_key=True)
+    name = Column(String(100), nullable=False)
+    description = Column(Text)
+    knowledge_base_id = Column(String(36), ForeignKey("knowledge_bases.id", ondelete="CASCADE"), nullable=False)
+    parent_id = Column(String(36), ForeignKey("categories.id", ondelete="SET NULL"))
+    sort_order = Column(Integer, default=0)
+    created_at = Column(TIMESTAMP, server_default=func.current_timestamp())
+    updated_at = Column(TIMESTAMP, server_default=func.current_timestamp(), onupdate=func.current_timestamp())
+
+class Tag(Base):
+    __tablename__ = "tags"
+    
+    id = Column(String(36), primary_key=True)
+    name = Column(String(50), nullable=False)
+    color = Column(String(7), default="#1890ff")
+    knowledge_base_id = Column(String(36), ForeignKey("knowledge_bases.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(TIMESTAMP, server_default=func.current_timestamp())
+
+class DocumentTag(Base):
+    __tablename__ = "document_tags"
+    
+    id = Column(String(36), primary_key=True)
+    document_id = Column(String(36), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    tag_id = Column(String(36), ForeignKey("tags.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(TIMESTAMP, server_default=func.current_timestamp())
+
+class DocumentCategory(Base):
+    __tablename__ = "document_categories"
+    
+    id = Column(String(36), primary_key=True)
+    document_id = Column(String(36), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    category_id = Column(String(36), ForeignKey("categories.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(TIMESTAMP, server_default=func.current_timestamp())
+
+class ChatSession(Base):
+    __tablename__ = "sessions"
+    
+    id = Column(String(36), primary_key=True)
+    user_id = Column(String(36), ForeignKey("users.id", ondelete="SET NULL"))
+    title = Column(String(200))
+    status = Column(Enum('active', 'closed', 'archived', name='sessionstatus'), default='active')
+    knowledge_base_id = Column(String(36), ForeignKey("knowledge_bases.id", ondelete="SET NULL"))
+    context = Column(JSON)
+    created_at = Column(TIMESTAMP, server_default=func.current_timestamp())
+    updated_at = Column(TIMESTAMP, server_default=func.current_timestamp(), onupdate=func.current_timestamp())
+    last_activity = Column(TIMESTAMP, server_default=func.current_timestamp())
+    
+    # 关系
+    messages = relationship("Message", back_populates="session", cascade="all, delete-orphan")
+
+class Message(Base):
+    __tablename__ = "messages"
+    
+    id = Column(String(36), primary_key=True)
+    session_id = Column(String(36), ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False)
+    sender_type = Column(Enum('user', 'ai', 'admin', name='sendertype'), nullable=False)
+    content = Column(Text, nullable=False)
+    message_type = Column(Enum('text', 'image', 'file', 'rich_text', name='messagetype'), default='text')
+    # metadata 为 SQLAlchemy 保留属性名，映射到同名列
+    message_metadata = Column("metadata", JSON)
+    created_at = Column(TIMESTAMP, server_default=func.current_timestamp())
+    
+    # 关系
+    session = relationship("ChatSession", back_populates="messages")
\ No newline at end of file
@@ -57,4 +57,56 @@ class DocumentResponse(BaseModel):
     processed_at: Optional[datetime]
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TagCreate(BaseModel):
+    name: str
+    color: Optional[str] = "#1890ff"
+
+class TagResponse(BaseModel):
+    id: str
+    name: str
+    color: Optional[str]
+    knowledge_base_id: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class CategoryCreate(BaseModel):
+    name: str
+    description: Optional[str] = None
+    parent_id: Optional[str] = None
+    sort_order: int = 0
+
+class CategoryResponse(BaseModel):
+    id: str
+    name: str
+    description: Optional[str]
+    knowledge_base_id: str
+    parent_id: Optional[str]
+    sort_order: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class ProcessingTaskResponse(BaseModel):
+    id: str
+    document_id: str
+    task_type: str
+    status: str
+    progress: int
+    error_message: Optional[str]
+    started_at: Optional[datetime]
+    completed_at: Optional[datetime]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class QuantizationConfig(BaseModel):
+    type: Optional[str] = None  # int8 | pq，为空时关闭量化
+    m: int = 16
+    nbits: int = 8
\ No newline at end of file
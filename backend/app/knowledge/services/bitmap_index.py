@@ -0,0 +1,126 @@
+from typing import Dict, Iterable
+
+import numpy as np
+
+# 每个容器覆盖 2^16 个序号；基数不超过 ARRAY_LIMIT 时用有序 uint16 数组，否则用 1024 个 uint64 位图字
+CONTAINER_BITS = 16
+CONTAINER_WORDS = 1024
+ARRAY_LIMIT = 4096
+
+
+def _to_words(container: np.ndarray) -> np.ndarray:
+    if container.dtype == np.uint64:
+        return container
+    words = np.zeros(CONTAINER_WORDS, dtype=np.uint64)
+    values = container.astype(np.uint64)
+    np.bitwise_or.at(words, values >> np.uint64(6), np.uint64(1) << (values & np.uint64(63)))
+    return words
+
+
+def _words_to_values(words: np.ndarray) -> np.ndarray:
+    bits = np.unpackbits(words.astype("<u8").view(np.uint8), bitorder="little")
+    return np.flatnonzero(bits).astype(np.uint16)
+
+
+def _pack(words: np.ndarray):
+    """位图字转换为最紧凑的容器，空容器返回 None"""
+    values = _words_to_values(words)
+    if len(values) == 0:
+        return None
+    if len(values) <= ARRAY_LIMIT:
+        return values
+    return words
+
+
+def _cardinality(container: np.ndarray) -> int:
+    if container.dtype == np.uint64:
+        return int(np.unpackbits(container.astype("<u8").view(np.uint8)).sum())
+    return len(container)
+
+
+class RoaringBitmap:
+    """Roaring 风格的压缩位图，存放文档块序号"""
+
+    __slots__ = ("containers",)
+
+    def __init__(self, values: Iterable[int] = None):
+        self.containers: Dict[int, np.ndarray] = {}
+        if values is not None:
+            self.add_many(values)
+
+    def add_many(self, values: Iterable[int]):
+        values = np.unique(np.asarray(list(values) if not isinstance(values, np.ndarray) else values, dtype=np.int64))
+        if len(values) == 0:
+            return
+        highs = values >> CONTAINER_BITS
+        for high in np.unique(highs):
+            lows = (values[highs == high] & 0xFFFF).astype(np.uint16)
+            existing = self.containers.get(int(high))
+            if existing is None and len(lows) <= ARRAY_LIMIT:
+                self.containers[int(high)] = lows
+                continue
+            words = _to_words(existing).copy() if existing is not None else np.zeros(CONTAINER_WORDS, dtype=np.uint64)
+            words |= _to_words(lows)
+            self.containers[int(high)] = _pack(words)
+
+    def remove_many(self, values: Iterable[int]):
+        values = np.unique(np.asarray(list(values) if not isinstance(values, np.ndarray) else values, dtype=np.int64))
+        highs = values >> CONTAINER_BITS
+        for high in np.unique(highs):
+            existing = self.containers.get(int(high))
+            if existing is None:
+                continue
+            lows = (values[highs == high] & 0xFFFF).astype(np.uint16)
+            packed = _pack(_to_words(existing) & ~_to_words(lows))
+            if packed is None:
+                del self.containers[int(high)]
+            else:
+                self.containers[int(high)] = packed
+
+    def _combine(self, other: "RoaringBitmap", op, keys) -> "RoaringBitmap":
+        result = RoaringBitmap()
+        empty = np.zeros(CONTAINER_WORDS, dtype=np.uint64)
+        for key in keys:
+            left = self.containers.get(key)
+            right = other.containers.get(key)
+            words = op(_to_words(left) if left is not None else empty, _to_words(right) if right is not None else empty)
+            packed = _pack(words)
+            if packed is not None:
+                result.containers[key] = packed
+        return result
+
+    def __and__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        return self._combine(other, np.bitwise_and, self.containers.keys() & other.containers.keys())
+
+    def __or__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        return self._combine(other, np.bitwise_or, self.containers.keys() | other.containers.keys())
+
+    def __sub__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        return self._combine(other, lambda a, b: a & ~b, self.containers.keys())
+
+    def __len__(self) -> int:
+        return sum(_cardinality(c) for c in self.containers.values())
+
+    def __contains__(self, value: int) -> bool:
+        container = self.containers.get(value >> CONTAINER_BITS)
+        if container is None:
+            return False
+        low = value & 0xFFFF
+        if container.dtype == np.uint64:
+            return bool((int(container[low >> 6]) >> (low & 63)) & 1)
+        index = np.searchsorted(container, low)
+        return index < len(container) and container[index] == low
+
+    def copy(self) -> "RoaringBitmap":
+        result = RoaringBitmap()
+        result.containers = {k: v.copy() for k, v in self.containers.items()}
+        return result
+
+    def to_array(self) -> np.ndarray:
+        """返回有序的 int64 序号数组"""
+        parts = []
+        for high in sorted(self.containers):
+            container = self.containers[high]
+            lows = _words_to_values(container) if container.dtype == np.uint64 else container
+            parts.append((high << CONTAINER_BITS) + lows.astype(np.int64))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
@@ -0,0 +1,445 @@
+import asyncio
+import fcntl
+import logging
+import os
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from ..models.database_models import DocumentChunk
+
+try:
+    import zstandard
+except ImportError:  # 未安装 zstandard 时磁盘缓存退回 zlib 压缩
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# 失效日志超过该大小时轮转为 invalidations.log.1，其他进程读完旧文件剩余的记录后切换到新文件
+INVALIDATION_LOG_MAX_BYTES = 8 * 1024 * 1024
+
+# 进程内保留的最近失效块ID数量，用于丢弃失效之后才完成的缓存写入
+TOMBSTONE_LIMIT = 100_000
+
+# 磁盘缓存超出 chunk_cache_disk_max_bytes 时淘汰到上限的该比例，避免每次写入都扫描目录
+DISK_EVICT_TARGET_RATIO = 0.9
+
+# 磁盘块格式：1 字节编码方式 [+ 4 字节字典ID] + 压缩后的 "document_id\n内容"
+CODEC_ZLIB = b"l"
+CODEC_ZSTD = b"z"
+CODEC_ZSTD_DICT = b"d"
+
+ChunkEntry = Tuple[str, str]  # (document_id, content)
+
+
+class CompressedBlobStore:
+    """本地磁盘文档块缓存，按块ID一个文件，zstd 压缩
+
+    首次积累到 chunk_cache_dict_samples 个样本后训练压缩字典，文档块普遍较短，
+    使用字典后压缩率明显提高。字典按ID保存且不会被替换，旧文件始终可以解压。
+
+    占用超过 max_bytes 时按修改时间淘汰最旧的块，读取命中时更新修改时间。
+    占用按本进程的写入量累计估算，超出上限时才扫描目录求实际大小。
+    """
+
+    def __init__(self, root: Path, max_bytes: int = None):
+        self.root = root
+        self.dict_dir = root / "dictionaries"
+        self.max_bytes = max_bytes if max_bytes is not None else settings.chunk_cache_disk_max_bytes
+        self._usage: Optional[int] = None
+        self._lock = threading.Lock()
+        self._samples: List[bytes] = []
+        self._dict_id = 0
+        self._compressor = None
+        self._decompressors: Dict[int, object] = {}
+        if zstandard is not None:
+            self._compressor = zstandard.ZstdCompressor(level=3)
+            self._load_latest_dictionary()
+
+    def _load_latest_dictionary(self):
+        if not self.dict_dir.exists():
+            return
+        paths = sorted(self.dict_dir.glob("*.dict"), key=lambda p: p.stat().st_mtime)
+        if paths:
+            dictionary = zstandard.ZstdCompressionDict(paths[-1].read_bytes())
+            self._use_dictionary(dictionary)
+
+    def _use_dictionary(self, dictionary):
+        self._dict_id = dictionary.dict_id()
+        self._compressor = zstandard.ZstdCompressor(level=3, dict_data=dictionary)
+        self._decompressors[self._dict_id] = zstandard.ZstdDecompressor(dict_data=dictionary)
+
+    def _decompressor(self, dict_id: int):
+        decompressor = self._decompressors.get(dict_id)
+        if decompressor is None:
+            dictionary = zstandard.ZstdCompressionDict((self.dict_dir / f"{dict_id}.dict").read_bytes())
+            decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+            self._decompressors[dict_id] = decompressor
+        return decompressor
+
+    def _path(self, chunk_id: str) -> Path:
+        return self.root / chunk_id[:2] / chunk_id
+
+    def _train_dictionary(self):
+        try:
+            dictionary = zstandard.train_dictionary(settings.chunk_cache_dict_size, self._samples)
+        except zstandard.ZstdError as e:
+            logger.warning(f"Failed to train chunk cache dictionary: {e}")
+            return
+        finally:
+            self._samples = []
+        self.dict_dir.mkdir(parents=True, exist_ok=True)
+        path = self.dict_dir / f"{dictionary.dict_id()}.dict"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(dictionary.as_bytes())
+        os.replace(tmp, path)
+        self._use_dictionary(dictionary)
+        logger.info(f"Trained chunk cache dictionary {self._dict_id}")
+
+    def _encode(self, payload: bytes) -> bytes:
+        if self._compressor is None:
+            return CODEC_ZLIB + zlib.compress(payload)
+        if self._dict_id:
+            return CODEC_ZSTD_DICT + self._dict_id.to_bytes(4, "big") + self._compressor.compress(payload)
+        return CODEC_ZSTD + self._compressor.compress(payload)
+
+    def _decode(self, blob: bytes) -> bytes:
+        codec = blob[:1]
+        if codec == CODEC_ZLIB:
+            return zlib.decompress(blob[1:])
+        if codec == CODEC_ZSTD:
+            return zstandard.ZstdDecompressor().decompress(blob[1:])
+        if codec == CODEC_ZSTD_DICT:
+            return self._decompressor(int.from_bytes(blob[1:5], "big")).decompress(blob[5:])
+        raise ValueError(f"未知的缓存编码: {codec!r}")
+
+    def get_many(self, chunk_ids: Iterable[str]) -> Dict[str, ChunkEntry]:
+        entries = {}
+        for chunk_id in chunk_ids:
+            path = self._path(chunk_id)
+            try:
+                blob = path.read_bytes()
+            except FileNotFoundError:
+                continue
+            try:
+                document_id, content = self._decode(blob).decode("utf-8").split("\n", 1)
+            except Exception as e:
+                logger.warning(f"Discarding unreadable chunk cache entry {chunk_id}: {e}")
+                continue
+            entries[chunk_id] = (document_id, content)
+            if self.max_bytes:
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+        return entries
+
+    def put_many(self, entries: Dict[str, ChunkEntry]):
+        written = 0
+        for chunk_id, (document_id, content) in entries.items():
+            payload = f"{document_id}\n{content}".encode("utf-8")
+            with self._lock:
+                if self._compressor is not None and not self._dict_id:
+                    self._samples.append(payload)
+                    if len(self._samples) >= settings.chunk_cache_dict_samples:
+                        self._train_dictionary()
+                blob = self._encode(payload)
+            path = self._path(chunk_id)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{chunk_id}.{os.getpid()}.tmp")
+            tmp.write_bytes(blob)
+            os.replace(tmp, path)
+            written += len(blob)
+        if self.max_bytes:
+            with self._lock:
+                if self._usage is None:
+                    self._usage = sum(size for _, size, _ in self._scan())
+                else:
+                    self._usage += written
+                over = self._usage > self.max_bytes
+            if over:
+                self._evict()
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        """列出全部缓存块的 (修改时间, 大小, 路径)"""
+        files = []
+        if not self.root.exists():
+            return files
+        for shard in os.scandir(self.root):
+            if not shard.is_dir() or shard.path == str(self.dict_dir):
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _evict(self):
+        """淘汰最旧的块直到占用降到 DISK_EVICT_TARGET_RATIO；多个进程同时超限时依次执行，后者扫描后通常无需删除"""
+        with open(self.root / "evict.lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                files = self._scan()
+                total = sum(size for _, size, _ in files)
+                evicted = 0
+                if total > self.max_bytes:
+                    target = self.max_bytes * DISK_EVICT_TARGET_RATIO
+                    for _, size, path in sorted(files):
+                        if total <= target:
+                            break
+                        try:
+                            os.unlink(path)
+                        except FileNotFoundError:
+                            pass
+                        total -= size
+                        evicted += 1
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        with self._lock:
+            self._usage = total
+        if evicted:
+            logger.info(f"Evicted {evicted} chunk cache files, {total} bytes remain on disk")
+
+    def remove_many(self, chunk_ids: Iterable[str]):
+        for chunk_id in chunk_ids:
+            try:
+                self._path(chunk_id).unlink()
+            except FileNotFoundError:
+                pass
+
+
+class ChunkContentCache:
+    """文档块内容缓存：进程内 LRU -> 本地压缩磁盘缓存 -> MySQL 批量查询
+
+    块ID在文档重新处理时重新生成，内容不会原地变更；删除或重新处理文档时
+    使旧块失效，避免检索到已删除的块。失效记录追加到磁盘上的失效日志，
+    同一主机上的其他 worker 在下次读取时同步清除各自的内存缓存。
+
+    从数据库读取后的磁盘写入在后台执行，可能晚于失效完成：最近失效的块ID记为墓碑不再缓存，
+    写入完成后再检查读取以来新增的失效记录，删除已失效的块。
+    """
+
+    def __init__(self, max_bytes: int = None, cache_dir: Path = None, disk_enabled: bool = None):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.chunk_cache_max_bytes
+        self.cache_dir = cache_dir or Path(settings.upload_base_dir) / "chunk_cache"
+        disk_enabled = settings.chunk_cache_disk_enabled if disk_enabled is None else disk_enabled
+        self.disk = CompressedBlobStore(self.cache_dir) if disk_enabled else None
+        self._entries: "OrderedDict[str, ChunkEntry]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._tombstones: "OrderedDict[str, None]" = OrderedDict()
+        self._log_path = self.cache_dir / "invalidations.log"
+        self._rotated_log_path = self.cache_dir / "invalidations.log.1"
+        self._log_inode, self._log_offset = self._log_stat()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "db_fetches": 0, "db_rows": 0, "invalidated": 0}
+
+    def _log_stat(self, path: Path = None) -> Tuple[Optional[int], int]:
+        """返回失效日志的 (inode, 大小)，不存在时 inode 为 None"""
+        try:
+            stat = (path or self._log_path).stat()
+        except FileNotFoundError:
+            return None, 0
+        return stat.st_ino, stat.st_size
+
+    @contextmanager
+    def _log_lock(self):
+        """写入和轮转失效日志时的跨进程文件锁"""
+        with open(self.cache_dir / "invalidations.lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read_log(path: Path, start: int, end: int) -> Tuple[List[str], int]:
+        """读取日志中 [start, end) 范围内的完整行，返回 (块ID列表, 读取的字节数)"""
+        if end <= start:
+            return [], 0
+        try:
+            with open(path, "rb") as f:
+                f.seek(start)
+                data = f.read(end - start)
+        except FileNotFoundError:
+            return [], 0
+        # 只处理完整的行，正在写入的行留到下次
+        data = data[:data.rfind(b"\n") + 1]
+        return data.decode("ascii").split(), len(data)
+
+    def _invalidations_since(self, inode: Optional[int], offset: int) -> Optional[List[str]]:
+        """读取日志位置 (inode, offset) 之后追加的失效记录；日志轮转超过一次时返回 None"""
+        current_inode, size = self._log_stat()
+        if current_inode == inode:
+            return self._read_log(self._log_path, offset, size)[0]
+        chunk_ids = []
+        if inode is not None:
+            rotated_inode, rotated_size = self._log_stat(self._rotated_log_path)
+            if rotated_inode != inode:
+                return None
+            chunk_ids += self._read_log(self._rotated_log_path, offset, rotated_size)[0]
+        return chunk_ids + self._read_log(self._log_path, 0, size)[0]
+
+    def _sync_invalidations(self):
+        """读取其他进程追加的失效记录"""
+        inode, size = self._log_stat()
+        if inode == self._log_inode:
+            chunk_ids, consumed = self._read_log(self._log_path, self._log_offset, size)
+            self._drop_memory(chunk_ids)
+            self._log_offset += consumed
+            return
+        # 日志已轮转：先读完旧文件中剩余的记录，再从新文件开头读取
+        chunk_ids = self._invalidations_since(self._log_inode, self._log_offset)
+        if chunk_ids is None:
+            # 轮转了不止一次，无法得知遗漏的记录，清空内存缓存
+            self._clear_memory()
+        else:
+            self._drop_memory(chunk_ids)
+        _, consumed = self._read_log(self._log_path, 0, size)
+        self._log_inode, self._log_offset = inode, consumed
+
+    def _clear_memory(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def _drop_memory(self, chunk_ids: Iterable[str]):
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self._tombstones[chunk_id] = None
+                if self._entries.pop(chunk_id, None) is not None:
+                    self._bytes -= self._sizes.pop(chunk_id)
+            while len(self._tombstones) > TOMBSTONE_LIMIT:
+                self._tombstones.popitem(last=False)
+
+    def _live_entries(self, entries: Dict[str, ChunkEntry]) -> Dict[str, ChunkEntry]:
+        with self._lock:
+            return {chunk_id: entry for chunk_id, entry in entries.items() if chunk_id not in self._tombstones}
+
+    def _remember(self, entries: Dict[str, ChunkEntry]):
+        with self._lock:
+            for chunk_id, entry in entries.items():
+                if chunk_id in self._tombstones:
+                    continue
+                if chunk_id in self._entries:
+                    self._entries.move_to_end(chunk_id)
+                    continue
+                size = sys.getsizeof(entry[1]) + len(chunk_id) + len(entry[0])
+                self._entries[chunk_id] = entry
+                self._sizes[chunk_id] = size
+                self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                chunk_id, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(chunk_id)
+
+    def _lookup_memory(self, chunk_ids: Sequence[str]) -> Dict[str, ChunkEntry]:
+        found = {}
+        with self._lock:
+            for chunk_id in chunk_ids:
+                entry = self._entries.get(chunk_id)
+                if entry is not None:
+                    self._entries.move_to_end(chunk_id)
+                    found[chunk_id] = entry
+        return found
+
+    async def get_many(self, db: AsyncSession, chunk_ids: Sequence[str]) -> Dict[str, ChunkEntry]:
+        """批量获取文档块 (document_id, content)，不存在的块不在结果中"""
+        self._sync_invalidations()
+        log_position = (self._log_inode, self._log_offset)
+        found = self._lookup_memory(chunk_ids)
+        self.stats["memory_hits"] += len(found)
+        missing = [chunk_id for chunk_id in chunk_ids if chunk_id not in found]
+        if not missing:
+            return found
+
+        loop = asyncio.get_running_loop()
+        if self.disk is not None:
+            from_disk = await loop.run_in_executor(None, self.disk.get_many, missing)
+            if from_disk:
+                self.stats["disk_hits"] += len(from_disk)
+                self._remember(from_disk)
+                found.update(from_disk)
+                missing = [chunk_id for chunk_id in missing if chunk_id not in from_disk]
+        if not missing:
+            return found
+
+        result = await db.execute(
+            select(DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.content)
+            .where(DocumentChunk.id.in_(missing))
+        )
+        from_db = {row.id: (row.document_id, row.content) for row in result}
+        self.stats["db_fetches"] += 1
+        self.stats["db_rows"] += len(from_db)
+        if from_db:
+            self._remember(from_db)
+            found.update(from_db)
+            if self.disk is not None:
+                loop.run_in_executor(None, self._write_disk, from_db, log_position)
+        return found
+
+    def _write_disk(self, entries: Dict[str, ChunkEntry], log_position: Tuple[Optional[int], int]):
+        """写入磁盘缓存，log_position 为读取数据库前失效日志的位置"""
+        entries = self._live_entries(entries)
+        if not entries:
+            return
+        try:
+            self.disk.put_many(entries)
+            # 写入期间可能有本进程或其他进程的失效，删除已失效的块
+            invalidated = self._invalidations_since(*log_position)
+            if invalidated is None:
+                stale = list(entries)
+            else:
+                live = self._live_entries(entries)
+                stale = [chunk_id for chunk_id in entries if chunk_id not in live]
+                stale += [chunk_id for chunk_id in invalidated if chunk_id in entries]
+            self.disk.remove_many(stale)
+        except Exception as e:
+            logger.error(f"Failed to write chunk cache: {e}")
+
+    def _invalidate_sync(self, chunk_ids: List[str]):
+        self._drop_memory(chunk_ids)
+        if self.disk is not None:
+            self.disk.remove_many(chunk_ids)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with self._log_lock():
+            if self._log_stat()[1] > INVALIDATION_LOG_MAX_BYTES:
+                # 轮转而不是截断：正在读取旧日志的进程仍能读完其中的记录
+                os.replace(self._log_path, self._rotated_log_path)
+            with open(self._log_path, "a", encoding="utf-8") as f:
+                f.write("".join(f"{chunk_id}\n" for chunk_id in chunk_ids))
+
+    async def invalidate(self, chunk_ids: Sequence[str]):
+        """文档删除或重新处理后使其旧块失效"""
+        chunk_ids = list(chunk_ids)
+        if not chunk_ids:
+            return
+        self.stats["invalidated"] += len(chunk_ids)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._invalidate_sync, chunk_ids)
+
+    def get_stats(self):
+        return {**self.stats, "entries": len(self._entries), "memory_bytes": self._bytes}
+
+
+_chunk_cache: Optional[ChunkContentCache] = None
+
+
+def get_chunk_cache() -> ChunkContentCache:
+    """进程内共享的文档块内容缓存"""
+    global _chunk_cache
+    if _chunk_cache is None:
+        _chunk_cache = ChunkContentCache()
+    return _chunk_cache
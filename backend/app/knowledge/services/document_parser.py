@@ -0,0 +1,95 @@
+import re
+from html.parser import HTMLParser
+from typing import List
+
+
+class _HTMLTextExtractor(HTMLParser):
+    SKIP_TAGS = {"script", "style", "head"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts: List[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip:
+            self._skip -= 1
+        elif tag in ("p", "div", "br", "li", "h1", "h2", "h3", "h4", "h5", "h6", "tr"):
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def _parse_text(file_path: str) -> str:
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def _parse_html(file_path: str) -> str:
+    extractor = _HTMLTextExtractor()
+    extractor.feed(_parse_text(file_path))
+    return "".join(extractor.parts)
+
+
+def _parse_pdf(file_path: str) -> str:
+    from PyPDF2 import PdfReader
+    reader = PdfReader(file_path)
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def _parse_docx(file_path: str) -> str:
+    from docx import Document as DocxDocument
+    return "\n".join(para.text for para in DocxDocument(file_path).paragraphs)
+
+
+PARSERS = {
+    ".txt": _parse_text,
+    ".md": _parse_text,
+    ".html": _parse_html,
+    ".pdf": _parse_pdf,
+    ".docx": _parse_docx,
+}
+
+
+def parse_document(file_path: str, doc_type: str) -> str:
+    """提取文档纯文本（同步执行，调用方应放入线程池）"""
+    parser = PARSERS.get(doc_type.lower())
+    if parser is None:
+        raise ValueError(f"不支持的文档类型: {doc_type}")
+    text = parser(file_path)
+    # 合并多余空行
+    return re.sub(r"\n\s*\n+", "\n\n", text).strip()
+
+
+def split_text(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """按段落切分文本，超长段落按固定长度带重叠切分"""
+    chunks: List[str] = []
+    current = ""
+    for paragraph in text.split("\n\n"):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(current) + len(paragraph) + 2 <= chunk_size:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+            continue
+        if current:
+            chunks.append(current)
+        if len(paragraph) <= chunk_size:
+            current = paragraph
+            continue
+        step = max(1, chunk_size - chunk_overlap)
+        for start in range(0, len(paragraph), step):
+            piece = paragraph[start:start + chunk_size]
+            if start + chunk_size >= len(paragraph):
+                current = piece
+                break
+            chunks.append(piece)
+    if current:
+        chunks.append(current)
+    return chunks
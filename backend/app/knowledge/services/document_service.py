@@ -1,13 +1,17 @@
+import asyncio
 import os
 import uuid
 import logging
 from typing import List, Optional
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from fastapi import UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
-from ..models.database_models import Document, DocumentStatus, KnowledgeBase
+from sqlalchemy import and_, exists, or_, select, update, delete
+from ..models.database_models import Document, DocumentChunk, DocumentStatus, KnowledgeBase, ProcessingTask
+from .chunk_cache import get_chunk_cache
+from .filter_index import get_loaded_filter_index
+from .vector_store import get_vector_store
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -132,7 +136,13 @@ class DocumentService:
             return None
         
         await self.db.commit()
-        return await self.get_document(doc_id)
+        document = await self.get_document(doc_id)
+        
+        # 同步更新已加载的过滤索引
+        filter_index = get_loaded_filter_index(document.knowledge_base_id) if document else None
+        if filter_index:
+            filter_index.set_document_status(doc_id, status)
+        return document
     
     async def delete_document(self, doc_id: str) -> bool:
         """删除文档"""
@@ -148,25 +158,57 @@ class DocumentService:
             logger.error(f"Failed to delete document file: {e}")
             # 继续删除数据库记录
         
-        # 删除数据库记录
+        # 删除数据库记录（文档块级联删除）
+        result = await self.db.execute(select(DocumentChunk.id).where(DocumentChunk.document_id == doc_id))
+        chunk_ids = result.scalars().all()
         await self.db.execute(delete(Document).where(Document.id == doc_id))
         await self.db.commit()
+        await get_chunk_cache().invalidate(chunk_ids)
+        if chunk_ids:
+            loop = asyncio.get_running_loop()
+            store = await loop.run_in_executor(None, get_vector_store, document.knowledge_base_id)
+            await loop.run_in_executor(None, store.remove, chunk_ids)
+        
+        filter_index = get_loaded_filter_index(document.knowledge_base_id)
+        if filter_index:
+            filter_index.remove_document(doc_id)
         return True
     
     async def process_document(self, doc_id: str) -> bool:
         """处理文档（RAG解析和向量化）"""
-        document = await self.get_document(doc_id)
-        if not document:
-            return False
-        
-        # 检查文档状态
-        if document.status != 'uploaded':
+        # 未处理、处理失败或已完成（重新处理）的文档可以启动处理；
+        # 处理中的文档超过 DOCUMENT_PROCESSING_TIMEOUT_SECONDS 没有任何进度写入时，
+        # 视为处理进程已退出（如重启），允许重新认领。
+        # 条件更新保证并发请求中只有一个能把文档置为处理中
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(seconds=settings.document_processing_timeout_seconds)
+        recent_progress = exists().where(
+            ProcessingTask.document_id == Document.id,
+            ProcessingTask.status == 'running',
+            ProcessingTask.updated_at >= cutoff
+        )
+        stale_claim = and_(
+            Document.status.in_(('parsing', 'vectorizing', 'indexing')),
+            Document.updated_at < cutoff,
+            ~recent_progress
+        )
+        stmt = (
+            update(Document)
+            .where(Document.id == doc_id, or_(Document.status.in_(('uploaded', 'failed', 'completed')), stale_claim))
+            .values(status='parsing', error_message=None, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(stmt)
+        if result.rowcount == 0:
+            await self.db.rollback()
             return False
+        # 认领成功时不会有其他流水线在处理该文档，遗留的运行中任务记录标记为失败
+        await self.db.execute(
+            update(ProcessingTask)
+            .where(ProcessingTask.document_id == doc_id, ProcessingTask.status == 'running')
+            .values(status='failed', error_message='处理中断', completed_at=now)
+        )
+        await self.db.commit()
         
-        # 更新状态为解析中
-        await self.update_document_status(doc_id, 'parsing')
-        
-        # TODO: 这里将来集成RAG-Anything和LightRAG处理
-        # 目前仅模拟状态变更
-        
+        # 解析、向量化和索引由 IngestionPipeline 在后台执行
         return True
\ No newline at end of file
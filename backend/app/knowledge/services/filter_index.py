@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from ..models.database_models import Category, Document, DocumentCategory, DocumentChunk, DocumentTag, Tag
+from .bitmap_index import RoaringBitmap
+from .vector_store import get_loaded_vector_store, get_vector_store
+
+logger = logging.getLogger(__name__)
+
+
+class FilterIndex:
+    """知识库过滤索引：标签/分类/文档状态 -> 文档块序号位图
+
+    序号与 VectorStore 的行号一致，检索时在向量扫描前求出候选序号。
+    """
+
+    def __init__(self, kb_id: str):
+        self.kb_id = kb_id
+        self.bitmaps: Dict[str, RoaringBitmap] = defaultdict(RoaringBitmap)
+        self.live = RoaringBitmap()
+        self.doc_ordinals: Dict[str, np.ndarray] = {}
+        self.doc_keys: Dict[str, Set[str]] = defaultdict(set)
+        self.tag_names: Dict[str, str] = {}
+        self.category_names: Dict[str, str] = {}
+        self.built_at = 0.0
+        self.store_version = None
+
+    async def build(self, db: AsyncSession):
+        """从数据库全量构建；向量存储在线程池中加载，不阻塞事件循环"""
+        store = await asyncio.get_running_loop().run_in_executor(None, get_vector_store, self.kb_id)
+        self.store_version = store.version
+        ordinals = {chunk_id: i for i, chunk_id in enumerate(store.chunk_ids)}
+
+        doc_chunks: Dict[str, List[int]] = defaultdict(list)
+        result = await db.execute(
+            select(DocumentChunk.id, DocumentChunk.document_id)
+            .join(Document, Document.id == DocumentChunk.document_id)
+            .where(Document.knowledge_base_id == self.kb_id)
+        )
+        for chunk_id, doc_id in result:
+            ordinal = ordinals.get(chunk_id)
+            if ordinal is not None:
+                doc_chunks[doc_id].append(ordinal)
+        for doc_id, doc_ordinals in doc_chunks.items():
+            self.add_document_chunks(doc_id, doc_ordinals)
+
+        result = await db.execute(select(Document.id, Document.status).where(Document.knowledge_base_id == self.kb_id))
+        for doc_id, status in result:
+            self._attach(doc_id, f"status:{status}")
+
+        result = await db.execute(select(Tag.id, Tag.name).where(Tag.knowledge_base_id == self.kb_id))
+        self.tag_names = {name: tag_id for tag_id, name in result}
+        result = await db.execute(
+            select(DocumentTag.document_id, DocumentTag.tag_id)
+            .join(Tag, Tag.id == DocumentTag.tag_id)
+            .where(Tag.knowledge_base_id == self.kb_id)
+        )
+        for doc_id, tag_id in result:
+            self._attach(doc_id, f"tag:{tag_id}")
+
+        result = await db.execute(select(Category.id, Category.name).where(Category.knowledge_base_id == self.kb_id))
+        self.category_names = {name: category_id for category_id, name in result}
+        result = await db.execute(
+            select(DocumentCategory.document_id, DocumentCategory.category_id)
+            .join(Category, Category.id == DocumentCategory.category_id)
+            .where(Category.knowledge_base_id == self.kb_id)
+        )
+        for doc_id, category_id in result:
+            self._attach(doc_id, f"category:{category_id}")
+
+        self.built_at = time.monotonic()
+
+    def _attach(self, doc_id: str, key: str):
+        self.doc_keys[doc_id].add(key)
+        ordinals = self.doc_ordinals.get(doc_id)
+        if ordinals is not None:
+            self.bitmaps[key].add_many(ordinals)
+
+    def _detach(self, doc_id: str, key: str):
+        self.doc_keys[doc_id].discard(key)
+        ordinals = self.doc_ordinals.get(doc_id)
+        if ordinals is not None and key in self.bitmaps:
+            self.bitmaps[key].remove_many(ordinals)
+
+    def add_document_chunks(self, doc_id: str, ordinals):
+        """文档新增已向量化的块"""
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        existing = self.doc_ordinals.get(doc_id)
+        self.doc_ordinals[doc_id] = ordinals if existing is None else np.union1d(existing, ordinals)
+        self.live.add_many(ordinals)
+        for key in self.doc_keys.get(doc_id, ()):
+            self.bitmaps[key].add_many(ordinals)
+
+    def replace_document_chunks(self, doc_id: str, ordinals):
+        """文档重新处理后替换其块序号，保留标签/分类/状态关联"""
+        previous = self.doc_ordinals.pop(doc_id, None)
+        if previous is not None:
+            self.live.remove_many(previous)
+            for key in self.doc_keys.get(doc_id, ()):
+                self.bitmaps[key].remove_many(previous)
+        self.add_document_chunks(doc_id, ordinals)
+
+    def remove_document(self, doc_id: str):
+        ordinals = self.doc_ordinals.pop(doc_id, None)
+        keys = self.doc_keys.pop(doc_id, set())
+        if ordinals is None:
+            return
+        self.live.remove_many(ordinals)
+        for key in keys:
+            self.bitmaps[key].remove_many(ordinals)
+
+    def set_document_status(self, doc_id: str, status: str):
+        for key in [k for k in self.doc_keys.get(doc_id, ()) if k.startswith("status:")]:
+            self._detach(doc_id, key)
+        self._attach(doc_id, f"status:{status}")
+
+    def add_tag(self, doc_id: str, tag_id: str):
+        self._attach(doc_id, f"tag:{tag_id}")
+
+    def remove_tag(self, doc_id: str, tag_id: str):
+        self._detach(doc_id, f"tag:{tag_id}")
+
+    def add_category(self, doc_id: str, category_id: str):
+        self._attach(doc_id, f"category:{category_id}")
+
+    def remove_category(self, doc_id: str, category_id: str):
+        self._detach(doc_id, f"category:{category_id}")
+
+    def _union(self, prefix: str, values: List[str], names: Dict[str, str] = None) -> RoaringBitmap:
+        result = RoaringBitmap()
+        for value in values:
+            key = f"{prefix}:{names.get(value, value) if names else value}"
+            if key in self.bitmaps:
+                result = result | self.bitmaps[key]
+        return result
+
+    def resolve(self, filters) -> RoaringBitmap:
+        """按过滤条件求候选序号：字段之间取交集，同一字段内取并集，排除项做差集
+
+        标签和分类既可用ID也可用名称。
+        """
+        result = self.live.copy()
+        if filters.tags:
+            result = result & self._union("tag", filters.tags, self.tag_names)
+        if filters.categories:
+            result = result & self._union("category", filters.categories, self.category_names)
+        if filters.statuses:
+            result = result & self._union("status", filters.statuses)
+        if filters.exclude_tags:
+            result = result - self._union("tag", filters.exclude_tags, self.tag_names)
+        if filters.exclude_categories:
+            result = result - self._union("category", filters.exclude_categories, self.category_names)
+        if filters.exclude_statuses:
+            result = result - self._union("status", filters.exclude_statuses)
+        return result
+
+
+_indexes: Dict[str, FilterIndex] = {}
+_build_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+_refreshing: Set[str] = set()
+
+
+async def _refresh(kb_id: str):
+    try:
+        index = FilterIndex(kb_id)
+        async with AsyncSessionLocal() as db:
+            await index.build(db)
+        _indexes[kb_id] = index
+    except Exception as e:
+        logger.error(f"Failed to refresh filter index for knowledge base {kb_id}: {e}")
+    finally:
+        _refreshing.discard(kb_id)
+
+
+def _store_changed(index: FilterIndex) -> bool:
+    store = get_loaded_vector_store(index.kb_id)
+    return store is None or store.version != index.store_version
+
+
+async def get_filter_index(db: AsyncSession, kb_id: str) -> FilterIndex:
+    """获取知识库过滤索引
+
+    首次使用时同步构建；超过刷新间隔或向量存储已被（其他 worker）更新时，
+    继续使用旧索引并在后台重建，以纳入其他 worker 产生的变更。
+    """
+    index = _indexes.get(kb_id)
+    if index is None:
+        async with _build_locks[kb_id]:
+            index = _indexes.get(kb_id)
+            if index is None:
+                index = FilterIndex(kb_id)
+                await index.build(db)
+                _indexes[kb_id] = index
+    elif kb_id not in _refreshing and (
+        time.monotonic() - index.built_at > settings.filter_index_refresh_seconds or _store_changed(index)
+    ):
+        _refreshing.add(kb_id)
+        asyncio.create_task(_refresh(kb_id))
+    return index
+
+
+def get_loaded_filter_index(kb_id: str) -> Optional[FilterIndex]:
+    """返回已加载的过滤索引，未加载时返回 None（变更时无需构建）"""
+    return _indexes.get(kb_id)
+
+
+def evict_filter_index(kb_id: str):
+    _indexes.pop(kb_id, None)
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Optional, Set
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.services.embedding_service import EmbeddingService, get_embedding_service
+from ..models.database_models import DocumentChunk
+from .chunk_cache import get_chunk_cache
+from .document_parser import parse_document, split_text
+from .document_service import DocumentService
+from .filter_index import get_loaded_filter_index
+from .progress_service import TaskProgress
+from .vector_store import get_vector_store
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionPipeline:
+    """文档处理流水线：解析 -> 向量化 -> 索引，每个阶段记录到 processing_tasks"""
+
+    def __init__(self, session_factory=AsyncSessionLocal, embedding_service: EmbeddingService = None):
+        self.session_factory = session_factory
+        self.embedding_service = embedding_service or get_embedding_service()
+        self._tasks: Set[asyncio.Task] = set()
+        # 后台处理使用独立的并发上限，不占用导入接口的准入名额
+        self._slots = asyncio.Semaphore(settings.ingestion_max_concurrency)
+
+    def submit(self, doc_id: str):
+        """在后台处理文档"""
+        task = asyncio.create_task(self.run(doc_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def run(self, doc_id: str):
+        async with self._slots, self.session_factory() as db:
+            doc_service = DocumentService(db)
+            document = await doc_service.get_document(doc_id)
+            if not document:
+                return
+            kb_id = document.knowledge_base_id
+            loop = asyncio.get_running_loop()
+            task: Optional[TaskProgress] = None
+
+            try:
+                # 1. 解析并切分
+                await doc_service.update_document_status(doc_id, 'parsing')
+                task = TaskProgress(kb_id, doc_id, 'parse', 'parsing', self.session_factory)
+                await task.start()
+                text = await loop.run_in_executor(None, parse_document, document.file_path, document.doc_type)
+                chunks = split_text(text, settings.chunk_size, settings.chunk_overlap)
+                if not chunks:
+                    raise ValueError("文档没有可提取的文本内容")
+                await task.complete()
+
+                # 2. 分批向量化
+                await doc_service.update_document_status(doc_id, 'vectorizing')
+                task = TaskProgress(kb_id, doc_id, 'vectorize', 'vectorizing', self.session_factory)
+                await task.start()
+                batch_size = settings.ingestion_embed_batch_size
+                vectors = []
+                for start in range(0, len(chunks), batch_size):
+                    batch = chunks[start:start + batch_size]
+                    vectors.append(await loop.run_in_executor(None, self.embedding_service.encode, batch))
+                    await task.update((start + len(batch)) * 100 // len(chunks))
+                embeddings = np.vstack(vectors)
+                await task.complete()
+
+                # 3. 写入文档块和向量索引（重新处理时替换旧的文档块）
+                await doc_service.update_document_status(doc_id, 'indexing')
+                task = TaskProgress(kb_id, doc_id, 'index', 'indexing', self.session_factory)
+                await task.start()
+                result = await db.execute(select(DocumentChunk.id).where(DocumentChunk.document_id == doc_id))
+                old_chunk_ids = result.scalars().all()
+                await db.execute(delete(DocumentChunk).where(DocumentChunk.document_id == doc_id))
+                chunk_ids = [str(uuid.uuid4()) for _ in chunks]
+                now = datetime.now(timezone.utc)
+                rows = [
+                    {
+                        "id": chunk_id, "document_id": doc_id, "content": content, "chunk_index": i,
+                        "chunk_type": "text", "token_count": len(content), "vector_id": chunk_id,
+                        "chunk_metadata": None, "created_at": now,
+                    }
+                    for i, (chunk_id, content) in enumerate(zip(chunk_ids, chunks))
+                ]
+                for start in range(0, len(rows), 1000):
+                    await db.execute(insert(DocumentChunk), rows[start:start + 1000])
+                    await task.update(min(start + 1000, len(rows)) * 90 // len(rows))
+                await db.commit()
+                await get_chunk_cache().invalidate(old_chunk_ids)
+
+                # 追加新向量并屏蔽旧块，向量文件由各 worker 共享，写入时持有文件锁
+                store = await loop.run_in_executor(None, get_vector_store, kb_id)
+                first_ordinal = await loop.run_in_executor(None, store.append, chunk_ids, embeddings, old_chunk_ids)
+                filter_index = get_loaded_filter_index(kb_id)
+                if filter_index:
+                    filter_index.replace_document_chunks(doc_id, np.arange(first_ordinal, first_ordinal + len(chunk_ids)))
+
+                await doc_service.update_document_status(doc_id, 'completed')
+                await task.complete('completed')
+                logger.info(f"Processed document {doc_id}: {len(chunks)} chunks")
+
+            except Exception as e:
+                logger.error(f"Failed to process document {doc_id}: {e}")
+                if task:
+                    await task.fail(str(e))
+                await db.rollback()
+                await doc_service.update_document_status(doc_id, 'failed', str(e))
+
+
+ingestion_pipeline = IngestionPipeline()
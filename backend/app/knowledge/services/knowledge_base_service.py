@@ -6,7 +6,8 @@ from datetime import datetime, timezone
 from pathlib import Path
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete
-from ..models.database_models import KnowledgeBase, KnowledgeBaseStatus, User
+from ..models.database_models import Document, DocumentChunk, KnowledgeBase, KnowledgeBaseStatus, User
+from .chunk_cache import get_chunk_cache
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -130,6 +131,13 @@ class KnowledgeBaseService:
                     logger.error(f"Failed to delete knowledge base directory: {e}")
                     # 继续删除数据库记录
                 
+                result = await self.db.execute(
+                    select(DocumentChunk.id)
+                    .join(Document, Document.id == DocumentChunk.document_id)
+                    .where(Document.knowledge_base_id == kb_id)
+                )
+                chunk_ids = result.scalars().all()
+                
                 # 删除知识库（级联删除会自动删除相关文档）
                 await self.db.execute(delete(KnowledgeBase).where(KnowledgeBase.id == kb_id))
             else:
@@ -141,6 +149,14 @@ class KnowledgeBaseService:
                 await self.db.execute(stmt)
             
             await self.db.commit()
+            if hard_delete:
+                # 丢弃进程内的向量存储和过滤索引，避免以相同ID重新导入时追加到旧数据上
+                # （vector_store 依赖本模块，在此处导入避免循环导入）
+                from .filter_index import evict_filter_index
+                from .vector_store import evict_vector_store
+                evict_vector_store(kb_id)
+                evict_filter_index(kb_id)
+                await get_chunk_cache().invalidate(chunk_ids)
             return True
             
         except Exception as e:
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Set, Tuple
+
+from sqlalchemy import func, select, update
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from ..models.database_models import Document, ProcessingTask
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressBroker:
+    """按知识库分发文档处理进度事件（进程内）
+
+    本进程处理的文档由 TaskProgress 直接推送；其他 worker 处理的文档由每个知识库一个的
+    TaskEventPoller 从 processing_tasks 表读取后分发，有订阅者时才轮询，
+    同一知识库的多个 SSE 连接共用一次轮询。
+    """
+
+    QUEUE_SIZE = 100
+    LOCAL_TASKS_LIMIT = 1000
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._latest: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        self._local_tasks: "OrderedDict[str, None]" = OrderedDict()
+        self._pollers: Dict[str, asyncio.Task] = {}
+
+    def is_local(self, task_id: str) -> bool:
+        """任务是否由本进程处理（其事件已直接推送）"""
+        return task_id in self._local_tasks
+
+    def subscribe(self, kb_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self._subscribers[kb_id].add(queue)
+        if kb_id not in self._pollers:
+            self._pollers[kb_id] = asyncio.create_task(self._poll(kb_id))
+        return queue
+
+    def unsubscribe(self, kb_id: str, queue: asyncio.Queue):
+        self._subscribers[kb_id].discard(queue)
+        if not self._subscribers[kb_id]:
+            del self._subscribers[kb_id]
+            poller = self._pollers.pop(kb_id, None)
+            if poller is not None:
+                poller.cancel()
+
+    def snapshot(self, kb_id: str) -> List[Dict[str, Any]]:
+        """当前处理中文档的最新进度，供新连接的客户端初始化"""
+        return list(self._latest.get(kb_id, {}).values())
+
+    def publish(self, kb_id: str, event: Dict[str, Any]):
+        """推送本进程处理的任务事件"""
+        self._local_tasks[event["task_id"]] = None
+        if len(self._local_tasks) > self.LOCAL_TASKS_LIMIT:
+            self._local_tasks.popitem(last=False)
+        self._deliver(kb_id, event)
+
+    def _deliver(self, kb_id: str, event: Dict[str, Any]):
+        if event.get("document_status") in ("completed", "failed"):
+            self._latest[kb_id].pop(event["document_id"], None)
+            if not self._latest[kb_id]:
+                del self._latest[kb_id]
+        else:
+            self._latest[kb_id][event["document_id"]] = event
+        for queue in list(self._subscribers.get(kb_id, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # 客户端消费过慢时丢弃旧事件，只保留最新进度
+                queue.get_nowait()
+                queue.put_nowait(event)
+
+    async def _poll(self, kb_id: str):
+        """轮询其他 worker 写入的进度，直到该知识库没有订阅者"""
+        poller = TaskEventPoller(kb_id, self.session_factory, self)
+        while True:
+            try:
+                for event in await poller.poll():
+                    self._deliver(kb_id, event)
+            except Exception as e:
+                logger.warning(f"Failed to poll processing tasks for knowledge base {kb_id}: {e}")
+            await asyncio.sleep(poller.interval)
+
+
+progress_broker = ProgressBroker()
+
+
+class TaskEventPoller:
+    """从 processing_tasks 表读取其他 worker 处理的文档进度，由 ProgressBroker 分发给 SSE 连接
+
+    数据库中的进度按 progress_write_interval_ms 合并写入，轮询间隔与之一致；
+    本进程处理的任务已经直接推送，轮询时跳过。
+    """
+
+    def __init__(self, kb_id: str, session_factory=AsyncSessionLocal, broker: ProgressBroker = None):
+        self.kb_id = kb_id
+        self.session_factory = session_factory
+        self.broker = broker or progress_broker
+        self.interval = settings.progress_write_interval_ms / 1000
+        self._since = None
+        self._sent: Dict[str, Tuple[str, int]] = {}
+
+    async def poll(self) -> List[Dict[str, Any]]:
+        """返回上次轮询后有变化的任务事件；首次轮询只返回运行中的任务"""
+        query = (
+            select(ProcessingTask, Document.status)
+            .join(Document, Document.id == ProcessingTask.document_id)
+            .where(Document.knowledge_base_id == self.kb_id)
+            .order_by(ProcessingTask.updated_at)
+        )
+        if self._since is None:
+            query = query.where(ProcessingTask.status == 'running')
+        else:
+            # 时间戳精度为秒，使用 >= 并按 (状态, 进度) 去重
+            query = query.where(ProcessingTask.updated_at >= self._since)
+        async with self.session_factory() as db:
+            rows = (await db.execute(query)).all()
+            if self._since is None:
+                self._since = (await db.execute(select(func.now()))).scalar()
+
+        events = []
+        for task, document_status in rows:
+            if task.updated_at and task.updated_at > self._since:
+                self._since = task.updated_at
+            state = (task.status, task.progress or 0)
+            if self.broker.is_local(task.id) or self._sent.get(task.id) == state:
+                continue
+            self._sent[task.id] = state
+            elapsed = (task.updated_at - task.started_at).total_seconds() if task.updated_at and task.started_at else 0
+            event = {
+                "document_id": task.document_id,
+                "task_id": task.id,
+                "task_type": task.task_type,
+                "status": task.status,
+                "progress": task.progress or 0,
+                "document_status": document_status,
+                "elapsed_ms": int(elapsed * 1000),
+                "timestamp": (task.updated_at or datetime.now(timezone.utc)).isoformat(),
+            }
+            if task.error_message:
+                event["error_message"] = task.error_message
+            events.append(event)
+        return events
+
+
+class TaskProgress:
+    """单个处理阶段的进度记录
+
+    每次进度变化都立即推送给订阅者；processing_tasks 表只在开始、结束时写入，
+    中间进度按 progress_write_interval_ms 合并写入。每次写入使用独立的数据库会话，
+    不会提交处理流程中尚未完成的事务。
+    """
+
+    def __init__(self, kb_id: str, doc_id: str, task_type: str, document_status: str,
+                 session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self.kb_id = kb_id
+        self.doc_id = doc_id
+        self.task_type = task_type
+        self.document_status = document_status
+        self.task_id = str(uuid.uuid4())
+        self.progress = 0
+        self._started = 0.0
+        self._last_write = 0.0
+
+    def _publish(self, status: str, error_message: str = None):
+        event = {
+            "document_id": self.doc_id,
+            "task_id": self.task_id,
+            "task_type": self.task_type,
+            "status": status,
+            "progress": self.progress,
+            "document_status": self.document_status,
+            "elapsed_ms": int((time.monotonic() - self._started) * 1000),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+        if error_message:
+            event["error_message"] = error_message
+        progress_broker.publish(self.kb_id, event)
+
+    async def _write(self, **values):
+        async with self.session_factory() as db:
+            await db.execute(update(ProcessingTask).where(ProcessingTask.id == self.task_id).values(**values))
+            await db.commit()
+        self._last_write = time.monotonic()
+
+    async def start(self):
+        self._started = time.monotonic()
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as db:
+            db.add(ProcessingTask(
+                id=self.task_id, document_id=self.doc_id, task_type=self.task_type, status='running',
+                progress=0, started_at=now, created_at=now, updated_at=now
+            ))
+            await db.commit()
+        self._last_write = time.monotonic()
+        self._publish("running")
+
+    async def update(self, progress: int):
+        progress = max(0, min(100, int(progress)))
+        if progress == self.progress:
+            return
+        self.progress = progress
+        self._publish("running")
+        if (time.monotonic() - self._last_write) * 1000 >= settings.progress_write_interval_ms:
+            await self._write(progress=progress)
+
+    async def complete(self, document_status: str = None):
+        self.progress = 100
+        if document_status:
+            self.document_status = document_status
+        await self._write(status='completed', progress=100, completed_at=datetime.now(timezone.utc))
+        self._publish("completed")
+
+    async def fail(self, error_message: str):
+        self.document_status = "failed"
+        try:
+            await self._write(status='failed', error_message=error_message, completed_at=datetime.now(timezone.utc))
+        except Exception as e:
+            logger.error(f"Failed to record task failure for document {self.doc_id}: {e}")
+        self._publish("failed", error_message)
@@ -0,0 +1,193 @@
+from typing import Optional
+
+import numpy as np
+
+# 压缩码按块扫描，避免一次性把整个码表展开为 float32
+SCAN_BLOCK_ROWS = 65536
+
+
+class ScalarQuantizer:
+    """int8 标量量化：每个维度按 [min, max] 线性映射到 0-255"""
+
+    kind = "int8"
+
+    def __init__(self, minimum: np.ndarray = None, scale: np.ndarray = None):
+        self.minimum = minimum
+        self.scale = scale
+
+    def train(self, vectors: np.ndarray):
+        self.minimum = vectors.min(axis=0).astype(np.float32)
+        span = vectors.max(axis=0) - self.minimum
+        self.scale = np.where(span > 0, span / 255.0, 1.0).astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((vectors - self.minimum) / self.scale)
+        return np.clip(codes, 0, 255).astype(np.uint8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scale + self.minimum
+
+    def score(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """近似内积：q·(code*scale + min) = code·(q*scale) + q·min"""
+        weights = query * self.scale
+        offset = float(query @ self.minimum)
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCAN_BLOCK_ROWS):
+            block = codes[start:start + SCAN_BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ weights + offset
+        return scores
+
+    def state(self) -> dict:
+        return {"minimum": self.minimum, "scale": self.scale}
+
+    @classmethod
+    def from_state(cls, state) -> "ScalarQuantizer":
+        return cls(state["minimum"], state["scale"])
+
+
+class ProductQuantizer:
+    """乘积量化：向量切分为 m 个子空间，每个子空间用 2^nbits 个质心编码"""
+
+    kind = "pq"
+
+    def __init__(self, m: int = 16, nbits: int = 8, centroids: np.ndarray = None):
+        self.m = m
+        self.nbits = nbits
+        self.centroids = centroids  # (m, 2^nbits, dsub)
+
+    def train(self, vectors: np.ndarray, iterations: int = 20, sample_size: int = 20000, seed: int = 0):
+        dim = vectors.shape[1]
+        if dim % self.m:
+            raise ValueError(f"向量维度 {dim} 不能被子空间数 {self.m} 整除")
+        rng = np.random.default_rng(seed)
+        if len(vectors) > sample_size:
+            vectors = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dsub = dim // self.m
+        ksub = min(1 << self.nbits, len(vectors))
+        self.centroids = np.zeros((self.m, 1 << self.nbits, dsub), dtype=np.float32)
+        for j in range(self.m):
+            sub = vectors[:, j * dsub:(j + 1) * dsub]
+            centers = sub[rng.choice(len(sub), ksub, replace=False)].copy()
+            for _ in range(iterations):
+                assign = self._nearest(sub, centers)
+                counts = np.bincount(assign, minlength=ksub)
+                sums = np.zeros_like(centers)
+                np.add.at(sums, assign, sub)
+                nonempty = counts > 0
+                centers[nonempty] = sums[nonempty] / counts[nonempty, None]
+            self.centroids[j, :ksub] = centers
+            # 样本不足时剩余质心复制已有质心，保证码字有效
+            if ksub < (1 << self.nbits):
+                self.centroids[j, ksub:] = centers[0]
+
+    @staticmethod
+    def _nearest(sub: np.ndarray, centers: np.ndarray) -> np.ndarray:
+        distances = (sub ** 2).sum(axis=1, keepdims=True) - 2 * sub @ centers.T + (centers ** 2).sum(axis=1)
+        return distances.argmin(axis=1)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dsub = self.centroids.shape[2]
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for start in range(0, len(vectors), SCAN_BLOCK_ROWS):
+            block = vectors[start:start + SCAN_BLOCK_ROWS]
+            for j in range(self.m):
+                codes[start:start + len(block), j] = self._nearest(block[:, j * dsub:(j + 1) * dsub], self.centroids[j])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return self.centroids[np.arange(self.m), codes].reshape(len(codes), -1)
+
+    def score(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """查表计算近似内积：先算每个子空间查询与各质心的内积表，再按码字累加"""
+        dsub = self.centroids.shape[2]
+        table = np.einsum("jkd,jd->jk", self.centroids, query.reshape(self.m, dsub))
+        columns = np.arange(self.m)
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCAN_BLOCK_ROWS):
+            block = codes[start:start + SCAN_BLOCK_ROWS]
+            scores[start:start + len(block)] = table[columns, block].sum(axis=1)
+        return scores
+
+    def state(self) -> dict:
+        return {"m": np.array(self.m), "nbits": np.array(self.nbits), "centroids": self.centroids}
+
+    @classmethod
+    def from_state(cls, state) -> "ProductQuantizer":
+        return cls(int(state["m"]), int(state["nbits"]), state["centroids"])
+
+
+QUANTIZERS = {ScalarQuantizer.kind: ScalarQuantizer, ProductQuantizer.kind: ProductQuantizer}
+
+
+def create_quantizer(kind: str, m: int = 16, nbits: int = 8):
+    if kind == ScalarQuantizer.kind:
+        return ScalarQuantizer()
+    if kind == ProductQuantizer.kind:
+        if not 1 <= nbits <= 8:
+            raise ValueError("乘积量化的 nbits 取值范围为 1-8")
+        return ProductQuantizer(m=m, nbits=nbits)
+    raise ValueError(f"不支持的量化类型: {kind}")
+
+
+def save_quantizer(quantizer, path):
+    with open(path, "wb") as f:
+        np.savez(f, kind=np.array(quantizer.kind), **quantizer.state())
+
+
+def load_quantizer(path) -> Optional[object]:
+    with np.load(path, allow_pickle=False) as state:
+        return QUANTIZERS[str(state["kind"])].from_state(state)
+
+
+def evaluate_quantization(vectors: np.ndarray, configs, query_count: int = 200, k: int = 10,
+                          rescore_factor: int = 4, seed: int = 0):
+    """评估各量化配置的召回率与内存占用
+
+    从已存向量中抽样作为查询并从索引中移除（最多一半），避免查询命中自身而高估召回率；
+    以全精度精确 top-k 为基准，分别计算仅用压缩码检索与压缩码初筛后全精度重排的 recall@k。
+    configs 为 (kind, m, nbits) 列表，kind 为 None 表示全精度。
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if len(vectors) < 2:
+        raise ValueError("至少需要 2 个向量才能评估量化效果")
+    rng = np.random.default_rng(seed)
+    held_out = np.zeros(len(vectors), dtype=bool)
+    held_out[rng.choice(len(vectors), min(query_count, len(vectors) // 2), replace=False)] = True
+    queries = vectors[held_out]
+    vectors = vectors[~held_out]
+    k = min(k, len(vectors))
+
+    def top(scores, count):
+        count = min(count, len(scores))
+        return np.argpartition(-scores, count - 1)[:count]
+
+    truth = [set(top(vectors @ q, k)) for q in queries]
+    results = []
+    for kind, m, nbits in configs:
+        if kind is None:
+            results.append({"type": "none", "m": None, "nbits": None, "memory_bytes": int(vectors.nbytes),
+                            "recall": 1.0, "recall_rescored": 1.0, "queries": len(queries)})
+            continue
+        quantizer = create_quantizer(kind, m=m, nbits=nbits)
+        quantizer.train(vectors)
+        codes = quantizer.encode(vectors)
+        hits = hits_rescored = 0
+        for q, expected in zip(queries, truth):
+            approx = quantizer.score(q, codes)
+            hits += len(expected & set(top(approx, k)))
+            shortlist = top(approx, k * rescore_factor)
+            rescored = shortlist[top(vectors[shortlist] @ q, k)]
+            hits_rescored += len(expected & set(rescored))
+        total = len(queries) * k
+        results.append({
+            "type": kind,
+            "m": m if kind == ProductQuantizer.kind else None,
+            "nbits": nbits if kind == ProductQuantizer.kind else 8,
+            "memory_bytes": int(codes.nbytes + sum(v.nbytes for v in quantizer.state().values())),
+            "recall": hits / total,
+            "recall_rescored": hits_rescored / total,
+            "queries": len(queries),
+        })
+    return results
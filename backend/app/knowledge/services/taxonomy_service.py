@@ -0,0 +1,130 @@
+import uuid
+import logging
+from typing import List, Optional
+from datetime import datetime, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+from ..models.database_models import Category, Document, DocumentCategory, DocumentTag, Tag
+from .filter_index import get_loaded_filter_index
+
+logger = logging.getLogger(__name__)
+
+class TaxonomyService:
+    """标签、分类及其与文档的关联管理，变更时同步更新过滤索引"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_tag(self, kb_id: str, name: str, color: str = None) -> Tag:
+        """创建标签"""
+        tag = Tag(id=str(uuid.uuid4()), name=name, color=color or "#1890ff", knowledge_base_id=kb_id,
+                  created_at=datetime.now(timezone.utc))
+        self.db.add(tag)
+        await self.db.commit()
+        await self.db.refresh(tag)
+
+        filter_index = get_loaded_filter_index(kb_id)
+        if filter_index:
+            filter_index.tag_names[tag.name] = tag.id
+        return tag
+
+    async def get_tags(self, kb_id: str) -> List[Tag]:
+        """获取知识库的所有标签"""
+        result = await self.db.execute(select(Tag).where(Tag.knowledge_base_id == kb_id))
+        return result.scalars().all()
+
+    async def create_category(self, kb_id: str, name: str, description: str = None,
+                              parent_id: str = None, sort_order: int = 0) -> Category:
+        """创建分类"""
+        now = datetime.now(timezone.utc)
+        category = Category(id=str(uuid.uuid4()), name=name, description=description, knowledge_base_id=kb_id,
+                            parent_id=parent_id, sort_order=sort_order, created_at=now, updated_at=now)
+        self.db.add(category)
+        await self.db.commit()
+        await self.db.refresh(category)
+
+        filter_index = get_loaded_filter_index(kb_id)
+        if filter_index:
+            filter_index.category_names[category.name] = category.id
+        return category
+
+    async def get_categories(self, kb_id: str) -> List[Category]:
+        """获取知识库的所有分类"""
+        result = await self.db.execute(
+            select(Category).where(Category.knowledge_base_id == kb_id).order_by(Category.sort_order)
+        )
+        return result.scalars().all()
+
+    async def _get_document_kb(self, doc_id: str) -> Optional[str]:
+        result = await self.db.execute(select(Document.knowledge_base_id).where(Document.id == doc_id))
+        return result.scalar_one_or_none()
+
+    async def add_document_tag(self, doc_id: str, tag_id: str) -> bool:
+        """为文档添加标签，文档或标签不存在时返回 False"""
+        kb_id = await self._get_document_kb(doc_id)
+        tag = (await self.db.execute(select(Tag).where(Tag.id == tag_id))).scalar_one_or_none()
+        if not kb_id or not tag or tag.knowledge_base_id != kb_id:
+            return False
+
+        existing = await self.db.execute(
+            select(DocumentTag.id).where(DocumentTag.document_id == doc_id, DocumentTag.tag_id == tag_id)
+        )
+        if existing.first() is None:
+            self.db.add(DocumentTag(id=str(uuid.uuid4()), document_id=doc_id, tag_id=tag_id,
+                                    created_at=datetime.now(timezone.utc)))
+            await self.db.commit()
+
+        filter_index = get_loaded_filter_index(kb_id)
+        if filter_index:
+            filter_index.add_tag(doc_id, tag_id)
+        return True
+
+    async def remove_document_tag(self, doc_id: str, tag_id: str) -> bool:
+        """移除文档标签"""
+        kb_id = await self._get_document_kb(doc_id)
+        if not kb_id:
+            return False
+        result = await self.db.execute(
+            delete(DocumentTag).where(DocumentTag.document_id == doc_id, DocumentTag.tag_id == tag_id)
+        )
+        await self.db.commit()
+
+        filter_index = get_loaded_filter_index(kb_id)
+        if filter_index:
+            filter_index.remove_tag(doc_id, tag_id)
+        return result.rowcount > 0
+
+    async def add_document_category(self, doc_id: str, category_id: str) -> bool:
+        """将文档加入分类，文档或分类不存在时返回 False"""
+        kb_id = await self._get_document_kb(doc_id)
+        category = (await self.db.execute(select(Category).where(Category.id == category_id))).scalar_one_or_none()
+        if not kb_id or not category or category.knowledge_base_id != kb_id:
+            return False
+
+        existing = await self.db.execute(
+            select(DocumentCategory.id).where(DocumentCategory.document_id == doc_id, DocumentCategory.category_id == category_id)
+        )
+        if existing.first() is None:
+            self.db.add(DocumentCategory(id=str(uuid.uuid4()), document_id=doc_id, category_id=category_id,
+                                         created_at=datetime.now(timezone.utc)))
+            await self.db.commit()
+
+        filter_index = get_loaded_filter_index(kb_id)
+        if filter_index:
+            filter_index.add_category(doc_id, category_id)
+        return True
+
+    async def remove_document_category(self, doc_id: str, category_id: str) -> bool:
+        """将文档移出分类"""
+        kb_id = await self._get_document_kb(doc_id)
+        if not kb_id:
+            return False
+        result = await self.db.execute(
+            delete(DocumentCategory).where(DocumentCategory.document_id == doc_id, DocumentCategory.category_id == category_id)
+        )
+        await self.db.commit()
+
+        filter_index = get_loaded_filter_index(kb_id)
+        if filter_index:
+            filter_index.remove_category(doc_id, category_id)
+        return result.rowcount > 0
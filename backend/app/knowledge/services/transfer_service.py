@@ -0,0 +1,344 @@
+import asyncio
+import io
+import json
+import logging
+import os
+import shutil
+import tarfile
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.services.embedding_service import EmbeddingService, get_embedding_service
+from ..models.database_models import Document, DocumentChunk, KnowledgeBase
+from .document_service import secure_filename
+from .filter_index import evict_filter_index
+from .vector_store import evict_vector_store, get_vector_store
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMAT = "kb-archive"
+ARCHIVE_VERSION = 1
+SEGMENT_ROWS = 50000
+INSERT_BATCH_ROWS = 5000
+CHUNK_TYPES = ["text", "table", "image", "code"]
+
+DOCUMENT_FIELDS = [
+    "id", "title", "description", "file_size", "doc_type", "mime_type", "status",
+    "error_message", "doc_metadata", "created_at", "updated_at", "processed_at"
+]
+
+
+def _encode_strings(values: List[Optional[str]]) -> Tuple[np.ndarray, bytes]:
+    """变长字符串列编码为 offsets + UTF-8 数据块"""
+    encoded = [(v or "").encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, b"".join(encoded)
+
+
+def _decode_strings(offsets: np.ndarray, data: bytes) -> List[str]:
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def _checked_id(value: Any) -> str:
+    """保留原ID导入时校验ID为 UUID，防止归档中的ID被用于构造文件路径"""
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        raise ValueError(f"归档文件包含无效的ID: {value!r}")
+
+
+def _safe_extension(extension: Optional[str]) -> str:
+    """只保留允许的文件扩展名，文件名始终由文档ID和扩展名组成"""
+    extension = (extension or "").lower()
+    return extension if extension in settings.allowed_extensions else ""
+
+
+def _to_json_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _from_iso(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+class KnowledgeBaseTransferService:
+    """知识库导出/导入
+
+    归档为 tar 包，文档块按段（每段最多 SEGMENT_ROWS 行）以列式 .npy 文件保存，
+    向量与文档块逐行对齐；导入时直接批量写入，无需重新解析和向量化。
+    归档向量的模型与当前模型不一致时拒绝导入，除非指定 reembed 用当前模型重新向量化文档块。
+    """
+
+    def __init__(self, db: AsyncSession, embedding_service: EmbeddingService = None):
+        self.db = db
+        self.embedding_service = embedding_service or get_embedding_service()
+
+    @staticmethod
+    def _add_bytes(tar: tarfile.TarFile, name: str, data: bytes):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(datetime.now(timezone.utc).timestamp())
+        tar.addfile(info, io.BytesIO(data))
+
+    @classmethod
+    def _add_array(cls, tar: tarfile.TarFile, name: str, array: np.ndarray):
+        buffer = io.BytesIO()
+        np.save(buffer, array, allow_pickle=False)
+        cls._add_bytes(tar, name, buffer.getvalue())
+
+    @classmethod
+    def _write_segment(cls, tar: tarfile.TarFile, index: int, rows: List[Any], doc_index: Dict[str, int],
+                       ordinals: Dict[str, int], embeddings: np.ndarray):
+        prefix = f"chunks/{index:05d}/"
+        cls._add_array(tar, prefix + "id.npy", np.array([r.id for r in rows], dtype="S36"))
+        cls._add_array(tar, prefix + "document.npy", np.array([doc_index[r.document_id] for r in rows], dtype=np.int32))
+        cls._add_array(tar, prefix + "chunk_index.npy", np.array([r.chunk_index for r in rows], dtype=np.int32))
+        cls._add_array(tar, prefix + "chunk_type.npy", np.array([CHUNK_TYPES.index(r.chunk_type or "text") for r in rows], dtype=np.uint8))
+        cls._add_array(tar, prefix + "token_count.npy", np.array([-1 if r.token_count is None else r.token_count for r in rows], dtype=np.int32))
+
+        offsets, data = _encode_strings([r.content for r in rows])
+        cls._add_array(tar, prefix + "content_offsets.npy", offsets)
+        cls._add_bytes(tar, prefix + "content.bin", data)
+
+        metadata = [json.dumps(r.chunk_metadata, ensure_ascii=False) if r.chunk_metadata is not None else "" for r in rows]
+        offsets, data = _encode_strings(metadata)
+        cls._add_array(tar, prefix + "metadata_offsets.npy", offsets)
+        cls._add_bytes(tar, prefix + "metadata.bin", data)
+
+        if embeddings.size:
+            positions = np.array([ordinals.get(r.id, -1) for r in rows], dtype=np.int64)
+            has_embedding = positions >= 0
+            vectors = np.zeros((len(rows), embeddings.shape[1]), dtype=np.float32)
+            vectors[has_embedding] = embeddings[positions[has_embedding]]
+            cls._add_array(tar, prefix + "has_embedding.npy", has_embedding)
+            cls._add_array(tar, prefix + "embeddings.npy", vectors)
+
+    async def export_knowledge_base(self, kb_id: str, output_path: str) -> Dict[str, Any]:
+        """导出知识库到归档文件，返回统计信息"""
+        knowledge_base = (await self.db.execute(select(KnowledgeBase).where(KnowledgeBase.id == kb_id))).scalar_one_or_none()
+        if not knowledge_base:
+            raise ValueError("知识库不存在")
+
+        documents = (await self.db.execute(
+            select(Document).where(Document.knowledge_base_id == kb_id).order_by(Document.created_at)
+        )).scalars().all()
+        doc_index = {doc.id: i for i, doc in enumerate(documents)}
+
+        store = get_vector_store(kb_id)
+        ordinals = {chunk_id: i for i, chunk_id in enumerate(store.chunk_ids)}
+        loop = asyncio.get_running_loop()
+
+        chunk_count = 0
+        segment_count = 0
+        with tarfile.open(output_path, "w") as tar:
+            doc_rows = []
+            for doc in documents:
+                row = {field: _to_json_value(getattr(doc, field)) for field in DOCUMENT_FIELDS}
+                row["blob"] = None
+                if doc.file_path and os.path.exists(doc.file_path):
+                    row["blob"] = f"blobs/{doc.id}{os.path.splitext(doc.file_path)[1]}"
+                    await loop.run_in_executor(None, tar.add, doc.file_path, row["blob"])
+                doc_rows.append(row)
+            self._add_bytes(tar, "documents.json", json.dumps(doc_rows, ensure_ascii=False).encode("utf-8"))
+
+            stmt = (
+                select(
+                    DocumentChunk.id, DocumentChunk.document_id, DocumentChunk.content, DocumentChunk.chunk_index,
+                    DocumentChunk.chunk_type, DocumentChunk.token_count, DocumentChunk.chunk_metadata
+                )
+                .join(Document, Document.id == DocumentChunk.document_id)
+                .where(Document.knowledge_base_id == kb_id)
+                .order_by(DocumentChunk.document_id, DocumentChunk.chunk_index)
+                .execution_options(yield_per=SEGMENT_ROWS)
+            )
+            result = await self.db.stream(stmt)
+            async for rows in result.partitions(SEGMENT_ROWS):
+                await loop.run_in_executor(
+                    None, self._write_segment, tar, segment_count, rows, doc_index, ordinals, store.embeddings
+                )
+                chunk_count += len(rows)
+                segment_count += 1
+
+            manifest = {
+                "format": ARCHIVE_FORMAT,
+                "version": ARCHIVE_VERSION,
+                "exported_at": datetime.now(timezone.utc).isoformat(),
+                "knowledge_base": {
+                    "id": knowledge_base.id,
+                    "name": knowledge_base.name,
+                    "description": knowledge_base.description,
+                    "settings": knowledge_base.settings,
+                },
+                "document_count": len(documents),
+                "chunk_count": chunk_count,
+                "segment_count": segment_count,
+                "embedding_dim": int(store.embeddings.shape[1]) if store.embeddings.size else 0,
+                "embedding_model": settings.embedding_model,
+            }
+            self._add_bytes(tar, "manifest.json", json.dumps(manifest, ensure_ascii=False).encode("utf-8"))
+
+        return manifest
+
+    @staticmethod
+    def _read_segment(tar: tarfile.TarFile, index: int, with_embeddings: bool) -> Dict[str, Any]:
+        prefix = f"chunks/{index:05d}/"
+
+        def read_bytes(name: str) -> bytes:
+            return tar.extractfile(prefix + name).read()
+
+        def read_array(name: str) -> np.ndarray:
+            return np.load(io.BytesIO(read_bytes(name)), allow_pickle=False)
+
+        segment = {
+            "id": [v.decode("ascii") for v in read_array("id.npy")],
+            "document": read_array("document.npy"),
+            "chunk_index": read_array("chunk_index.npy"),
+            "chunk_type": read_array("chunk_type.npy"),
+            "token_count": read_array("token_count.npy"),
+            "content": _decode_strings(read_array("content_offsets.npy"), read_bytes("content.bin")),
+            "metadata": _decode_strings(read_array("metadata_offsets.npy"), read_bytes("metadata.bin")),
+        }
+        if with_embeddings:
+            segment["has_embedding"] = read_array("has_embedding.npy")
+            segment["embeddings"] = read_array("embeddings.npy")
+        return segment
+
+    async def import_knowledge_base(self, archive_path: str, name: str = None, keep_ids: bool = False,
+                                    owner_id: str = "admin-001", reembed: bool = False) -> KnowledgeBase:
+        """从归档文件导入知识库，返回新建的知识库
+
+        reembed 为 True 时丢弃归档中的向量，用当前模型重新向量化全部文档块。
+        """
+        loop = asyncio.get_running_loop()
+        with tarfile.open(archive_path, "r") as tar:
+            try:
+                manifest = json.loads(tar.extractfile("manifest.json").read())
+                doc_rows = json.loads(tar.extractfile("documents.json").read())
+            except KeyError:
+                raise ValueError("归档文件格式不正确")
+            if manifest.get("format") != ARCHIVE_FORMAT or manifest.get("version") != ARCHIVE_VERSION:
+                raise ValueError("不支持的归档版本")
+            if manifest["embedding_dim"] and manifest["embedding_model"] != settings.embedding_model and not reembed:
+                raise ValueError(
+                    f"归档向量由 {manifest['embedding_model']} 生成，与当前模型 {settings.embedding_model} 不一致，"
+                    f"如需导入请指定重新向量化"
+                )
+
+            kb_info = manifest["knowledge_base"]
+            kb_id = _checked_id(kb_info["id"]) if keep_ids else str(uuid.uuid4())
+            doc_ids = [_checked_id(row["id"]) if keep_ids else str(uuid.uuid4()) for row in doc_rows]
+            if keep_ids and (await self.db.execute(select(KnowledgeBase.id).where(KnowledgeBase.id == kb_id))).first():
+                raise ValueError("知识库已存在")
+
+            kb_dir = Path(settings.upload_base_dir) / "knowledge_bases" / secure_filename(kb_id)
+            documents_dir = kb_dir / "documents"
+            documents_dir.mkdir(parents=True, exist_ok=True)
+
+            now = datetime.now(timezone.utc)
+            knowledge_base = KnowledgeBase(
+                id=kb_id,
+                name=name or kb_info["name"],
+                description=kb_info.get("description"),
+                owner_id=owner_id,
+                status='active',
+                settings=kb_info.get("settings"),
+                created_at=now,
+                updated_at=now
+            )
+            self.db.add(knowledge_base)
+            await self.db.commit()
+
+            try:
+                documents = []
+                for row, doc_id in zip(doc_rows, doc_ids):
+                    extension = os.path.splitext(row["blob"])[1] if row["blob"] else row["doc_type"]
+                    file_path = documents_dir / f"{doc_id}{_safe_extension(extension)}"
+                    if row["blob"]:
+                        member = tar.extractfile(row["blob"])
+                        await loop.run_in_executor(None, self._copy_blob, member, file_path)
+                    documents.append({
+                        **{field: row[field] for field in DOCUMENT_FIELDS},
+                        "id": doc_id,
+                        "knowledge_base_id": kb_id,
+                        "file_path": str(file_path),
+                        "created_at": _from_iso(row["created_at"]) or now,
+                        "updated_at": _from_iso(row["updated_at"]) or now,
+                        "processed_at": _from_iso(row["processed_at"]),
+                    })
+                for i in range(0, len(documents), INSERT_BATCH_ROWS):
+                    await self.db.execute(insert(Document), documents[i:i + INSERT_BATCH_ROWS])
+                await self.db.commit()
+
+                store = await loop.run_in_executor(None, get_vector_store, kb_id)
+                with_embeddings = manifest["embedding_dim"] > 0 and not reembed
+                for index in range(manifest["segment_count"]):
+                    segment = await loop.run_in_executor(None, self._read_segment, tar, index, with_embeddings)
+                    if keep_ids:
+                        chunk_ids = [_checked_id(chunk_id) for chunk_id in segment["id"]]
+                    else:
+                        chunk_ids = [str(uuid.uuid4()) for _ in segment["id"]]
+                    chunks = [
+                        {
+                            "id": chunk_ids[i],
+                            "document_id": doc_ids[segment["document"][i]],
+                            "content": segment["content"][i],
+                            "chunk_index": int(segment["chunk_index"][i]),
+                            "chunk_type": CHUNK_TYPES[segment["chunk_type"][i]],
+                            "token_count": None if segment["token_count"][i] < 0 else int(segment["token_count"][i]),
+                            "vector_id": chunk_ids[i] if reembed or (with_embeddings and segment["has_embedding"][i]) else None,
+                            "chunk_metadata": json.loads(segment["metadata"][i]) if segment["metadata"][i] else None,
+                        }
+                        for i in range(len(chunk_ids))
+                    ]
+                    for i in range(0, len(chunks), INSERT_BATCH_ROWS):
+                        await self.db.execute(insert(DocumentChunk), chunks[i:i + INSERT_BATCH_ROWS])
+                    await self.db.commit()
+
+                    if with_embeddings:
+                        mask = segment["has_embedding"]
+                        await loop.run_in_executor(
+                            None, store.append, [cid for cid, keep in zip(chunk_ids, mask) if keep],
+                            segment["embeddings"][mask]
+                        )
+                    elif reembed:
+                        batch_size = settings.ingestion_embed_batch_size
+                        for start in range(0, len(chunk_ids), batch_size):
+                            vectors = await loop.run_in_executor(
+                                None, self.embedding_service.encode, segment["content"][start:start + batch_size]
+                            )
+                            await loop.run_in_executor(None, store.append, chunk_ids[start:start + batch_size], vectors)
+                evict_filter_index(kb_id)
+
+                # 统计字段直接重算，不依赖数据库触发器是否存在
+                await self.db.execute(
+                    update(KnowledgeBase).where(KnowledgeBase.id == kb_id).values(
+                        document_count=select(func.count(Document.id)).where(Document.knowledge_base_id == kb_id).scalar_subquery(),
+                        total_size=select(func.coalesce(func.sum(Document.file_size), 0)).where(Document.knowledge_base_id == kb_id).scalar_subquery(),
+                    )
+                )
+                await self.db.commit()
+            except Exception:
+                await self.db.rollback()
+                await self.db.execute(delete(KnowledgeBase).where(KnowledgeBase.id == kb_id))
+                await self.db.commit()
+                evict_vector_store(kb_id)
+                shutil.rmtree(kb_dir, ignore_errors=True)
+                raise
+
+        await self.db.refresh(knowledge_base)
+        return knowledge_base
+
+    @staticmethod
+    def _copy_blob(member, file_path: Path):
+        with open(file_path, "wb") as f:
+            shutil.copyfileobj(member, f)
@@ -0,0 +1,598 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from .knowledge_base_service import secure_filename
+from .quantization import create_quantizer, load_quantizer, save_quantizer
+
+logger = logging.getLogger(__name__)
+
+# 候选占比低于该值时只对候选行做点积，否则全量计算后屏蔽
+PREFILTER_GATHER_RATIO = 0.3
+
+# 按块复制 mmap 中的向量，避免整体读入内存
+APPEND_COPY_ROWS = 65536
+
+# 追加段超过该数量，或追加的行数超过基础文件的行数时合并到基础文件
+MAX_SEGMENTS = 512
+
+# 内存缓冲区的最小容量（行），容量不足时按倍数扩展
+MIN_CAPACITY = 1024
+
+
+class SegmentedRows:
+    """量化后的全精度向量：基础文件和各追加段均以 mmap 打开，按序号读取
+
+    只在精确重排、导出等场景按行读取，不会整体读入内存。
+    """
+
+    def __init__(self, parts: Sequence[np.ndarray], dim: int):
+        self.parts = list(parts)
+        self.dim = dim
+        self.offsets = np.cumsum([0] + [len(part) for part in self.parts])
+
+    def appended(self, part: np.ndarray) -> "SegmentedRows":
+        return SegmentedRows(self.parts + [part], self.dim)
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self), self.dim
+
+    @property
+    def size(self) -> int:
+        return len(self) * self.dim
+
+    @property
+    def nbytes(self) -> int:
+        return self.size * 4
+
+    def blocks(self):
+        """依次返回 (起始序号, 向量块)"""
+        for start, part in zip(self.offsets, self.parts):
+            for i in range(0, len(part), APPEND_COPY_ROWS):
+                yield int(start) + i, np.asarray(part[i:i + APPEND_COPY_ROWS], dtype=np.float32)
+
+    def __getitem__(self, rows) -> np.ndarray:
+        if isinstance(rows, slice):
+            rows = np.arange(len(self))[rows]
+        rows = np.asarray(rows, dtype=np.int64)
+        result = np.empty((len(rows), self.dim), dtype=np.float32)
+        owners = np.searchsorted(self.offsets, rows, side="right") - 1
+        for owner in np.unique(owners):
+            selected = owners == owner
+            result[selected] = self.parts[owner][rows[selected] - self.offsets[owner]]
+        return result
+
+    def __matmul__(self, query_vector: np.ndarray) -> np.ndarray:
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate([block @ query_vector for _, block in self.blocks()])
+
+    def __array__(self, dtype=None, copy=None):
+        if len(self) == 0:
+            return np.zeros((0, self.dim), dtype=dtype or np.float32)
+        return np.concatenate([np.asarray(part, dtype=dtype or np.float32) for part in self.parts])
+
+
+class Snapshot(NamedTuple):
+    """某一时刻的向量存储视图，发布后不再修改（删除标记除外），检索只读取同一个快照"""
+    count: int
+    chunk_ids: List[str]
+    vectors: object  # np.ndarray 或 SegmentedRows
+    codes: Optional[np.ndarray]
+    live: Optional[np.ndarray]
+    quantizer: object
+
+
+def _grow(buffer: Optional[np.ndarray], count: int, rows: np.ndarray) -> np.ndarray:
+    """把 rows 写入缓冲区 [count, count + len(rows))，容量不足时按倍数扩展
+
+    已发布快照引用的 [0, count) 区间不会被修改，扩展时旧缓冲区保持不变。
+    """
+    needed = count + len(rows)
+    if buffer is None or len(buffer) < needed:
+        capacity = max(MIN_CAPACITY, needed, 2 * (0 if buffer is None else len(buffer)))
+        grown = np.empty((capacity,) + rows.shape[1:], dtype=rows.dtype)
+        if count:
+            grown[:count] = buffer[:count]
+        buffer = grown
+    buffer[count:needed] = rows
+    return buffer
+
+
+class VectorStore:
+    """单个知识库的向量存储
+
+    向量以 L2 归一化的 float32 矩阵保存，行号即文档块序号（ordinal）。
+    基础文件为 vectors/embeddings.npy 和 vectors/chunk_ids.json；之后处理的文档
+    追加为 vectors/segments/ 下的段文件（以起始序号命名），不重写已有的向量。
+    追加段过多或总行数超过基础文件时合并进基础文件。
+
+    启用量化（int8 或 PQ）后内存中只保留压缩码，全精度向量以 mmap 方式打开，
+    仅用于对候选结果精确重排。
+
+    文档块删除或重新处理后旧行不会移除，其块ID追加到 vectors/deleted.log，检索时屏蔽。
+    多个 worker 进程共享同一目录：写入前持有文件锁并先读取其他进程追加的内容，
+    读取方检索前只加载新增的段和删除记录。
+    """
+
+    def __init__(self, kb_id: str):
+        self.kb_id = kb_id
+        self.vector_dir = Path(settings.upload_base_dir) / "knowledge_bases" / secure_filename(kb_id) / "vectors"
+        self.segment_dir = self.vector_dir / "segments"
+        self._lock = threading.Lock()
+        self._reset()
+        self._snapshot = Snapshot(0, [], np.zeros((0, 0), dtype=np.float32), None, None, None)
+        if self.vector_dir.exists():
+            with self._lock, self._file_lock(exclusive=False):
+                self._catch_up()
+        else:
+            self.version = self._disk_version()
+
+    def _reset(self):
+        """清空内存状态（不影响已发布的快照，检索在重新加载期间继续使用旧快照）"""
+        self.version = None
+        self._base_version = None
+        self._base_count = 0
+        self._deleted_offset = 0
+        self._chunk_ids: List[str] = []
+        self._ordinals: Dict[str, int] = {}
+        self._vectors = None  # 未量化时为内存缓冲区，量化后为 SegmentedRows
+        self._codes = None
+        self._live = None
+        self._quantizer = None
+
+    # ---- 快照访问 ----
+
+    @property
+    def chunk_ids(self) -> List[str]:
+        snapshot = self._snapshot
+        return snapshot.chunk_ids[:snapshot.count]
+
+    @property
+    def embeddings(self):
+        return self._snapshot.vectors
+
+    @property
+    def codes(self) -> Optional[np.ndarray]:
+        return self._snapshot.codes
+
+    @property
+    def quantizer(self):
+        return self._snapshot.quantizer
+
+    def __len__(self) -> int:
+        return self._snapshot.count
+
+    def _publish(self):
+        count = len(self._chunk_ids)
+        if isinstance(self._vectors, SegmentedRows):
+            vectors = self._vectors
+        elif self._vectors is None:
+            vectors = np.zeros((0, 0), dtype=np.float32)
+        else:
+            vectors = self._vectors[:count]
+        self._snapshot = Snapshot(
+            count, self._chunk_ids, vectors,
+            None if self._codes is None else self._codes[:count],
+            None if self._live is None else self._live[:count],
+            self._quantizer,
+        )
+
+    # ---- 磁盘文件 ----
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool = True, blocking: bool = True):
+        """跨进程文件锁：写入方独占，读取方共享，保证读到的各文件属于同一版本
+
+        非阻塞模式下获取失败时产出 False。
+        """
+        self.vector_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.vector_dir / ".lock", "a") as f:
+            flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            try:
+                fcntl.flock(f, flags if blocking else flags | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _stat(path: Path):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _disk_version(self):
+        """基础文件替换、段目录新增文件、删除记录追加都会改变版本"""
+        return (
+            self._stat(self.vector_dir / "chunk_ids.json"),
+            self._stat(self.segment_dir),
+            self._stat(self.vector_dir / "deleted.log"),
+        )
+
+    def is_stale(self) -> bool:
+        """磁盘上的向量文件是否已被其他进程更新"""
+        return self._disk_version() != self.version
+
+    def refresh(self, blocking: bool = True):
+        """加载其他进程追加的段和删除记录；基础文件被替换（合并、量化）时整体重新加载
+
+        非阻塞模式下其他线程或进程正在写入时跳过，继续使用当前快照。
+        """
+        if not self.is_stale():
+            return
+        if not self._lock.acquire(blocking):
+            return
+        try:
+            with self._file_lock(exclusive=False, blocking=blocking) as locked:
+                if locked:
+                    self._catch_up()
+        finally:
+            self._lock.release()
+
+    def _catch_up(self):
+        """读取磁盘上新增的内容，调用方需持有 _lock 和文件锁"""
+        version = self._disk_version()
+        if version == self.version:
+            return
+        if version[0] != self._base_version:
+            self._reset()
+            self._load_base()
+            self._base_version = version[0]
+        self._load_segments()
+        self._load_deleted()
+        self.version = version
+        self._publish()
+
+    def _load_base(self):
+        ids_path = self.vector_dir / "chunk_ids.json"
+        emb_path = self.vector_dir / "embeddings.npy"
+        if not ids_path.exists() or not emb_path.exists():
+            return
+        with open(ids_path, "r", encoding="utf-8") as f:
+            chunk_ids = json.load(f)
+        quantizer_path = self.vector_dir / "quantizer.npz"
+        if quantizer_path.exists():
+            self._quantizer = load_quantizer(quantizer_path)
+            embeddings = np.load(emb_path, mmap_mode="r")
+            self._vectors = SegmentedRows([embeddings], embeddings.shape[1])
+            self._codes = self._load_codes(self.vector_dir / "codes.npy", embeddings, len(chunk_ids))
+        else:
+            embeddings = np.load(emb_path)
+            self._vectors = embeddings if len(embeddings) else None
+        self._chunk_ids.extend(chunk_ids)
+        self._ordinals = {chunk_id: i for i, chunk_id in enumerate(chunk_ids)}
+        self._base_count = len(chunk_ids)
+
+    def _load_codes(self, path: Path, vectors: np.ndarray, count: int) -> np.ndarray:
+        """读取压缩码，与向量数量不一致（如写入中断）时用全精度向量重新编码"""
+        codes = np.load(path) if path.exists() else None
+        if codes is not None and len(codes) == count:
+            return codes
+        logger.warning(f"Re-encoding quantized codes {path.name} of knowledge base {self.kb_id}: "
+                       f"{0 if codes is None else len(codes)} codes for {count} vectors")
+        return np.concatenate([
+            self._quantizer.encode(np.asarray(vectors[i:i + APPEND_COPY_ROWS], dtype=np.float32))
+            for i in range(0, count, APPEND_COPY_ROWS)
+        ])
+
+    def _segment_path(self, start: int, suffix: str) -> Path:
+        return self.segment_dir / f"{start:012d}{suffix}"
+
+    def _load_segments(self):
+        """按起始序号顺序加载尚未加载的追加段；.json 最后写入，作为段完整的标记"""
+        if not self.segment_dir.exists():
+            return
+        starts = sorted(int(path.name[:-5]) for path in self.segment_dir.glob("*.json"))
+        for start in starts:
+            if start < len(self._chunk_ids):
+                continue  # 已加载或已合并进基础文件
+            if start > len(self._chunk_ids):
+                logger.error(f"Vector segment {start} of knowledge base {self.kb_id} does not follow "
+                             f"{len(self._chunk_ids)}, ignoring the remaining segments")
+                return
+            with open(self._segment_path(start, ".json"), "r", encoding="utf-8") as f:
+                chunk_ids = json.load(f)
+            quantized = self._quantizer is not None
+            vectors = np.load(self._segment_path(start, ".npy"), mmap_mode="r" if quantized else None)
+            codes = None
+            if quantized:
+                codes = self._load_codes(self._segment_path(start, ".codes.npy"), vectors, len(chunk_ids))
+            self._append_rows(chunk_ids, vectors, codes)
+
+    def _load_deleted(self):
+        path = self.vector_dir / "deleted.log"
+        try:
+            with open(path, "rb") as f:
+                f.seek(self._deleted_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # 只处理完整的行
+        data = data[:data.rfind(b"\n") + 1]
+        self._deleted_offset += len(data)
+        self._mark_deleted(data.decode("ascii").split())
+
+    # ---- 内存状态 ----
+
+    def _append_rows(self, chunk_ids: Sequence[str], vectors: np.ndarray, codes: Optional[np.ndarray]):
+        """把新行写入缓冲区（不发布快照），调用方需持有 _lock"""
+        count = len(self._chunk_ids)
+        if isinstance(self._vectors, SegmentedRows):
+            self._vectors = self._vectors.appended(vectors)
+        else:
+            self._vectors = _grow(self._vectors, count, np.asarray(vectors, dtype=np.float32))
+        if codes is not None:
+            self._codes = _grow(self._codes, count, codes)
+        if self._live is not None:
+            self._live = _grow(self._live, count, np.ones(len(chunk_ids), dtype=bool))
+        self._chunk_ids.extend(chunk_ids)
+        for i, chunk_id in enumerate(chunk_ids):
+            self._ordinals[chunk_id] = count + i
+
+    def _mark_deleted(self, chunk_ids: Iterable[str]) -> List[str]:
+        """标记删除（已发布的快照立即可见），返回本次新标记的块ID"""
+        ordinals = [self._ordinals[chunk_id] for chunk_id in chunk_ids if chunk_id in self._ordinals]
+        if self._live is None:
+            if not ordinals:
+                return []
+            self._live = np.ones(max(MIN_CAPACITY, len(self._chunk_ids)), dtype=bool)
+        ordinals = [ordinal for ordinal in ordinals if self._live[ordinal]]
+        self._live[ordinals] = False
+        return [self._chunk_ids[ordinal] for ordinal in ordinals]
+
+    # ---- 写入 ----
+
+    def append(self, chunk_ids: Sequence[str], vectors: np.ndarray, replaced: Iterable[str] = ()) -> int:
+        """追加向量并写入新的段文件，同时将被替换的旧块标记为删除，返回新块的起始序号
+
+        持有文件锁期间先读取其他进程追加的内容，不会覆盖其他进程写入的向量。
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock, self._file_lock():
+            self._catch_up()
+            start = len(self._chunk_ids)
+            if len(chunk_ids):
+                self.segment_dir.mkdir(parents=True, exist_ok=True)
+                codes = self._quantizer.encode(vectors) if self._quantizer is not None else None
+                vectors_path = self._segment_path(start, ".npy")
+                self._save_array(vectors_path, vectors)
+                if codes is not None:
+                    self._save_array(self._segment_path(start, ".codes.npy"), codes)
+                self._save_json(self._segment_path(start, ".json"), list(chunk_ids))
+                if self._quantizer is not None:
+                    vectors = np.load(vectors_path, mmap_mode="r")
+                self._append_rows(chunk_ids, vectors, codes)
+            self._write_deleted(self._mark_deleted(replaced))
+            if self._needs_compaction():
+                self._compact()
+            self.version = self._disk_version()
+            self._publish()
+            return start
+
+    def remove(self, chunk_ids: Iterable[str]):
+        """将文档块标记为删除，检索时不再返回"""
+        chunk_ids = list(chunk_ids)
+        if not chunk_ids:
+            return
+        with self._lock, self._file_lock():
+            self._catch_up()
+            self._write_deleted(self._mark_deleted(chunk_ids))
+            self.version = self._disk_version()
+            self._publish()
+
+    @staticmethod
+    def _save_array(path: Path, array: np.ndarray):
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _save_json(path: Path, value):
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp, path)
+
+    def _write_deleted(self, chunk_ids: List[str]):
+        if not chunk_ids:
+            return
+        with open(self.vector_dir / "deleted.log", "a", encoding="utf-8") as f:
+            f.write("".join(f"{chunk_id}\n" for chunk_id in chunk_ids))
+        self._deleted_offset = (self.vector_dir / "deleted.log").stat().st_size
+
+    def _segment_starts(self) -> List[int]:
+        if not self.segment_dir.exists():
+            return []
+        return sorted(int(path.name[:-5]) for path in self.segment_dir.glob("*.json"))
+
+    def _needs_compaction(self) -> bool:
+        tail_rows = len(self._chunk_ids) - self._base_count
+        return tail_rows > self._base_count or len(self._segment_starts()) > MAX_SEGMENTS
+
+    def _compact(self):
+        """把全部追加段合并为新的基础文件（调用方需持有 _lock 和文件锁）
+
+        合并后基础文件的行数至少翻倍，追加的每一行平均只被重写常数次。
+        """
+        count = len(self._chunk_ids)
+        emb_path = self.vector_dir / "embeddings.npy"
+        emb_tmp = self.vector_dir / "embeddings.npy.tmp"
+        if isinstance(self._vectors, SegmentedRows):
+            merged = np.lib.format.open_memmap(emb_tmp, mode="w+", dtype=np.float32, shape=self._vectors.shape)
+            for start, block in self._vectors.blocks():
+                merged[start:start + len(block)] = block
+            merged.flush()
+            del merged
+        else:
+            vectors = self._vectors[:count] if self._vectors is not None else np.zeros((0, 0), dtype=np.float32)
+            with open(emb_tmp, "wb") as f:
+                np.save(f, vectors)
+        if self._quantizer is not None:
+            self._save_array(self.vector_dir / "codes.npy", self._codes[:count])
+        os.replace(emb_tmp, emb_path)
+        deleted = [] if self._live is None else [self._chunk_ids[i] for i in np.flatnonzero(~self._live[:count])]
+        deleted_tmp = self.vector_dir / "deleted.log.tmp"
+        with open(deleted_tmp, "w", encoding="utf-8") as f:
+            f.write("".join(f"{chunk_id}\n" for chunk_id in deleted))
+        os.replace(deleted_tmp, self.vector_dir / "deleted.log")
+        # chunk_ids.json 最后替换：读取方据此判断基础文件已更新，跳过已合并的段
+        self._save_json(self.vector_dir / "chunk_ids.json", self._chunk_ids[:count])
+        for start in self._segment_starts():
+            for suffix in (".json", ".npy", ".codes.npy"):
+                self._segment_path(start, suffix).unlink(missing_ok=True)
+        if self._quantizer is not None:
+            embeddings = np.load(emb_path, mmap_mode="r")
+            self._vectors = SegmentedRows([embeddings], embeddings.shape[1])
+        self._base_count = count
+        self._deleted_offset = (self.vector_dir / "deleted.log").stat().st_size
+        self._base_version = self._disk_version()[0]
+
+    def configure_quantization(self, kind: Optional[str], m: int = 16, nbits: int = 8):
+        """设置量化方式并重新编码全部向量；kind 为 None 时恢复全精度内存检索"""
+        with self._lock, self._file_lock():
+            self._catch_up()
+            count = len(self._chunk_ids)
+            quantizer_path = self.vector_dir / "quantizer.npz"
+            if kind is None:
+                if isinstance(self._vectors, SegmentedRows):
+                    self._vectors = np.asarray(self._vectors, dtype=np.float32)
+                self._quantizer = None
+                self._codes = None
+                for path in (quantizer_path, self.vector_dir / "codes.npy"):
+                    path.unlink(missing_ok=True)
+            else:
+                if count == 0:
+                    raise ValueError("知识库没有向量，无法训练量化器")
+                vectors = self._vectors if isinstance(self._vectors, SegmentedRows) else self._vectors[:count]
+                quantizer = create_quantizer(kind, m=m, nbits=nbits)
+                quantizer.train(np.asarray(vectors, dtype=np.float32))
+                self._codes = _grow(None, 0, np.concatenate([
+                    quantizer.encode(np.asarray(vectors[i:i + APPEND_COPY_ROWS], dtype=np.float32))
+                    for i in range(0, count, APPEND_COPY_ROWS)
+                ]))
+                self._quantizer = quantizer
+                save_quantizer(quantizer, quantizer_path)
+            self._compact()
+            self.version = self._disk_version()
+            self._publish()
+
+    def memory_usage(self) -> Dict[str, int]:
+        """常驻内存中向量数据的字节数"""
+        snapshot = self._snapshot
+        full_precision = int(snapshot.vectors.nbytes)
+        resident = snapshot.codes.nbytes if snapshot.quantizer is not None else full_precision
+        return {"resident_bytes": int(resident), "full_precision_bytes": full_precision}
+
+    # ---- 检索 ----
+
+    def _exact_scores(self, snapshot: Snapshot, query_vector: np.ndarray, candidates: Optional[np.ndarray],
+                      top_k: int):
+        """全精度扫描，返回 (序号, 分数)，按分数降序"""
+        vectors = snapshot.vectors
+        if candidates is None:
+            rows = None
+            scores = vectors @ query_vector
+        elif len(candidates) < snapshot.count * PREFILTER_GATHER_RATIO:
+            rows = candidates
+            scores = vectors[rows] @ query_vector
+        else:
+            rows = None
+            scores = vectors @ query_vector
+            mask = np.ones(len(scores), dtype=bool)
+            mask[candidates] = False
+            scores[mask] = -np.inf
+            top_k = min(top_k, len(candidates))
+        return self._top(scores, rows, top_k)
+
+    def _quantized_scores(self, snapshot: Snapshot, query_vector: np.ndarray, candidates: Optional[np.ndarray],
+                          top_k: int):
+        """压缩码近似扫描取 top_k * 重排倍数个候选，再用 mmap 的全精度向量精确重排"""
+        rows = candidates
+        approx = snapshot.quantizer.score(query_vector, snapshot.codes if rows is None else snapshot.codes[rows])
+        ordinals, _ = self._top(approx, rows, top_k * settings.quantization_rescore_factor)
+        ordinals = np.sort(ordinals)  # 顺序读取 mmap
+        exact = snapshot.vectors[ordinals] @ query_vector
+        return self._top(exact, ordinals, top_k)
+
+    @staticmethod
+    def _top(scores: np.ndarray, rows: Optional[np.ndarray], top_k: int):
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), scores[:0]
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        ordinals = top if rows is None else rows[top]
+        return ordinals, scores[top]
+
+    def search(self, query_vector: np.ndarray, top_k: int = 10, candidates: Optional[np.ndarray] = None,
+               exact: bool = False) -> List[Tuple[str, float]]:
+        """余弦相似度检索，返回 (chunk_id, score) 列表
+
+        candidates 为允许返回的块序号（预过滤结果）：候选较少时只计算这些行，
+        否则全量计算后屏蔽非候选行。已删除的块始终被排除。
+        exact 为 True 时跳过量化直接全精度扫描。
+        """
+        self.refresh(blocking=False)
+        snapshot = self._snapshot
+        if snapshot.count == 0:
+            return []
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        if candidates is not None:
+            candidates = candidates[candidates < snapshot.count]
+            if snapshot.live is not None:
+                candidates = candidates[snapshot.live[candidates]]
+        elif snapshot.live is not None:
+            candidates = np.flatnonzero(snapshot.live)
+        if candidates is not None and len(candidates) == 0:
+            return []
+        if snapshot.quantizer is not None and not exact:
+            ordinals, scores = self._quantized_scores(snapshot, query_vector, candidates, top_k)
+        else:
+            ordinals, scores = self._exact_scores(snapshot, query_vector, candidates, top_k)
+        return [(snapshot.chunk_ids[o], float(score)) for o, score in zip(ordinals, scores)]
+
+
+_stores: Dict[str, VectorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_vector_store(kb_id: str) -> VectorStore:
+    """获取知识库向量存储（进程内缓存），并加载其他进程追加的内容"""
+    with _stores_lock:
+        store = _stores.get(kb_id)
+        if store is None:
+            store = VectorStore(kb_id)
+            _stores[kb_id] = store
+            return store
+    store.refresh()
+    return store
+
+
+def get_loaded_vector_store(kb_id: str) -> Optional[VectorStore]:
+    """返回已加载的向量存储，未加载时返回 None；检索时会自行加载其他进程追加的内容"""
+    return _stores.get(kb_id)
+
+
+def evict_vector_store(kb_id: str):
+    """丢弃知识库向量存储的进程内缓存"""
+    with _stores_lock:
+        _stores.pop(kb_id, None)
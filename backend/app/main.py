@@ -1,11 +1,14 @@
+from app.startup import include_routers, startup_timer
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import chat
-from app.knowledge.api import knowledge_base
-from app.knowledge.api import document
-from app.database import init_database
+from app.config import settings
+from app.migrations import check_schema, migrate
+from app.services.admission_service import admission_controller
+from app.services.message_logger import message_logger
 import logging
 
+startup_timer.checkpoint("import_core")
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -14,13 +17,29 @@ app = FastAPI(title="智能客服API", version="1.0.0")
 
 @app.on_event("startup")
 async def startup_event():
-    """应用启动时初始化数据库"""
+    """应用启动：检查数据库版本、启动后台任务并记录各阶段耗时
+
+    建表由迁移步骤执行（python -m app.migrations 或 gunicorn 主进程），
+    只有 MIGRATE_ON_STARTUP 开启时才在此执行，适用于单进程开发环境。
+    """
+    startup_timer.checkpoint("server")
     try:
-        await init_database()
-        logger.info("Database initialized successfully")
+        if settings.migrate_on_startup:
+            await migrate()
+        else:
+            await check_schema()
+        startup_timer.checkpoint("database")
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
         raise
+    await message_logger.start()
+    startup_timer.checkpoint("background_tasks")
+    startup_timer.ready()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时写入缓冲中的聊天记录"""
+    await message_logger.stop()
 
 # CORS配置 - 开发环境使用宽松设置
 app.add_middleware(
@@ -31,10 +50,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 注册路由
-app.include_router(chat.router, prefix="/api")
-app.include_router(knowledge_base.router, prefix="/api/knowledge")
-app.include_router(document.router, prefix="/api/knowledge")
+# 注册路由（按 API_MODULES 配置）
+include_routers(app)
+startup_timer.checkpoint("import_routers")
 
 @app.get("/")
 async def root():
@@ -42,4 +60,14 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """准入控制统计：放行、限流拒绝与排队降载次数"""
+    return admission_controller.stats
+
+@app.get("/startup/stats")
+async def startup_stats():
+    """本进程启动各阶段耗时"""
+    return startup_timer.stats
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""数据库迁移
+
+表结构由 ORM 模型定义。迁移只在部署时执行一次（gunicorn 主进程或手动执行），
+API worker 启动时只读取 schema_migrations 中的版本号，不执行 DDL，也不反射表结构。
+
+迁移通过 create_all 实现，只会创建缺少的表，不会修改已有的表：
+给已有表新增或修改字段需要手动执行 ALTER TABLE，执行迁移时会列出数据库中缺少的字段。
+
+用法:
+    python -m app.migrations
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import List
+
+from sqlalchemy import Column, Integer, Table, TIMESTAMP, func, insert, inspect, select
+from sqlalchemy.exc import IntegrityError
+
+from app.database import Base, engine
+import app.knowledge.models.database_models  # noqa: F401  注册全部模型
+
+logger = logging.getLogger(__name__)
+
+# 新增表时递增；已有表的字段变更不会被自动迁移
+SCHEMA_VERSION = 1
+
+schema_migrations = Table(
+    "schema_migrations",
+    Base.metadata,
+    Column("version", Integer, primary_key=True),
+    Column("applied_at", TIMESTAMP, nullable=False),
+)
+
+
+def _read_version(sync_conn) -> int:
+    if not inspect(sync_conn).has_table("schema_migrations"):
+        return 0
+    return sync_conn.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+
+
+def _missing_columns(sync_conn) -> List[str]:
+    """模型中有而数据库表中缺少的字段（create_all 不会补齐）"""
+    inspector = inspect(sync_conn)
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing += [f"{table.name}.{column.name}" for column in table.columns if column.name not in existing]
+    return missing
+
+
+def _warn_missing_columns(missing: List[str]):
+    if missing:
+        logger.error(f"Database tables are missing columns that must be added manually: {', '.join(missing)}")
+
+
+async def migrate() -> bool:
+    """迁移到当前版本，已是最新版本时跳过；返回是否执行了 DDL"""
+    async with engine.begin() as conn:
+        version = await conn.run_sync(_read_version)
+        if version >= SCHEMA_VERSION:
+            _warn_missing_columns(await conn.run_sync(_missing_columns))
+            return False
+        await conn.run_sync(Base.metadata.create_all)
+        _warn_missing_columns(await conn.run_sync(_missing_columns))
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(
+                insert(schema_migrations).values(version=SCHEMA_VERSION, applied_at=datetime.now(timezone.utc))
+            )
+    except IntegrityError:
+        # 其他实例同时完成了迁移
+        pass
+    logger.info(f"Migrated database schema from version {version} to {SCHEMA_VERSION}")
+    return True
+
+
+async def check_schema():
+    """检查数据库是否已迁移到当前版本（只读取版本号，字段检查由迁移命令执行）"""
+    async with engine.connect() as conn:
+        version = await conn.run_sync(_read_version)
+    if version < SCHEMA_VERSION:
+        logger.warning(
+            f"Database schema version {version} is older than {SCHEMA_VERSION}, run `python -m app.migrations`"
+        )
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    async def run():
+        try:
+            if not await migrate():
+                logger.info(f"Database schema is up to date (version {SCHEMA_VERSION})")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,48 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
+class RetrievalFilter(BaseModel):
+    """检索过滤条件：字段之间为且，同一字段内为或；标签/分类可用ID或名称"""
+    tags: List[str] = []
+    categories: List[str] = []
+    statuses: List[str] = []
+    exclude_tags: List[str] = []
+    exclude_categories: List[str] = []
+    exclude_statuses: List[str] = []
+
 class ChatRequest(BaseModel):
     message: str
-    session_id: Optional[str] = None
+    session_id: Optional[str] = Field(None, max_length=36)
+    knowledge_base_id: Optional[str] = None
+    knowledge_base_ids: List[str] = []
+    filters: Optional[RetrievalFilter] = None
+
+    def target_knowledge_bases(self) -> List[str]:
+        """本次检索的知识库（knowledge_base_id 与 knowledge_base_ids 合并去重）"""
+        kb_ids = [self.knowledge_base_id] if self.knowledge_base_id else []
+        return list(dict.fromkeys(kb_ids + self.knowledge_base_ids))
+
+class SearchRequest(BaseModel):
+    query: str
+    knowledge_base_ids: List[str]
+    filters: Optional[RetrievalFilter] = None
+    top_k: Optional[int] = Field(None, ge=1, le=100)
+
+class SearchHit(BaseModel):
+    chunk_id: str
+    document_id: str
+    knowledge_base_id: str
+    content: str
+    score: float
+    raw_score: float
+
+class SearchResponse(BaseModel):
+    results: List[SearchHit]
+    skipped_knowledge_bases: List[str] = []
 
 class ChatResponse(BaseModel):
     type: str
     content: Dict[str, Any]
-    timestamp: datetime
\ No newline at end of file
+    timestamp: datetime
+    session_id: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryTokenBucket:
+    """进程内令牌桶，适用于单进程部署或开发环境"""
+
+    MAX_KEYS = 100000
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    async def consume(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        """消耗令牌；允许时返回 0，否则返回需等待的秒数"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.MAX_KEYS:
+            self._prune(now)
+        return wait
+
+    def _prune(self, now: float):
+        # 丢弃长时间未访问的桶（此时它们早已回满）
+        stale = [k for k, (_, updated) in self._buckets.items() if now - updated > 300]
+        for k in stale:
+            del self._buckets[k]
+
+
+class RedisTokenBucket:
+    """基于 Redis 的令牌桶，多个 worker 共享限额"""
+
+    # 令牌计算在 Redis 内原子完成，使用 Redis 服务器时间避免各 worker 时钟偏差
+    SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+    def __init__(self, prefix: str = "ratelimit:"):
+        import redis.asyncio as aioredis
+        self.prefix = prefix
+        self.client = aioredis.Redis(host=settings.redis_host, port=settings.redis_port, db=settings.redis_db)
+        self._script = self.client.register_script(self.SCRIPT)
+
+    async def consume(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        try:
+            wait = await self._script(keys=[self.prefix + key], args=[rate, burst, cost])
+            return float(wait)
+        except Exception as e:
+            # Redis 不可用时放行，避免限流组件成为单点故障
+            logger.warning(f"Redis rate limiter unavailable, admitting request: {e}")
+            return 0.0
+
+
+class AdmissionController:
+    """准入控制：租户/知识库令牌桶限流 + 聊天与导入的并发上限 + 排队超时降载"""
+
+    def __init__(self, bucket=None):
+        if bucket is None:
+            bucket = RedisTokenBucket() if settings.admission_backend == "redis" else InMemoryTokenBucket()
+        self.bucket = bucket
+        self.queue_budget = settings.admission_queue_budget_ms / 1000
+        self.pools = {
+            "chat": {
+                "semaphore": asyncio.Semaphore(settings.admission_chat_concurrency),
+                "rate": settings.rate_limit_chat_rps,
+                "burst": settings.rate_limit_chat_burst,
+            },
+            "ingest": {
+                "semaphore": asyncio.Semaphore(settings.admission_ingest_concurrency),
+                "rate": settings.rate_limit_ingest_rps,
+                "burst": settings.rate_limit_ingest_burst,
+            },
+        }
+        self.stats = {
+            pool: {"admitted": 0, "rejected_tenant": 0, "rejected_session": 0, "rejected_kb": 0, "shed": 0, "in_flight": 0}
+            for pool in self.pools
+        }
+
+    def _reject(self, pool: str, reason: str, retry_after: float):
+        self.stats[pool][reason] += 1
+        raise HTTPException(
+            status_code=429,
+            detail="请求过于频繁，请稍后重试",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+    @asynccontextmanager
+    async def admit(self, pool: str, tenant_key: str, kb_ids: Sequence[str] = (), session_id: Optional[str] = None):
+        """申请一次准入，超出限额或排队超时时抛出 429
+
+        会话ID由客户端提供，只作为租户之外的附加限额，不能替代租户限额。
+        """
+        config = self.pools[pool]
+
+        wait = await self.bucket.consume(f"{pool}:tenant:{tenant_key}", config["rate"], config["burst"])
+        if wait > 0:
+            self._reject(pool, "rejected_tenant", wait)
+
+        if session_id:
+            wait = await self.bucket.consume(f"{pool}:session:{session_id}", config["rate"], config["burst"])
+            if wait > 0:
+                self._reject(pool, "rejected_session", wait)
+
+        for kb_id in kb_ids:
+            wait = await self.bucket.consume(f"{pool}:kb:{kb_id}", settings.rate_limit_kb_rps, settings.rate_limit_kb_burst)
+            if wait > 0:
+                self._reject(pool, "rejected_kb", wait)
+
+        semaphore = config["semaphore"]
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_budget)
+        except asyncio.TimeoutError:
+            self._reject(pool, "shed", self.queue_budget)
+
+        self.stats[pool]["admitted"] += 1
+        self.stats[pool]["in_flight"] += 1
+        try:
+            yield
+        finally:
+            self.stats[pool]["in_flight"] -= 1
+            semaphore.release()
+
+
+admission_controller = AdmissionController()
+
+
+def get_tenant_key(request: Request) -> str:
+    """租户标识：已登记的 API Key，否则为客户端地址
+
+    未登记的 Key 不能作为租户标识，否则随意更换 Key 即可绕过限额。
+    """
+    api_key = request.headers.get("X-API-Key")
+    if api_key and api_key in settings.admission_api_keys:
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+async def chat_admission(request: Request):
+    """聊天接口准入依赖"""
+    try:
+        body = json.loads(await request.body() or b"{}")
+    except ValueError:
+        body = {}
+    if not isinstance(body, dict):
+        body = {}
+    tenant_key = get_tenant_key(request)
+    session_id = body.get("session_id") if isinstance(body.get("session_id"), str) else None
+    kb_ids = body.get("knowledge_base_ids")
+    kb_ids = [kb_id for kb_id in kb_ids if isinstance(kb_id, str)] if isinstance(kb_ids, list) else []
+    if isinstance(body.get("knowledge_base_id"), str):
+        kb_ids.insert(0, body["knowledge_base_id"])
+    async with admission_controller.admit("chat", tenant_key, list(dict.fromkeys(kb_ids)), session_id):
+        yield
+
+
+async def ingest_admission(request: Request):
+    """文档导入接口准入依赖"""
+    tenant_key = get_tenant_key(request)
+    kb_id = request.path_params.get("kb_id")
+    async with admission_controller.admit("ingest", tenant_key, [kb_id] if kb_id else []):
+        yield
@@ -1,9 +1,27 @@
+import asyncio
+import logging
 import random
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.knowledge.services.chunk_cache import get_chunk_cache
+from app.knowledge.services.filter_index import get_filter_index, get_loaded_filter_index
+from app.knowledge.services.vector_store import get_loaded_vector_store, get_vector_store
+from app.models import RetrievalFilter
+from app.services.embedding_service import QueryEmbeddingBatcher
+from app.services.rerank_service import RerankService
+
+logger = logging.getLogger(__name__)
 
 class ChatService:
     def __init__(self):
+        self.query_embedder = QueryEmbeddingBatcher()
+        self.rerank_service = RerankService() if settings.rerank_enabled else None
+        self.chunk_cache = get_chunk_cache()
+        self._loading: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.search_stats = {"searches": 0, "knowledge_bases": 0, "skipped_timeout": 0, "skipped_error": 0}
         self.demo_responses = {
             "text": [
                 {"text": "您好！我是智能客服助手，很高兴为您服务！"},
@@ -57,6 +75,141 @@ class ChatService:
             ]
         }
     
+    def _background_load(self, key: Tuple[str, str], factory) -> asyncio.Future:
+        """同一资源只加载一次；检索超时取消时加载继续进行，供后续请求使用"""
+        future = self._loading.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._loading[key] = future
+
+            def done(f):
+                self._loading.pop(key, None)
+                if not f.cancelled() and f.exception():
+                    logger.error(f"Failed to load {key[0]} for knowledge base {key[1]}: {f.exception()}")
+
+            future.add_done_callback(done)
+        return future
+    
+    async def _build_filter_index(self, kb_id: str):
+        async with AsyncSessionLocal() as db:
+            return await get_filter_index(db, kb_id)
+    
+    async def _search_knowledge_base(self, db: AsyncSession, kb_id: str, query_vector, top_k: int,
+                                     filters: Optional[RetrievalFilter]) -> List[Tuple[str, float]]:
+        """检索单个知识库，返回 (chunk_id, score) 列表"""
+        loop = asyncio.get_running_loop()
+        store = get_loaded_vector_store(kb_id)
+        if store is None:
+            store = await asyncio.shield(self._background_load(
+                ("vector_store", kb_id), lambda: loop.run_in_executor(None, get_vector_store, kb_id)
+            ))
+        if len(store) == 0:
+            return []
+        
+        # 标签/分类/状态过滤在向量扫描前求出候选序号
+        candidates = None
+        if filters:
+            if get_loaded_filter_index(kb_id) is None:
+                filter_index = await asyncio.shield(self._background_load(
+                    ("filter_index", kb_id), lambda: self._build_filter_index(kb_id)
+                ))
+            else:
+                filter_index = await get_filter_index(db, kb_id)
+            candidates = filter_index.resolve(filters).to_array()
+            if len(candidates) == 0:
+                return []
+        
+        return await loop.run_in_executor(None, store.search, query_vector, top_k, candidates)
+    
+    async def search(self, db: AsyncSession, query: str, kb_ids: List[str], filters: RetrievalFilter = None,
+                     top_k: int = None) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """并发检索多个知识库并合并结果，返回 (文档块列表, 被跳过的知识库ID)
+        
+        每个知识库有独立的截止时间，超时（包括尚未加载完成）或出错的知识库被跳过，
+        其余知识库的结果照常返回。各知识库使用同一向量模型，直接按余弦相似度合并排序，
+        不做逐库归一化，避免无关知识库的最佳结果与真正相关的结果同分；
+        低于 FEDERATED_MIN_SCORE 的结果被丢弃。
+        """
+        top_k = top_k or settings.retrieval_top_k
+        self.search_stats["searches"] += 1
+        self.search_stats["knowledge_bases"] += len(kb_ids)
+        if not kb_ids:
+            return [], []
+        
+        query_vector = await self.query_embedder.embed(query)
+        tasks = {
+            kb_id: asyncio.create_task(self._search_knowledge_base(db, kb_id, query_vector, top_k, filters))
+            for kb_id in kb_ids
+        }
+        done, pending = await asyncio.wait(tasks.values(), timeout=settings.federated_search_timeout_ms / 1000)
+        for task in pending:
+            task.cancel()
+        
+        merged, skipped = [], []
+        for kb_id, task in tasks.items():
+            if task in pending:
+                skipped.append(kb_id)
+                self.search_stats["skipped_timeout"] += 1
+                logger.warning(f"Knowledge base {kb_id} missed the search deadline, skipped")
+                continue
+            if task.exception():
+                skipped.append(kb_id)
+                self.search_stats["skipped_error"] += 1
+                logger.error(f"Search failed for knowledge base {kb_id}: {task.exception()}")
+                continue
+            merged.extend(
+                {"chunk_id": chunk_id, "knowledge_base_id": kb_id, "score": score, "raw_score": score}
+                for chunk_id, score in task.result() if score >= settings.federated_min_score
+            )
+        merged.sort(key=lambda hit: -hit["score"])
+        merged = merged[:top_k]
+        if not merged:
+            return [], skipped
+        
+        # 热点文档块直接命中内存缓存，未命中的批量从磁盘缓存或数据库读取
+        entries = await self.chunk_cache.get_many(db, [hit["chunk_id"] for hit in merged])
+        hits = [
+            {**hit, "document_id": entries[hit["chunk_id"]][0], "content": entries[hit["chunk_id"]][1]}
+            for hit in merged if hit["chunk_id"] in entries
+        ]
+        return hits, skipped
+    
+    async def retrieve_context(self, db: AsyncSession, query: str, kb_ids: List[str], filters: RetrievalFilter = None) -> List[Dict[str, Any]]:
+        """检索知识库中与问题相关的文档块"""
+        candidates, _ = await self.search(db, query, kb_ids, filters)
+        if not candidates:
+            return []
+        return await self.select_context(query, candidates)
+    
+    async def select_context(self, query: str, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """从一阶段检索结果中挑选送入提示词的文档块"""
+        if self.rerank_service is None:
+            return candidates[:settings.rerank_top_n]
+        return await self.rerank_service.rerank(query, candidates)
+    
+    def get_context_response(self, context: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """以列表消息返回检索到的知识片段"""
+        return {
+            "type": "list",
+            "content": {
+                "header": {"title": "相关知识"},
+                "items": [
+                    {"title": f"片段 {i + 1}", "desc": chunk["content"][:200], "icon": "📄"}
+                    for i, chunk in enumerate(context)
+                ]
+            },
+            "timestamp": datetime.now()
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """聊天链路各阶段的运行统计"""
+        return {
+            "query_embedding": self.query_embedder.get_stats(),
+            "rerank": dict(self.rerank_service.stats) if self.rerank_service else None,
+            "search": dict(self.search_stats),
+            "chunk_cache": self.chunk_cache.get_stats()
+        }
+    
     def get_random_response(self, user_message: str = "") -> Dict[str, Any]:
         # 根据用户输入的关键词返回特定类型的消息
         user_message_lower = user_message.lower()
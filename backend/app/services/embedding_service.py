@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingService:
+    """文本向量化服务，首次使用时加载 sentence-transformers 模型"""
+
+    def __init__(self, model_name: str = None):
+        self.model_name = model_name or settings.embedding_model
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name, device="cpu")
+        return self._model
+
+    def load(self):
+        """预先加载模型（如在 fork worker 之前的主进程中）"""
+        self._get_model()
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """批量编码文本，返回 L2 归一化的 float32 矩阵"""
+        model = self._get_model()
+        vectors = model.encode(
+            list(texts),
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class QueryEmbeddingBatcher:
+    """查询向量化微批处理
+
+    并发协程的查询在 max_wait_ms 内或凑满 max_batch_size 条后合并为一次批量编码，
+    编码在线程池中执行，完成后分别唤醒各调用方。
+    """
+
+    def __init__(self, encoder: EmbeddingService = None, max_batch_size: int = None, max_wait_ms: float = None):
+        self.encoder = encoder or get_embedding_service()
+        self.max_batch_size = max_batch_size or settings.embedding_batch_max_size
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.embedding_batch_max_wait_ms) / 1000
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # 持有批次任务的引用，避免执行中被垃圾回收导致调用方永远等待
+        self._tasks: Set[asyncio.Task] = set()
+        # 统计信息
+        self._batches = 0
+        self._items = 0
+        self._queue_delays = deque(maxlen=1000)
+        self._batch_sizes = deque(maxlen=1000)
+
+    async def embed(self, text: str) -> np.ndarray:
+        """获取单条查询的向量"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = self._pending[:self.max_batch_size]
+        self._pending = self._pending[self.max_batch_size:]
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future, float]]):
+        started = time.perf_counter()
+        self._batches += 1
+        self._items += len(batch)
+        self._batch_sizes.append(len(batch))
+        for _, _, enqueued in batch:
+            self._queue_delays.append(started - enqueued)
+
+        texts = [text for text, _, _ in batch]
+        try:
+            loop = asyncio.get_running_loop()
+            vectors = await loop.run_in_executor(None, self.encoder.encode, texts)
+        except Exception as e:
+            logger.error(f"Query embedding batch failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def get_stats(self) -> dict:
+        """批次填充率与排队延迟，用于权衡吞吐与额外延迟"""
+        delays_ms = sorted(d * 1000 for d in self._queue_delays)
+        sizes = list(self._batch_sizes)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self._batches,
+            "items": self._items,
+            "pending": len(self._pending),
+            "avg_batch_size": sum(sizes) / len(sizes) if sizes else 0.0,
+            "avg_batch_fill": sum(sizes) / (len(sizes) * self.max_batch_size) if sizes else 0.0,
+            "queue_delay_p50_ms": delays_ms[len(delays_ms) // 2] if delays_ms else 0.0,
+            "queue_delay_p95_ms": delays_ms[int(len(delays_ms) * 0.95)] if delays_ms else 0.0,
+            "queue_delay_max_ms": delays_ms[-1] if delays_ms else 0.0,
+        }
+
+
+_embedding_service: Optional[EmbeddingService] = None
+
+
+def get_embedding_service() -> EmbeddingService:
+    """进程内共享的向量化服务，查询与文档处理共用同一份模型"""
+    global _embedding_service
+    if _embedding_service is None:
+        _embedding_service = EmbeddingService()
+    return _embedding_service
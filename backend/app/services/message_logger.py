@@ -0,0 +1,214 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.knowledge.models.database_models import ChatSession, KnowledgeBase, Message
+
+logger = logging.getLogger(__name__)
+
+# 数据本身有问题的错误，重试无效，按会话拆开写入后丢弃
+DATA_ERRORS = (IntegrityError, DataError)
+
+# 聊天响应类型到 messages.message_type 的映射
+MESSAGE_TYPES = {"text": "text", "image": "image", "card": "rich_text", "list": "rich_text"}
+
+
+class MessageLogger:
+    """聊天记录延迟批量写入
+
+    消息和会话活跃时间先缓存在内存中，按条数或时间阈值在后台批量落库：
+    消息使用多行 INSERT，同一会话的 last_activity 更新合并为一次 upsert。
+    停止时会执行最后一次刷新。
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, batch_size: int = None,
+                 flush_interval_ms: int = None, max_buffer: int = None):
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.message_log_batch_size
+        self.flush_interval = (flush_interval_ms or settings.message_log_flush_interval_ms) / 1000
+        self.max_buffer = max_buffer or settings.message_log_max_buffer
+        self._messages: List[Dict[str, Any]] = []
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.stats = {"buffered": 0, "flushed_messages": 0, "flushed_sessions": 0, "flushes": 0, "failures": 0, "dropped": 0}
+
+    def log_turn(self, session_id: str, user_message: str, response: Dict[str, Any],
+                 kb_id: str = None, context: List[Dict[str, Any]] = None):
+        """记录一轮对话（不阻塞请求）"""
+        now = datetime.now(timezone.utc)
+        response_type = response.get("type", "text")
+        content = response.get("content", {})
+        ai_text = content.get("text") if response_type == "text" else json.dumps(content, ensure_ascii=False)
+        ai_metadata = {"type": response_type}
+        if context:
+            ai_metadata["chunk_ids"] = [chunk["chunk_id"] for chunk in context]
+
+        self._messages.append({
+            "id": str(uuid.uuid4()), "session_id": session_id, "sender_type": "user",
+            "content": user_message, "message_type": "text", "message_metadata": None, "created_at": now
+        })
+        self._messages.append({
+            "id": str(uuid.uuid4()), "session_id": session_id, "sender_type": "ai",
+            "content": ai_text or "", "message_type": MESSAGE_TYPES.get(response_type, "text"),
+            "message_metadata": ai_metadata, "created_at": now
+        })
+        self._sessions[session_id] = {
+            "id": session_id, "status": "active", "knowledge_base_id": kb_id,
+            "created_at": self._sessions.get(session_id, {}).get("created_at", now), "last_activity": now
+        }
+
+        if len(self._messages) > self.max_buffer:
+            overflow = len(self._messages) - self.max_buffer
+            del self._messages[:overflow]
+            self.stats["dropped"] += overflow
+            logger.warning(f"Message log buffer full, dropped {overflow} oldest messages")
+        self.stats["buffered"] = len(self._messages)
+        if len(self._messages) >= self.batch_size:
+            self._wakeup.set()
+
+    @staticmethod
+    async def _resolve_knowledge_bases(db, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """知识库ID来自请求，不存在的置为 NULL，避免外键错误导致整批写入失败"""
+        kb_ids = {row["knowledge_base_id"] for row in rows if row["knowledge_base_id"]}
+        if not kb_ids:
+            return rows
+        result = await db.execute(select(KnowledgeBase.id).where(KnowledgeBase.id.in_(kb_ids)))
+        existing = set(result.scalars())
+        return [
+            row if row["knowledge_base_id"] in existing or not row["knowledge_base_id"]
+            else dict(row, knowledge_base_id=None)
+            for row in rows
+        ]
+
+    @staticmethod
+    def _upsert_sessions(db, rows: List[Dict[str, Any]]):
+        """会话不存在时创建，存在时只更新最近活跃时间（SQLite 分支用于测试库）"""
+        if db.bind.dialect.name == "sqlite":
+            stmt = sqlite_insert(ChatSession).values(rows)
+            return stmt.on_conflict_do_update(index_elements=["id"], set_={"last_activity": stmt.excluded.last_activity})
+        stmt = mysql_insert(ChatSession).values(rows)
+        return stmt.on_duplicate_key_update(last_activity=stmt.inserted.last_activity)
+
+    async def _write(self, sessions: Dict[str, Dict[str, Any]], messages: List[Dict[str, Any]]):
+        async with self.session_factory() as db:
+            if sessions:
+                rows = await self._resolve_knowledge_bases(db, list(sessions.values()))
+                await db.execute(self._upsert_sessions(db, rows))
+            for i in range(0, len(messages), self.batch_size):
+                await db.execute(insert(Message).values(messages[i:i + self.batch_size]))
+            await db.commit()
+
+    def _requeue(self, sessions: Dict[str, Dict[str, Any]], messages: List[Dict[str, Any]]):
+        """数据库不可用时把数据放回缓冲区，超过 max_buffer 时丢弃最旧的消息"""
+        self._messages = messages + self._messages
+        for session_id, row in sessions.items():
+            newer = self._sessions.get(session_id)
+            self._sessions[session_id] = row if newer is None else dict(newer, created_at=row["created_at"])
+        overflow = len(self._messages) - self.max_buffer
+        if overflow > 0:
+            del self._messages[:overflow]
+            self.stats["dropped"] += overflow
+            logger.warning(f"Message log buffer full while database is unavailable, dropped {overflow} oldest messages")
+        self.stats["buffered"] = len(self._messages)
+
+    async def _write_isolated(self, sessions: Dict[str, Dict[str, Any]], messages: List[Dict[str, Any]]):
+        """逐会话写入：只丢弃数据错误的会话，数据库不可用时剩余会话放回缓冲区"""
+        by_session: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for message in messages:
+            by_session[message["session_id"]].append(message)
+        order = list(sessions) + [s for s in by_session if s not in sessions]
+        for index, session_id in enumerate(order):
+            group = by_session.get(session_id, [])
+            try:
+                await self._write({session_id: sessions[session_id]} if session_id in sessions else {}, group)
+            except DATA_ERRORS as e:
+                self.stats["dropped"] += len(group)
+                logger.error(f"Failed to persist chat session {session_id}, dropped {len(group)} messages: {e}")
+                continue
+            except Exception as e:
+                self.stats["failures"] += 1
+                rest = order[index:]
+                logger.warning(f"Failed to persist chat messages, keeping {len(rest)} sessions buffered: {e}")
+                self._requeue({s: sessions[s] for s in rest if s in sessions},
+                              [message for s in rest for message in by_session.get(s, [])])
+                return
+            self.stats["flushed_messages"] += len(group)
+            self.stats["flushed_sessions"] += session_id in sessions
+
+    async def flush(self):
+        """把缓冲区写入数据库
+
+        数据库不可用（连接、超时等错误）时数据留在缓冲区，下次刷新重试；
+        数据错误（约束、字段值）时按会话拆开重写，只丢弃写不进去的会话。
+        """
+        async with self._flush_lock:
+            if not self._messages and not self._sessions:
+                return
+            messages, self._messages = self._messages, []
+            sessions, self._sessions = self._sessions, {}
+            self.stats["buffered"] = 0
+
+            try:
+                await self._write(sessions, messages)
+            except DATA_ERRORS as e:
+                self.stats["failures"] += 1
+                logger.warning(f"Failed to persist chat messages, writing sessions separately: {e}")
+                await self._write_isolated(sessions, messages)
+            except Exception as e:
+                self.stats["failures"] += 1
+                logger.warning(f"Failed to persist chat messages, keeping {len(messages)} messages buffered: {e}")
+                self._requeue(sessions, messages)
+                return
+            else:
+                self.stats["flushed_messages"] += len(messages)
+                self.stats["flushed_sessions"] += len(sessions)
+            self.stats["flushes"] += 1
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Message log flush loop error: {e}")
+
+    async def start(self):
+        """启动后台刷新任务"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台任务并刷新剩余数据"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._messages:
+            # 重试一次，仍失败时缓冲区中的消息随进程退出丢失
+            await self.flush()
+            if self._messages:
+                logger.error(f"Database unavailable at shutdown, lost {len(self._messages)} chat messages")
+
+
+message_logger = MessageLogger()
@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FakeScorer:
+    """确定性打分器：按查询词与文本的重叠度打分，用于测试和无模型环境"""
+
+    def score(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        scores = []
+        for query, text in pairs:
+            query_terms = set(re.findall(r"\w+", query.lower()))
+            text_terms = set(re.findall(r"\w+", text.lower()))
+            overlap = len(query_terms & text_terms) / (len(query_terms) or 1)
+            # 用内容哈希打破平局，保证结果稳定
+            tie_breaker = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:4], 16) / 0xFFFF * 1e-3
+            scores.append(overlap + tie_breaker)
+        return scores
+
+
+class CrossEncoderScorer:
+    """基于 sentence-transformers CrossEncoder 的打分器，首次使用时加载模型"""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def load(self):
+        """预先加载模型（如在 fork worker 之前的主进程中）"""
+        self._get_model()
+
+    def score(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        model = self._get_model()
+        # 所有 (query, chunk) 对在一次前向计算中完成
+        scores = model.predict(list(pairs), batch_size=len(pairs), show_progress_bar=False)
+        return [float(s) for s in scores]
+
+
+class RerankService:
+    """检索结果重排：批量打分、严格超时回退、热点查询分数缓存"""
+
+    def __init__(self, scorer=None, timeout_ms: int = None, cache_size: int = None, max_workers: int = None):
+        if scorer is None:
+            scorer = FakeScorer() if settings.rerank_model == "fake" else CrossEncoderScorer(settings.rerank_model)
+        self.scorer = scorer
+        self.timeout = (timeout_ms if timeout_ms is not None else settings.rerank_timeout_ms) / 1000
+        self.cache_size = cache_size if cache_size is not None else settings.rerank_cache_size
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # 独立线程池：超时的打分任务仍会占用线程，不能挤占查询向量化、向量检索等共用的默认线程池
+        self.max_workers = max_workers or settings.rerank_max_workers
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="rerank")
+        self._in_flight = 0
+        self.stats = {"requests": 0, "cache_hits": 0, "cache_misses": 0, "timeouts": 0, "errors": 0, "shed": 0}
+
+    def _cache_get(self, key: Tuple[str, str]) -> Optional[float]:
+        with self._cache_lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _cache_put_many(self, items: List[Tuple[Tuple[str, str], float]]):
+        with self._cache_lock:
+            for key, score in items:
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _score_and_cache(self, query: str, misses: List[Dict[str, Any]]) -> List[float]:
+        """在线程池中执行；即使调用方已超时，结果也会写入缓存供下次使用"""
+        try:
+            scores = self.scorer.score([(query, c["content"]) for c in misses])
+            self._cache_put_many([((query, c["chunk_id"]), s) for c, s in zip(misses, scores)])
+            return scores
+        finally:
+            with self._cache_lock:
+                self._in_flight -= 1
+
+    async def rerank(self, query: str, candidates: List[Dict[str, Any]], top_n: int = None) -> List[Dict[str, Any]]:
+        """对候选块重排并返回前 top_n 个
+
+        候选块为包含 chunk_id、content 的字典，按一阶段检索顺序排列。
+        超时或打分失败时按一阶段顺序截断返回。
+        """
+        top_n = top_n or settings.rerank_top_n
+        if not candidates:
+            return []
+
+        self.stats["requests"] += 1
+        scores: Dict[str, float] = {}
+        misses = []
+        for candidate in candidates:
+            cached = self._cache_get((query, candidate["chunk_id"]))
+            if cached is None:
+                misses.append(candidate)
+            else:
+                scores[candidate["chunk_id"]] = cached
+        self.stats["cache_hits"] += len(candidates) - len(misses)
+        self.stats["cache_misses"] += len(misses)
+
+        if misses:
+            # 线程全部被（可能已超时的）打分任务占用时直接回退，不排队
+            with self._cache_lock:
+                if self._in_flight >= self.max_workers:
+                    self.stats["shed"] += 1
+                    return candidates[:top_n]
+                self._in_flight += 1
+            loop = asyncio.get_running_loop()
+            try:
+                miss_scores = await asyncio.wait_for(
+                    loop.run_in_executor(self._executor, self._score_and_cache, query, misses),
+                    timeout=self.timeout
+                )
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                logger.warning(f"Rerank timed out after {self.timeout * 1000:.0f}ms, falling back to retrieval order")
+                return candidates[:top_n]
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Rerank failed, falling back to retrieval order: {e}")
+                return candidates[:top_n]
+            for candidate, score in zip(misses, miss_scores):
+                scores[candidate["chunk_id"]] = score
+
+        ranked = sorted(candidates, key=lambda c: scores[c["chunk_id"]], reverse=True)
+        return [dict(c, rerank_score=scores[c["chunk_id"]]) for c in ranked[:top_n]]
@@ -0,0 +1,98 @@
+"""启动子系统：分阶段计时、按配置挂载路由、在主进程中预加载重量级模块"""
+import importlib
+import logging
+import time
+from typing import Dict, List, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 路由模块按组挂载，只启用聊天的 worker 不导入知识库管理相关代码
+ROUTER_MODULES: Dict[str, List[Tuple[str, str]]] = {
+    "chat": [("app.api.chat", "/api")],
+    "knowledge": [
+        ("app.knowledge.api.knowledge_base", "/api/knowledge"),
+        ("app.knowledge.api.document", "/api/knowledge"),
+        ("app.knowledge.api.taxonomy", "/api/knowledge"),
+    ],
+}
+
+# 预加载到主进程的模块，fork 出的 worker 直接共享；解析库缺失时跳过
+PRELOAD_MODULES = [
+    "numpy",
+    "app.knowledge.api.knowledge_base",
+    "app.knowledge.api.document",
+    "app.knowledge.api.taxonomy",
+    "PyPDF2",
+    "docx",
+]
+
+
+class StartupTimer:
+    """记录启动各阶段耗时，每个阶段从上一个检查点计起"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases: Dict[str, float] = {}
+        self.ready_ms = None
+
+    def reset(self, name: str = None):
+        """重新开始计时（如 fork 后的 worker），保留的阶段记为 name"""
+        self.started = self._last = time.perf_counter()
+        self.phases = {name: 0.0} if name else {}
+        self.ready_ms = None
+
+    def checkpoint(self, name: str):
+        now = time.perf_counter()
+        self.phases[name] = round((now - self._last) * 1000, 1)
+        self._last = now
+
+    def ready(self):
+        self.ready_ms = round((time.perf_counter() - self.started) * 1000, 1)
+        phases = ", ".join(f"{name}={ms}ms" for name, ms in self.phases.items())
+        logger.info(f"Startup ready in {self.ready_ms}ms ({phases})")
+
+    @property
+    def stats(self) -> Dict[str, object]:
+        return {"phases_ms": dict(self.phases), "ready_ms": self.ready_ms}
+
+
+startup_timer = StartupTimer()
+
+
+def include_routers(app):
+    """挂载 API_MODULES 中启用的路由组"""
+    for group in settings.api_modules:
+        group = group.strip()
+        if not group:
+            continue
+        if group not in ROUTER_MODULES:
+            raise ValueError(f"未知的路由模块: {group}")
+        for module_name, prefix in ROUTER_MODULES[group]:
+            module = importlib.import_module(module_name)
+            app.include_router(module.router, prefix=prefix)
+
+
+def preload():
+    """在 fork worker 之前的主进程中导入重量级模块，PRELOAD_MODELS 开启时同时加载模型
+
+    只加载不推理，推理线程池在各 worker 中首次使用时创建。
+    """
+    for module_name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            logger.info(f"Preload skipped {module_name}: not installed")
+    startup_timer.checkpoint("preload_modules")
+
+    if settings.preload_models:
+        from app.services.embedding_service import get_embedding_service
+        get_embedding_service().load()
+        if settings.rerank_enabled:
+            from app.api.chat import chat_service
+            scorer = chat_service.rerank_service.scorer
+            if hasattr(scorer, "load"):
+                scorer.load()
+        startup_timer.checkpoint("preload_models")
@@ -0,0 +1,45 @@
+"""gunicorn 配置
+
+主进程预加载应用和重量级模块、执行一次数据库迁移，worker 通过 fork 共享已导入的模块，
+启动时无需重复导入和建表。
+
+各 worker 的进程内状态通过共享存储保持一致：向量以追加段文件写入并加文件锁，读取方发现版本变化后
+只加载新增的段和删除记录；过滤索引在向量存储变化或超过刷新间隔后重建；文档处理进度由每个 worker
+对每个知识库共享一次轮询，从 processing_tasks 表补充其他 worker 的任务；文档块缓存通过失效日志同步。
+以上都依赖同一主机上的共享上传目录。
+
+用法:
+    gunicorn app.main:app -c gunicorn.conf.py
+"""
+import asyncio
+import os
+
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('API_PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+
+def on_starting(server):
+    from app.database import engine
+    from app.migrations import migrate
+    from app.startup import preload, startup_timer
+
+    preload()
+
+    async def run_migrations():
+        try:
+            await migrate()
+        finally:
+            # 不把连接池带入 fork 出的 worker
+            await engine.dispose()
+
+    asyncio.run(run_migrations())
+    startup_timer.checkpoint("migrate")
+    server.log.info(f"Master startup phases: {startup_timer.stats['phases_ms']}")
+
+
+def post_fork(server, worker):
+    from app.startup import startup_timer
+
+    startup_timer.reset("fork")
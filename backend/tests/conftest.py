@@ -0,0 +1,46 @@
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import Base
+import app.knowledge.models.database_models  # noqa: F401  注册全部模型
+from app.knowledge.services import chunk_cache, filter_index, vector_store
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    """每个测试使用独立的上传目录，并清空进程内的向量存储、过滤索引和块缓存"""
+    path = tmp_path / "uploads"
+    monkeypatch.setattr(settings, "upload_base_dir", str(path))
+    vector_store._stores.clear()
+    filter_index._indexes.clear()
+    monkeypatch.setattr(chunk_cache, "_chunk_cache", None)
+    yield path
+    vector_store._stores.clear()
+    filter_index._indexes.clear()
+
+
+@pytest.fixture
+def database(tmp_path):
+    """返回打开 SQLite 测试库的异步上下文管理器，产出会话工厂"""
+    @asynccontextmanager
+    async def open_database():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def enable_foreign_keys(dbapi_connection, _):
+            # 与 MySQL 一致地执行外键级联删除
+            dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        try:
+            yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        finally:
+            await engine.dispose()
+
+    return open_database
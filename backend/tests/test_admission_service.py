@@ -0,0 +1,107 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.config import settings
+from app.knowledge.services.ingestion_service import IngestionPipeline
+from app.services.admission_service import AdmissionController, InMemoryTokenBucket, get_tenant_key
+
+
+def make_controller(chat_rate=1.0, chat_burst=2.0, concurrency=1):
+    controller = AdmissionController(bucket=InMemoryTokenBucket())
+    controller.queue_budget = 0.02
+    controller.pools["chat"].update(rate=chat_rate, burst=chat_burst, semaphore=asyncio.Semaphore(concurrency))
+    return controller
+
+
+async def admit_once(controller, tenant_key, session_id=None, kb_ids=()):
+    async with controller.admit("chat", tenant_key, kb_ids, session_id):
+        pass
+
+
+def test_token_bucket_allows_burst_then_waits():
+    bucket = InMemoryTokenBucket()
+
+    async def run():
+        return [await bucket.consume("k", rate=1.0, burst=2.0) for _ in range(3)]
+
+    waits = asyncio.run(run())
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] > 0
+
+
+def test_fresh_session_ids_do_not_bypass_tenant_bucket():
+    controller = make_controller()
+
+    async def run():
+        await admit_once(controller, "ip:1.2.3.4", "s1")
+        await admit_once(controller, "ip:1.2.3.4", "s2")
+        await admit_once(controller, "ip:1.2.3.4", "s3")
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(run())
+    assert exc.value.status_code == 429
+    assert "Retry-After" in exc.value.headers
+    assert controller.stats["chat"]["rejected_tenant"] == 1
+
+
+def test_session_bucket_is_charged_in_addition_to_tenant():
+    controller = make_controller(chat_burst=2.0)
+
+    async def run():
+        await admit_once(controller, "ip:a", "shared")
+        await admit_once(controller, "ip:b", "shared")
+        await admit_once(controller, "ip:c", "shared")
+
+    with pytest.raises(HTTPException):
+        asyncio.run(run())
+    assert controller.stats["chat"]["rejected_session"] == 1
+
+
+def test_queue_budget_sheds_when_saturated():
+    controller = make_controller(chat_burst=10.0, concurrency=1)
+
+    async def run():
+        async with controller.pools["chat"]["semaphore"]:
+            await admit_once(controller, "ip:a")
+
+    with pytest.raises(HTTPException):
+        asyncio.run(run())
+    assert controller.stats["chat"]["shed"] == 1
+    assert controller.stats["chat"]["in_flight"] == 0
+
+
+def test_tenant_key_ignores_session_and_prefers_api_key(monkeypatch):
+    monkeypatch.setattr(settings, "admission_api_keys", ["secret"])
+    request = SimpleNamespace(headers={}, client=SimpleNamespace(host="10.0.0.1"))
+    assert get_tenant_key(request) == "ip:10.0.0.1"
+    request.headers["X-API-Key"] = "secret"
+    assert get_tenant_key(request).startswith("key:")
+
+
+def test_unregistered_api_keys_fall_back_to_client_address(monkeypatch):
+    monkeypatch.setattr(settings, "admission_api_keys", ["secret"])
+    keys = {
+        get_tenant_key(SimpleNamespace(headers={"X-API-Key": f"random-{i}"}, client=SimpleNamespace(host="10.0.0.1")))
+        for i in range(3)
+    }
+    assert keys == {"ip:10.0.0.1"}
+
+
+def test_background_ingestion_does_not_take_request_slots():
+    controller = make_controller()
+    controller.pools["ingest"]["semaphore"] = asyncio.Semaphore(1)
+    pipeline = IngestionPipeline(session_factory=None, embedding_service=object())
+
+    async def run():
+        # 后台处理占满自己的名额时，导入请求仍可获准
+        for _ in range(settings.ingestion_max_concurrency):
+            await pipeline._slots.acquire()
+        async with controller.admit("ingest", "ip:a"):
+            pass
+
+    asyncio.run(run())
+    assert controller.stats["ingest"]["shed"] == 0
+    assert controller.stats["ingest"]["admitted"] == 1
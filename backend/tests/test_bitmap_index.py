@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from app.knowledge.services.bitmap_index import ARRAY_LIMIT, RoaringBitmap
+
+
+def random_values(rng, count, high=300_000):
+    return set(rng.integers(0, high, size=count).tolist())
+
+
+def assert_matches(bitmap, values):
+    assert bitmap.to_array().tolist() == sorted(values)
+    assert len(bitmap) == len(values)
+
+
+@pytest.mark.parametrize("count", [0, 10, ARRAY_LIMIT + 1, 50_000])
+def test_set_operations_match_python_sets(count):
+    rng = np.random.default_rng(count)
+    left_values, right_values = random_values(rng, count), random_values(rng, 3000)
+    left, right = RoaringBitmap(left_values), RoaringBitmap(right_values)
+
+    assert_matches(left, left_values)
+    assert_matches(left & right, left_values & right_values)
+    assert_matches(left | right, left_values | right_values)
+    assert_matches(left - right, left_values - right_values)
+    assert_matches(right - left, right_values - left_values)
+
+
+def test_containers_switch_between_array_and_words():
+    bitmap = RoaringBitmap(range(ARRAY_LIMIT))
+    assert bitmap.containers[0].dtype == np.uint16
+    bitmap.add_many([ARRAY_LIMIT])
+    assert bitmap.containers[0].dtype == np.uint64
+    bitmap.remove_many([0, 1])
+    assert bitmap.containers[0].dtype == np.uint16
+    assert_matches(bitmap, set(range(2, ARRAY_LIMIT + 1)))
+
+
+def test_membership_and_remove():
+    values = {0, 5, 65_535, 65_536, 1 << 20}
+    bitmap = RoaringBitmap(values)
+    assert all(value in bitmap for value in values)
+    assert 6 not in bitmap and (1 << 20) + 1 not in bitmap and (1 << 30) not in bitmap
+
+    bitmap.remove_many([65_536, 7])
+    assert_matches(bitmap, values - {65_536})
+    assert 1 not in bitmap.containers
+
+
+def test_copy_is_independent():
+    bitmap = RoaringBitmap(range(100))
+    clone = bitmap.copy()
+    clone.remove_many(range(50))
+    assert len(bitmap) == 100 and len(clone) == 50
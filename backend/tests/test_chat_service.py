@@ -0,0 +1,126 @@
+import asyncio
+import time
+import uuid
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.api import chat
+from app.config import settings
+from app.knowledge.services import vector_store
+from app.knowledge.services.vector_store import VectorStore
+from app.models import SearchRequest
+from app.services import chat_service as chat_service_module
+from app.services.chat_service import ChatService
+from app.services.embedding_service import QueryEmbeddingBatcher
+
+QUERY = np.eye(8, dtype=np.float32)[0]
+
+
+class FakeEncoder:
+    def encode(self, texts):
+        return np.tile(QUERY, (len(texts), 1))
+
+
+def vector(similarity):
+    """与查询向量余弦相似度为 similarity 的单位向量"""
+    v = np.zeros(8, dtype=np.float32)
+    v[0], v[1] = similarity, np.sqrt(1 - similarity ** 2)
+    return v
+
+
+def make_service():
+    service = ChatService()
+    service.query_embedder = QueryEmbeddingBatcher(FakeEncoder(), max_batch_size=1, max_wait_ms=0)
+    return service
+
+
+def add_knowledge_base(service, similarities, load=True):
+    """创建内存中的知识库，返回 (kb_id, chunk_ids)；load=False 时只写入磁盘不加载"""
+    kb_id = str(uuid.uuid4())
+    chunk_ids = [str(uuid.uuid4()) for _ in similarities]
+    store = vector_store.get_vector_store(kb_id) if load else VectorStore(kb_id)
+    store.append(chunk_ids, np.vstack([vector(s) for s in similarities]))
+    service.chunk_cache._remember({chunk_id: ("doc", f"content {chunk_id}") for chunk_id in chunk_ids})
+    return kb_id, chunk_ids
+
+
+def test_merges_on_raw_cosine_across_knowledge_bases(upload_dir):
+    service = make_service()
+    relevant, relevant_ids = add_knowledge_base(service, [0.9, 0.8])
+    # 无关知识库的最佳结果不会因逐库归一化而排到相关结果之前
+    unrelated, unrelated_ids = add_knowledge_base(service, [0.3])
+    single, single_ids = add_knowledge_base(service, [0.5])
+
+    hits, skipped = asyncio.run(service.search(None, "q", [unrelated, relevant, single]))
+    assert skipped == []
+    assert [hit["chunk_id"] for hit in hits] == relevant_ids + single_ids + unrelated_ids
+    assert hits[0]["score"] == pytest.approx(0.9, abs=1e-5)
+    assert hits[-1]["score"] == pytest.approx(0.3, abs=1e-5)
+
+
+def test_min_score_drops_weak_hits(upload_dir, monkeypatch):
+    monkeypatch.setattr(settings, "federated_min_score", 0.5)
+    service = make_service()
+    kb_id, chunk_ids = add_knowledge_base(service, [0.9, 0.2])
+
+    hits, _ = asyncio.run(service.search(None, "q", [kb_id]))
+    assert [hit["chunk_id"] for hit in hits] == chunk_ids[:1]
+
+
+def test_failed_knowledge_base_is_skipped(upload_dir):
+    service = make_service()
+    healthy, healthy_ids = add_knowledge_base(service, [0.7])
+    broken, _ = add_knowledge_base(service, [0.9])
+
+    def fail(*args):
+        raise RuntimeError("corrupt index")
+
+    vector_store.get_loaded_vector_store(broken).search = fail
+    hits, skipped = asyncio.run(service.search(None, "q", [healthy, broken]))
+    assert skipped == [broken]
+    assert [hit["chunk_id"] for hit in hits] == healthy_ids
+    assert service.search_stats["skipped_error"] == 1
+
+
+def test_slow_load_is_skipped_then_served_from_background(upload_dir, monkeypatch):
+    monkeypatch.setattr(settings, "federated_search_timeout_ms", 50)
+    service = make_service()
+    loaded, loaded_ids = add_knowledge_base(service, [0.6])
+    cold, cold_ids = add_knowledge_base(service, [0.8], load=False)
+    loads = []
+
+    def slow_load(kb_id):
+        loads.append(kb_id)
+        time.sleep(0.2)
+        return vector_store.get_vector_store(kb_id)
+
+    monkeypatch.setattr(chat_service_module, "get_vector_store", slow_load)
+
+    async def run():
+        first = await service.search(None, "q", [loaded, cold])
+        # 超时后加载仍在后台进行，完成后的检索直接使用已加载的向量存储
+        await asyncio.sleep(0.3)
+        second = await service.search(None, "q", [loaded, cold])
+        return first, second
+
+    (first_hits, first_skipped), (second_hits, second_skipped) = asyncio.run(run())
+    assert first_skipped == [cold]
+    assert [hit["chunk_id"] for hit in first_hits] == loaded_ids
+    assert service.search_stats["skipped_timeout"] == 1
+    assert second_skipped == []
+    assert [hit["chunk_id"] for hit in second_hits] == cold_ids + loaded_ids
+    assert loads == [cold]
+
+
+def test_search_endpoint_rejects_empty_and_oversized_requests(monkeypatch):
+    monkeypatch.setattr(settings, "federated_max_knowledge_bases", 2)
+    for kb_ids in ([], ["a", "b", "c"]):
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(chat.search(SearchRequest(query="q", knowledge_base_ids=kb_ids), db=None))
+        assert exc.value.status_code == 400
+    # 重复的知识库ID去重后再计数
+    monkeypatch.setattr(chat.chat_service, "search", lambda *args: asyncio.sleep(0, ([], [])))
+    response = asyncio.run(chat.search(SearchRequest(query="q", knowledge_base_ids=["a", "a", "b"]), db=None))
+    assert response.results == []
@@ -0,0 +1,69 @@
+import asyncio
+import os
+
+from app.knowledge.services import chunk_cache
+from app.knowledge.services.chunk_cache import ChunkContentCache, CompressedBlobStore
+
+
+def make_cache(tmp_path):
+    return ChunkContentCache(max_bytes=1 << 20, cache_dir=tmp_path / "chunk_cache", disk_enabled=True)
+
+
+def log_position(cache):
+    return cache._log_inode, cache._log_offset
+
+
+def test_late_disk_write_after_local_invalidation_is_discarded(tmp_path):
+    cache = make_cache(tmp_path)
+    position = log_position(cache)
+    asyncio.run(cache.invalidate(["chunk-a"]))
+
+    cache._write_disk({"chunk-a": ("doc-1", "旧内容"), "chunk-b": ("doc-1", "内容")}, position)
+    assert set(cache.disk.get_many(["chunk-a", "chunk-b"])) == {"chunk-b"}
+
+    cache._remember({"chunk-a": ("doc-1", "旧内容")})
+    assert cache._lookup_memory(["chunk-a"]) == {}
+
+
+def test_late_disk_write_after_other_worker_invalidation_is_removed(tmp_path):
+    cache, other = make_cache(tmp_path), make_cache(tmp_path)
+    position = log_position(cache)
+    # 读取数据库之后、写入磁盘之前，其他 worker 使该块失效
+    asyncio.run(other.invalidate(["chunk-a"]))
+
+    cache._write_disk({"chunk-a": ("doc-1", "旧内容"), "chunk-b": ("doc-1", "内容")}, position)
+    assert set(cache.disk.get_many(["chunk-a", "chunk-b"])) == {"chunk-b"}
+
+
+def test_rotated_log_is_read_to_the_end(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunk_cache, "INVALIDATION_LOG_MAX_BYTES", 10)
+    reader, writer = make_cache(tmp_path), make_cache(tmp_path)
+    reader._remember({"chunk-a": ("doc-1", "a"), "chunk-b": ("doc-1", "b"), "chunk-c": ("doc-1", "c")})
+
+    asyncio.run(writer.invalidate(["chunk-a"]))
+    reader._sync_invalidations()
+    asyncio.run(writer.invalidate(["chunk-b"]))
+    # 超过大小后轮转，chunk-b 留在旧文件中，chunk-c 写入新文件
+    asyncio.run(writer.invalidate(["chunk-c"]))
+    assert (tmp_path / "chunk_cache" / "invalidations.log.1").exists()
+
+    reader._remember({"chunk-d": ("doc-1", "d")})
+    reader._sync_invalidations()
+    assert set(reader._lookup_memory(["chunk-a", "chunk-b", "chunk-c", "chunk-d"])) == {"chunk-d"}
+
+
+def test_disk_cache_evicts_oldest_entries_over_byte_cap(tmp_path):
+    store = CompressedBlobStore(tmp_path / "chunk_cache", max_bytes=1 << 20)
+    store.put_many({"aa-first": ("doc-1", "x" * 200)})
+    # 四个大小相同的块超出上限，淘汰一个即可降到上限的 90% 以下
+    store.max_bytes = store._usage * 4 - 1
+    os.utime(store._path("aa-first"), (1, 1))
+    store.put_many({"bb-second": ("doc-1", "y" * 200)})
+    os.utime(store._path("bb-second"), (2, 2))
+    # 读取命中会更新修改时间，first 成为最近使用的块
+    assert set(store.get_many(["aa-first"])) == {"aa-first"}
+
+    store.put_many({"cc-third": ("doc-1", "z" * 200), "dd-fourth": ("doc-1", "w" * 200)})
+    remaining = store.get_many(["aa-first", "bb-second", "cc-third", "dd-fourth"])
+    assert set(remaining) == {"aa-first", "cc-third", "dd-fourth"}
+    assert store._usage <= store.max_bytes
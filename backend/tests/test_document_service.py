@@ -0,0 +1,90 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.knowledge.models.database_models import Document, KnowledgeBase, ProcessingTask, User
+from app.knowledge.services.document_service import DocumentService
+
+
+async def create_document(db, status):
+    kb_id, doc_id = str(uuid.uuid4()), str(uuid.uuid4())
+    db.add(User(id="admin-001", username="admin", email="admin@example.com", password_hash="x"))
+    db.add(KnowledgeBase(id=kb_id, name="产品知识库", owner_id="admin-001"))
+    db.add(Document(id=doc_id, title="退款", knowledge_base_id=kb_id, file_path="source.txt",
+                    file_size=12, doc_type=".txt", status=status))
+    await db.commit()
+    return doc_id
+
+
+def test_process_document_starts_only_once(upload_dir, database):
+    async def run():
+        async with database() as session_factory:
+            async with session_factory() as db:
+                doc_id = await create_document(db, "failed")
+            async with session_factory() as first, session_factory() as second:
+                started = [
+                    await DocumentService(first).process_document(doc_id),
+                    await DocumentService(second).process_document(doc_id),
+                ]
+                document = await DocumentService(first).get_document(doc_id)
+            return started, document.status
+
+    started, status = asyncio.run(run())
+    assert started == [True, False]
+    assert status == "parsing"
+
+
+def test_process_document_rejects_missing_document(upload_dir, database):
+    async def run():
+        async with database() as session_factory, session_factory() as db:
+            return await DocumentService(db).process_document(str(uuid.uuid4()))
+
+    assert asyncio.run(run()) is False
+
+
+def test_process_document_reclaims_stale_claims(upload_dir, database, monkeypatch):
+    monkeypatch.setattr(settings, "document_processing_timeout_seconds", 60)
+
+    async def run():
+        async with database() as session_factory, session_factory() as db:
+            doc_id = await create_document(db, "vectorizing")
+            service = DocumentService(db)
+            # 刚更新过的处理中文档不能被重新认领
+            await service.update_document_status(doc_id, "vectorizing")
+            fresh = await service.process_document(doc_id)
+
+            # 处理进程退出后文档停留在处理中，超时后可以重新认领
+            old = datetime.now(timezone.utc) - timedelta(minutes=5)
+            task_id = str(uuid.uuid4())
+            db.add(ProcessingTask(id=task_id, document_id=doc_id, task_type="vectorize", status="running",
+                                  progress=40, started_at=old, updated_at=old))
+            await db.execute(update(Document).where(Document.id == doc_id).values(updated_at=old))
+            await db.commit()
+            stale = await service.process_document(doc_id)
+            task = (await db.execute(select(ProcessingTask).where(ProcessingTask.id == task_id))).scalar_one()
+            await db.refresh(task)
+            return fresh, stale, task.status
+
+    fresh, stale, task_status = asyncio.run(run())
+    assert (fresh, stale) == (False, True)
+    assert task_status == "failed"
+
+
+def test_process_document_keeps_claims_with_recent_progress(upload_dir, database, monkeypatch):
+    monkeypatch.setattr(settings, "document_processing_timeout_seconds", 60)
+
+    async def run():
+        async with database() as session_factory, session_factory() as db:
+            doc_id = await create_document(db, "vectorizing")
+            old = datetime.now(timezone.utc) - timedelta(minutes=5)
+            # 长时间向量化阶段：文档状态未变，但任务进度仍在写入
+            db.add(ProcessingTask(id=str(uuid.uuid4()), document_id=doc_id, task_type="vectorize", status="running",
+                                  progress=40, started_at=old, updated_at=datetime.now(timezone.utc)))
+            await db.execute(update(Document).where(Document.id == doc_id).values(updated_at=old))
+            await db.commit()
+            return await DocumentService(db).process_document(doc_id)
+
+    assert asyncio.run(run()) is False
@@ -0,0 +1,51 @@
+import asyncio
+
+import numpy as np
+
+from app.services.embedding_service import QueryEmbeddingBatcher
+
+
+class FakeEncoder:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def encode(self, texts):
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        self.batches.append(len(texts))
+        return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_concurrent_queries_share_batches():
+    encoder = FakeEncoder()
+    batcher = QueryEmbeddingBatcher(encoder, max_batch_size=8, max_wait_ms=5)
+
+    async def run():
+        return await asyncio.gather(*(batcher.embed("q" * (i + 1)) for i in range(20)))
+
+    vectors = asyncio.run(run())
+    assert encoder.batches == [8, 8, 4]
+    assert [int(v[0]) for v in vectors] == list(range(1, 21))
+    stats = batcher.get_stats()
+    assert stats["batches"] == 3
+    assert stats["items"] == 20
+    assert not batcher._tasks
+
+
+def test_single_query_flushes_after_wait():
+    encoder = FakeEncoder()
+    batcher = QueryEmbeddingBatcher(encoder, max_batch_size=8, max_wait_ms=1)
+    vector = asyncio.run(batcher.embed("hello"))
+    assert encoder.batches == [1]
+    assert vector[0] == 5.0
+
+
+def test_encoder_failure_propagates_to_callers():
+    batcher = QueryEmbeddingBatcher(FakeEncoder(fail=True), max_batch_size=4, max_wait_ms=1)
+
+    async def run():
+        return await asyncio.gather(batcher.embed("a"), batcher.embed("b"), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
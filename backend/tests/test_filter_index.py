@@ -0,0 +1,122 @@
+import asyncio
+import uuid
+
+import numpy as np
+
+from app.knowledge.models.database_models import (
+    Category, Document, DocumentCategory, DocumentChunk, DocumentTag, KnowledgeBase, Tag, User
+)
+from app.knowledge.services import filter_index
+from app.knowledge.services.filter_index import FilterIndex, get_filter_index
+from app.knowledge.services.vector_store import VectorStore, get_vector_store
+from app.models import RetrievalFilter
+
+
+async def create_knowledge_base(db):
+    """三个文档各两个块：faq 文档属于 billing 分类，legacy 文档没有分类，失败文档属于 billing 分类"""
+    kb_id = str(uuid.uuid4())
+    db.add(User(id="admin-001", username="admin", email="admin@example.com", password_hash="x"))
+    db.add(KnowledgeBase(id=kb_id, name="产品知识库", owner_id="admin-001"))
+    await db.flush()
+    faq = Tag(id=str(uuid.uuid4()), name="faq", knowledge_base_id=kb_id)
+    legacy = Tag(id=str(uuid.uuid4()), name="legacy", knowledge_base_id=kb_id)
+    billing = Category(id=str(uuid.uuid4()), name="billing", knowledge_base_id=kb_id)
+    db.add_all([faq, legacy, billing])
+
+    docs = {}
+    for name, status in (("faq", "completed"), ("legacy", "completed"), ("broken", "failed")):
+        doc_id = str(uuid.uuid4())
+        db.add(Document(id=doc_id, title=name, knowledge_base_id=kb_id, file_path=f"{name}.txt",
+                        file_size=12, doc_type=".txt", status=status))
+        docs[name] = (doc_id, [str(uuid.uuid4()) for _ in range(2)])
+    await db.flush()
+    for doc_id, chunk_ids in docs.values():
+        db.add_all(DocumentChunk(id=chunk_id, document_id=doc_id, content="x", chunk_index=i)
+                   for i, chunk_id in enumerate(chunk_ids))
+    db.add_all([
+        DocumentTag(id=str(uuid.uuid4()), document_id=docs["faq"][0], tag_id=faq.id),
+        DocumentTag(id=str(uuid.uuid4()), document_id=docs["legacy"][0], tag_id=legacy.id),
+        DocumentCategory(id=str(uuid.uuid4()), document_id=docs["faq"][0], category_id=billing.id),
+        DocumentCategory(id=str(uuid.uuid4()), document_id=docs["broken"][0], category_id=billing.id),
+    ])
+    await db.commit()
+
+    chunk_ids = [chunk_id for _, ids in docs.values() for chunk_id in ids]
+    VectorStore(kb_id).append(chunk_ids, np.eye(8, dtype=np.float32)[:len(chunk_ids)])
+    return kb_id, docs, {"faq": faq.id, "legacy": legacy.id, "billing": billing.id}
+
+
+def ordinals(index, **filters):
+    return index.resolve(RetrievalFilter(**filters)).to_array().tolist()
+
+
+def test_resolve_by_name_and_id(upload_dir, database):
+    async def run():
+        async with database() as session_factory, session_factory() as db:
+            kb_id, docs, ids = await create_knowledge_base(db)
+            index = FilterIndex(kb_id)
+            await index.build(db)
+            return index, ids
+
+    index, ids = asyncio.run(run())
+    assert ordinals(index) == [0, 1, 2, 3, 4, 5]
+    assert ordinals(index, tags=["faq"]) == ordinals(index, tags=[ids["faq"]]) == [0, 1]
+    assert ordinals(index, tags=["faq", "legacy"]) == [0, 1, 2, 3]
+    # 字段之间取交集，排除项做差集
+    assert ordinals(index, categories=["billing"], statuses=["completed"]) == [0, 1]
+    assert ordinals(index, categories=[ids["billing"]], exclude_tags=["faq"]) == [4, 5]
+    assert ordinals(index, exclude_categories=["billing"]) == [2, 3]
+    assert ordinals(index, exclude_statuses=["failed"], exclude_tags=[ids["legacy"]]) == [0, 1]
+    assert ordinals(index, tags=["unknown"]) == []
+
+
+def test_incremental_updates(upload_dir, database):
+    async def run():
+        async with database() as session_factory, session_factory() as db:
+            kb_id, docs, _ = await create_knowledge_base(db)
+            index = FilterIndex(kb_id)
+            await index.build(db)
+            return index, docs
+
+    index, docs = asyncio.run(run())
+    faq, broken = docs["faq"][0], docs["broken"][0]
+
+    index.set_document_status(broken, "completed")
+    assert ordinals(index, statuses=["completed"]) == [0, 1, 2, 3, 4, 5]
+    assert ordinals(index, statuses=["failed"]) == []
+
+    # 重新处理后块序号变化，标签/分类/状态关联保留
+    index.replace_document_chunks(faq, [6, 7, 8])
+    assert ordinals(index, tags=["faq"]) == [6, 7, 8]
+    assert ordinals(index, categories=["billing"], statuses=["completed"]) == [4, 5, 6, 7, 8]
+
+    index.remove_document(faq)
+    assert ordinals(index, tags=["faq"]) == []
+    assert ordinals(index) == [2, 3, 4, 5]
+
+
+def test_rebuilds_after_store_changes(upload_dir, database, monkeypatch):
+    async def run():
+        async with database() as session_factory:
+            monkeypatch.setattr(filter_index, "AsyncSessionLocal", session_factory)
+            async with session_factory() as db:
+                kb_id, docs, _ = await create_knowledge_base(db)
+                first = await get_filter_index(db, kb_id)
+                assert await get_filter_index(db, kb_id) is first
+
+                # 其他 worker 追加了块：旧索引继续使用，后台重建后纳入新块
+                doc_id = docs["legacy"][0]
+                chunk_id = str(uuid.uuid4())
+                db.add(DocumentChunk(id=chunk_id, document_id=doc_id, content="x", chunk_index=2))
+                await db.commit()
+                VectorStore(kb_id).append([chunk_id], np.eye(8, dtype=np.float32)[6:7])
+                get_vector_store(kb_id)
+                assert await get_filter_index(db, kb_id) is first
+                while kb_id in filter_index._refreshing:
+                    await asyncio.sleep(0.01)
+                return first, await get_filter_index(db, kb_id)
+
+    first, rebuilt = asyncio.run(run())
+    assert rebuilt is not first
+    assert ordinals(first, tags=["legacy"]) == [2, 3]
+    assert ordinals(rebuilt, tags=["legacy"]) == [2, 3, 6]
@@ -0,0 +1,120 @@
+import asyncio
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from app.knowledge.models.database_models import ChatSession, KnowledgeBase, Message, User
+from app.services.message_logger import MessageLogger
+
+RESPONSE = {"type": "text", "content": {"text": "您好"}}
+
+
+async def create_knowledge_base(db):
+    kb_id = str(uuid.uuid4())
+    db.add(User(id="admin-001", username="admin", email="admin@example.com", password_hash="x"))
+    db.add(KnowledgeBase(id=kb_id, name="产品知识库", owner_id="admin-001"))
+    await db.commit()
+    return kb_id
+
+
+def test_flush_writes_sessions_and_messages(database):
+    async def run():
+        async with database() as session_factory:
+            async with session_factory() as db:
+                kb_id = await create_knowledge_base(db)
+            message_logger = MessageLogger(session_factory, batch_size=3, flush_interval_ms=50, max_buffer=100)
+            message_logger.log_turn("session-1", "你好", RESPONSE, kb_id)
+            message_logger.log_turn("session-1", "退款", RESPONSE, kb_id)
+            await message_logger.flush()
+            async with session_factory() as db:
+                sessions = (await db.execute(select(ChatSession))).scalars().all()
+                messages = (await db.execute(select(Message))).scalars().all()
+            return kb_id, sessions, messages, message_logger.stats
+
+    kb_id, sessions, messages, stats = asyncio.run(run())
+    assert [(s.id, s.knowledge_base_id) for s in sessions] == [("session-1", kb_id)]
+    assert len(messages) == 4
+    assert stats["flushed_messages"] == 4 and stats["dropped"] == 0
+
+
+def test_unknown_knowledge_base_is_stored_as_null(database):
+    async def run():
+        async with database() as session_factory:
+            message_logger = MessageLogger(session_factory, batch_size=10, flush_interval_ms=50, max_buffer=100)
+            message_logger.log_turn("session-1", "你好", RESPONSE, "no-such-kb")
+            await message_logger.flush()
+            async with session_factory() as db:
+                session = (await db.execute(select(ChatSession))).scalar_one()
+                message_count = len((await db.execute(select(Message))).scalars().all())
+            return session, message_count, message_logger.stats
+
+    session, message_count, stats = asyncio.run(run())
+    assert session.knowledge_base_id is None
+    assert message_count == 2
+    assert stats["failures"] == 0
+
+
+def test_data_error_drops_only_bad_session(database):
+    async def run():
+        async with database() as session_factory:
+            message_logger = MessageLogger(session_factory, batch_size=10, flush_interval_ms=50, max_buffer=100)
+            message_logger.log_turn("session-1", "你好", RESPONSE)
+            # 会话不存在的消息违反外键约束，使整批写入失败
+            message_logger._messages.append({
+                "id": str(uuid.uuid4()), "session_id": "missing-session", "sender_type": "user",
+                "content": "孤立消息", "message_type": "text", "message_metadata": None, "created_at": None
+            })
+            await message_logger.flush()
+            async with session_factory() as db:
+                messages = (await db.execute(select(Message))).scalars().all()
+            return messages, message_logger.stats
+
+    messages, stats = asyncio.run(run())
+    assert sorted(m.session_id for m in messages) == ["session-1", "session-1"]
+    assert stats["failures"] == 1
+    assert stats["dropped"] == 1
+    assert stats["buffered"] == 0
+    assert (stats["flushed_messages"], stats["flushed_sessions"]) == (2, 1)
+
+
+class UnavailableSession:
+    """模拟数据库不可用：执行任何语句都抛出 OperationalError"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, *args, **kwargs):
+        raise OperationalError("INSERT", {}, Exception("Can't connect to MySQL server"))
+
+
+def test_outage_keeps_messages_buffered(database):
+    async def run():
+        message_logger = MessageLogger(UnavailableSession, batch_size=10, flush_interval_ms=50, max_buffer=5)
+        message_logger.log_turn("session-1", "你好", RESPONSE)
+        message_logger.log_turn("session-2", "退款", RESPONSE)
+        await message_logger.flush()
+        await message_logger.flush()
+        during_outage = dict(message_logger.stats)
+
+        # 超过 max_buffer 时只丢弃最旧的消息
+        message_logger.log_turn("session-3", "发票", RESPONSE)
+        await message_logger.flush()
+        after_overflow = dict(message_logger.stats)
+
+        async with database() as session_factory:
+            message_logger.session_factory = session_factory
+            await message_logger.flush()
+            async with session_factory() as db:
+                messages = (await db.execute(select(Message))).scalars().all()
+        return during_outage, after_overflow, messages, message_logger.stats
+
+    during_outage, after_overflow, messages, stats = asyncio.run(run())
+    assert during_outage["buffered"] == 4
+    assert (during_outage["dropped"], during_outage["flushed_sessions"], during_outage["failures"]) == (0, 0, 2)
+    assert (after_overflow["buffered"], after_overflow["dropped"]) == (5, 1)
+    assert len(messages) == 5
+    assert (stats["buffered"], stats["flushed_messages"], stats["flushed_sessions"]) == (0, 5, 3)
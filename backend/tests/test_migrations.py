@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import migrations
+from app.database import Base
+from app.migrations import _missing_columns
+
+
+def test_missing_columns_are_reported(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        assert _missing_columns(conn) == []
+        conn.execute(text("ALTER TABLE processing_tasks DROP COLUMN error_message"))
+        assert _missing_columns(conn) == ["processing_tasks.error_message"]
+    engine.dispose()
+
+
+def test_check_schema_only_reads_version(tmp_path, monkeypatch, caplog):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'schema.db'}")
+    monkeypatch.setattr(migrations, "engine", engine)
+
+    def reflect(conn):
+        raise AssertionError("workers must not reflect table columns")
+
+    monkeypatch.setattr(migrations, "_missing_columns", reflect)
+
+    async def run():
+        try:
+            await migrations.check_schema()
+            outdated = [record.getMessage() for record in caplog.records]
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.execute(insert(migrations.schema_migrations).values(
+                    version=migrations.SCHEMA_VERSION, applied_at=datetime.now(timezone.utc)
+                ))
+            caplog.clear()
+            await migrations.check_schema()
+            return outdated
+        finally:
+            await engine.dispose()
+
+    with caplog.at_level(logging.WARNING):
+        outdated = asyncio.run(run())
+    assert len(outdated) == 1 and "version 0" in outdated[0]
+    assert not caplog.records
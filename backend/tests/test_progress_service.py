@@ -0,0 +1,91 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.knowledge.models.database_models import Document, KnowledgeBase, ProcessingTask, User
+from app.knowledge.services.progress_service import ProgressBroker, TaskEventPoller, TaskProgress
+
+
+async def create_document(db):
+    kb_id, doc_id = str(uuid.uuid4()), str(uuid.uuid4())
+    db.add(User(id="admin-001", username="admin", email="admin@example.com", password_hash="x"))
+    db.add(KnowledgeBase(id=kb_id, name="产品知识库", owner_id="admin-001"))
+    db.add(Document(id=doc_id, title="退款", knowledge_base_id=kb_id, file_path="source.txt",
+                    file_size=12, doc_type=".txt", status="parsing"))
+    await db.commit()
+    return kb_id, doc_id
+
+
+def test_progress_is_written_on_separate_session(database):
+    async def run():
+        async with database() as session_factory, session_factory() as db:
+            kb_id, doc_id = await create_document(db)
+            task = TaskProgress(kb_id, doc_id, "parse", "parsing", session_factory)
+            await task.start()
+            await task.complete()
+            result = await db.execute(select(ProcessingTask).where(ProcessingTask.document_id == doc_id))
+            return result.scalar_one()
+
+    record = asyncio.run(run())
+    assert (record.status, record.progress) == ("completed", 100)
+
+
+def test_poller_reports_tasks_of_other_workers(database):
+    async def run():
+        async with database() as session_factory:
+            async with session_factory() as db:
+                kb_id, doc_id = await create_document(db)
+                # 其他 worker 写入的任务记录，本进程的 broker 不知道
+                task_id = str(uuid.uuid4())
+                db.add(ProcessingTask(id=task_id, document_id=doc_id, task_type="parse", status="running", progress=40))
+                await db.commit()
+
+            poller = TaskEventPoller(kb_id, session_factory)
+            initial = await poller.poll()
+            unchanged = await poller.poll()
+
+            local = TaskProgress(kb_id, doc_id, "vectorize", "vectorizing", session_factory)
+            await local.start()
+            local_events = await poller.poll()
+            return task_id, initial, unchanged, local_events
+
+    task_id, initial, unchanged, local_events = asyncio.run(run())
+    assert [(e["task_id"], e["progress"], e["document_status"]) for e in initial] == [(task_id, 40, "parsing")]
+    assert unchanged == []
+    # 本进程的任务已经由 broker 直接推送，轮询时跳过
+    assert local_events == []
+
+
+def test_broker_shares_one_poller_per_knowledge_base(database, monkeypatch):
+    monkeypatch.setattr(settings, "progress_write_interval_ms", 10)
+
+    async def run():
+        async with database() as session_factory:
+            async with session_factory() as db:
+                kb_id, doc_id = await create_document(db)
+            broker = ProgressBroker(session_factory)
+            first, second = broker.subscribe(kb_id), broker.subscribe(kb_id)
+            poller = broker._pollers[kb_id]
+
+            # 其他 worker 写入的进度推送给同一知识库的所有连接
+            async with session_factory() as db:
+                db.add(ProcessingTask(id=str(uuid.uuid4()), document_id=doc_id, task_type="parse",
+                                      status="running", progress=30, updated_at=datetime.now(timezone.utc)))
+                await db.commit()
+            events = [await asyncio.wait_for(queue.get(), timeout=1) for queue in (first, second)]
+            snapshot = broker.snapshot(kb_id)
+
+            broker.unsubscribe(kb_id, first)
+            shared = not poller.done()
+            broker.unsubscribe(kb_id, second)
+            await asyncio.sleep(0)
+            return events, snapshot, shared, poller.cancelled(), broker._pollers
+
+    events, snapshot, shared, cancelled, pollers = asyncio.run(run())
+    assert [e["progress"] for e in events] == [30, 30]
+    assert [e["progress"] for e in snapshot] == [30]
+    assert shared and cancelled
+    assert pollers == {}
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from app.knowledge.services.quantization import (
+    ProductQuantizer, ScalarQuantizer, create_quantizer, evaluate_quantization, load_quantizer, save_quantizer,
+)
+
+
+def unit_vectors(count, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("kind, m", [("int8", None), ("pq", 4)])
+def test_scores_approximate_inner_product(kind, m):
+    vectors = unit_vectors(512)
+    quantizer = create_quantizer(kind, m=m, nbits=8)
+    quantizer.train(vectors)
+    codes = quantizer.encode(vectors)
+    query = vectors[0]
+    approx = quantizer.score(query, codes)
+    assert approx.shape == (512,)
+    assert np.corrcoef(approx, vectors @ query)[0, 1] > 0.8
+
+
+@pytest.mark.parametrize("kind, m", [("int8", None), ("pq", 4)])
+def test_save_and_load_round_trip(tmp_path, kind, m):
+    vectors = unit_vectors(300)
+    quantizer = create_quantizer(kind, m=m, nbits=8)
+    quantizer.train(vectors)
+    save_quantizer(quantizer, tmp_path / "quantizer.npz")
+    loaded = load_quantizer(tmp_path / "quantizer.npz")
+    assert type(loaded) is type(quantizer)
+    assert np.array_equal(loaded.encode(vectors), quantizer.encode(vectors))
+
+
+def test_codes_are_compact():
+    vectors = unit_vectors(300)
+    scalar, product = ScalarQuantizer(), ProductQuantizer(m=4, nbits=8)
+    scalar.train(vectors)
+    product.train(vectors)
+    assert scalar.encode(vectors).nbytes == vectors.nbytes // 4
+    assert product.encode(vectors).nbytes == 300 * 4
+
+
+def test_evaluation_holds_out_query_vectors():
+    vectors = unit_vectors(400)
+    results = evaluate_quantization(vectors, [(None, None, None), ("int8", None, 8)], query_count=50, k=5)
+    assert [row["queries"] for row in results] == [50, 50]
+    # 全精度基准只统计留在索引中的向量
+    assert results[0]["memory_bytes"] == 350 * 16 * 4
+    assert 0.5 < results[1]["recall"] <= results[1]["recall_rescored"] <= 1.0
+
+    with pytest.raises(ValueError):
+        evaluate_quantization(vectors[:1], [("int8", None, 8)])
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+
+from app.services.rerank_service import FakeScorer, RerankService
+
+
+def make_candidates():
+    return [
+        {"chunk_id": "c1", "content": "如何申请退款"},
+        {"chunk_id": "c2", "content": "refund policy for annual plans"},
+        {"chunk_id": "c3", "content": "billing address update"},
+    ]
+
+
+class CountingScorer(FakeScorer):
+    def __init__(self):
+        self.calls = 0
+
+    def score(self, pairs):
+        self.calls += 1
+        return super().score(pairs)
+
+
+class BlockingScorer:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def score(self, pairs):
+        self.release.wait(5)
+        return [1.0] * len(pairs)
+
+
+def test_fake_scorer_is_deterministic():
+    pairs = [("refund policy", c["content"]) for c in make_candidates()]
+    assert FakeScorer().score(pairs) == FakeScorer().score(pairs)
+
+
+def test_rerank_orders_by_score():
+    service = RerankService(scorer=FakeScorer(), timeout_ms=1000, cache_size=100)
+    ranked = asyncio.run(service.rerank("refund policy", make_candidates(), top_n=2))
+    assert [c["chunk_id"] for c in ranked][0] == "c2"
+    assert len(ranked) == 2
+    assert "rerank_score" in ranked[0]
+
+
+def test_rerank_cache_hits_skip_scorer():
+    scorer = CountingScorer()
+    service = RerankService(scorer=scorer, timeout_ms=1000, cache_size=100)
+    first = asyncio.run(service.rerank("refund policy", make_candidates(), top_n=3))
+    second = asyncio.run(service.rerank("refund policy", make_candidates(), top_n=3))
+    assert scorer.calls == 1
+    assert first == second
+    assert service.stats["cache_hits"] == 3
+    assert service.stats["cache_misses"] == 3
+
+
+def test_rerank_cache_is_bounded():
+    service = RerankService(scorer=FakeScorer(), timeout_ms=1000, cache_size=2)
+    asyncio.run(service.rerank("refund policy", make_candidates(), top_n=3))
+    assert len(service._cache) == 2
+
+
+def test_rerank_timeout_falls_back_to_retrieval_order():
+    scorer = BlockingScorer()
+    service = RerankService(scorer=scorer, timeout_ms=20, cache_size=100)
+    candidates = make_candidates()
+    try:
+        ranked = asyncio.run(service.rerank("refund policy", candidates, top_n=2))
+    finally:
+        scorer.release.set()
+    assert ranked == candidates[:2]
+    assert service.stats["timeouts"] == 1
+
+
+def test_rerank_sheds_while_timed_out_job_holds_executor():
+    scorer = BlockingScorer()
+    service = RerankService(scorer=scorer, timeout_ms=20, cache_size=100, max_workers=1)
+    candidates = make_candidates()
+
+    async def run():
+        await service.rerank("refund policy", candidates, top_n=2)
+        return await service.rerank("billing", candidates, top_n=2)
+
+    try:
+        ranked = asyncio.run(run())
+    finally:
+        scorer.release.set()
+    assert ranked == candidates[:2]
+    assert service.stats["shed"] == 1
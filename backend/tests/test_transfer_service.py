@@ -0,0 +1,140 @@
+import asyncio
+import io
+import json
+import tarfile
+import uuid
+
+import numpy as np
+import pytest
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.knowledge.models.database_models import Document, DocumentChunk, KnowledgeBase, User
+from app.knowledge.services.knowledge_base_service import KnowledgeBaseService
+from app.knowledge.services.transfer_service import KnowledgeBaseTransferService
+from app.knowledge.services.vector_store import get_vector_store
+
+
+async def create_knowledge_base(db, upload_dir):
+    kb_id, doc_id = str(uuid.uuid4()), str(uuid.uuid4())
+    db.add(User(id="admin-001", username="admin", email="admin@example.com", password_hash="x"))
+    db.add(KnowledgeBase(id=kb_id, name="产品知识库", owner_id="admin-001"))
+    file_path = upload_dir / "source.txt"
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    file_path.write_text("退款政策")
+    db.add(Document(id=doc_id, title="退款", knowledge_base_id=kb_id, file_path=str(file_path),
+                    file_size=12, doc_type=".txt", status="completed"))
+    chunk_ids = [str(uuid.uuid4()) for _ in range(3)]
+    for i, chunk_id in enumerate(chunk_ids):
+        db.add(DocumentChunk(id=chunk_id, document_id=doc_id, content=f"片段 {i}", chunk_index=i,
+                             chunk_type="text", vector_id=chunk_id))
+    await db.commit()
+    vectors = np.eye(3, 4, dtype=np.float32)
+    store = get_vector_store(kb_id)
+    store.append(chunk_ids, vectors)
+    return kb_id, chunk_ids
+
+
+async def count_chunks(db, kb_id):
+    return (await db.execute(
+        select(func.count(DocumentChunk.id)).join(Document).where(Document.knowledge_base_id == kb_id)
+    )).scalar()
+
+
+def rewrite_archive(source, target, documents):
+    """复制归档并替换 documents.json"""
+    with tarfile.open(source) as src, tarfile.open(target, "w") as dst:
+        for member in src.getmembers():
+            data = src.extractfile(member).read()
+            if member.name == "documents.json":
+                data = json.dumps(documents).encode("utf-8")
+            info = tarfile.TarInfo(member.name)
+            info.size = len(data)
+            dst.addfile(info, io.BytesIO(data))
+
+
+def test_export_import_round_trip(upload_dir, database, tmp_path):
+    async def run():
+        async with database() as session_factory, session_factory() as db:
+            kb_id, _ = await create_knowledge_base(db, upload_dir)
+            service = KnowledgeBaseTransferService(db)
+            manifest = await service.export_knowledge_base(kb_id, str(tmp_path / "kb.tar"))
+            assert manifest["chunk_count"] == 3
+
+            imported = await service.import_knowledge_base(str(tmp_path / "kb.tar"), name="副本")
+            assert imported.id != kb_id
+            assert imported.document_count == 1
+            assert await count_chunks(db, imported.id) == 3
+            assert len(get_vector_store(imported.id)) == 3
+
+    asyncio.run(run())
+
+
+def test_keep_ids_reimport_after_hard_delete_starts_from_clean_store(upload_dir, database, tmp_path):
+    async def run():
+        async with database() as session_factory, session_factory() as db:
+            kb_id, chunk_ids = await create_knowledge_base(db, upload_dir)
+            service = KnowledgeBaseTransferService(db)
+            await service.export_knowledge_base(kb_id, str(tmp_path / "kb.tar"))
+            with pytest.raises(ValueError):
+                await service.import_knowledge_base(str(tmp_path / "kb.tar"), keep_ids=True)
+
+            assert await KnowledgeBaseService(db).delete_knowledge_base(kb_id, hard_delete=True)
+            imported = await service.import_knowledge_base(str(tmp_path / "kb.tar"), keep_ids=True)
+            assert imported.id == kb_id
+            assert get_vector_store(kb_id).chunk_ids == chunk_ids
+
+    asyncio.run(run())
+
+
+def test_keep_ids_rejects_path_traversal_ids(upload_dir, database, tmp_path):
+    async def run():
+        async with database() as session_factory, session_factory() as db:
+            kb_id, _ = await create_knowledge_base(db, upload_dir)
+            service = KnowledgeBaseTransferService(db)
+            await service.export_knowledge_base(kb_id, str(tmp_path / "kb.tar"))
+            await KnowledgeBaseService(db).delete_knowledge_base(kb_id, hard_delete=True)
+
+            with tarfile.open(tmp_path / "kb.tar") as tar:
+                documents = json.loads(tar.extractfile("documents.json").read())
+            documents[0]["id"] = "../../../../escaped"
+            rewrite_archive(tmp_path / "kb.tar", tmp_path / "evil.tar", documents)
+
+            with pytest.raises(ValueError):
+                await service.import_knowledge_base(str(tmp_path / "evil.tar"), keep_ids=True)
+            assert not list(tmp_path.rglob("escaped*"))
+            assert (await db.execute(select(KnowledgeBase.id).where(KnowledgeBase.id == kb_id))).first() is None
+
+    asyncio.run(run())
+
+
+class FakeEncoder:
+    def __init__(self):
+        self.texts = []
+
+    def encode(self, texts):
+        self.texts.extend(texts)
+        return np.tile(np.array([0, 0, 0, 1], dtype=np.float32), (len(texts), 1))
+
+
+def test_import_rejects_embeddings_of_other_model_unless_reembedded(upload_dir, database, tmp_path, monkeypatch):
+    async def run():
+        async with database() as session_factory, session_factory() as db:
+            kb_id, _ = await create_knowledge_base(db, upload_dir)
+            await KnowledgeBaseTransferService(db).export_knowledge_base(kb_id, str(tmp_path / "kb.tar"))
+            monkeypatch.setattr(settings, "embedding_model", "other-model")
+
+            encoder = FakeEncoder()
+            service = KnowledgeBaseTransferService(db, embedding_service=encoder)
+            with pytest.raises(ValueError):
+                await service.import_knowledge_base(str(tmp_path / "kb.tar"), name="副本")
+            assert (await db.execute(select(func.count(KnowledgeBase.id)))).scalar() == 1
+
+            imported = await service.import_knowledge_base(str(tmp_path / "kb.tar"), name="副本", reembed=True)
+            store = get_vector_store(imported.id)
+            return encoder.texts, len(store), np.asarray(store.embeddings)
+
+    texts, count, embeddings = asyncio.run(run())
+    assert texts == ["片段 0", "片段 1", "片段 2"]
+    assert count == 3
+    assert np.allclose(embeddings[:, 3], 1.0)
@@ -0,0 +1,166 @@
+import uuid
+
+import numpy as np
+
+from app.knowledge.services.vector_store import VectorStore, get_loaded_vector_store, get_vector_store
+
+
+def unit_vectors(count, dim=8, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def new_ids(count):
+    return [str(uuid.uuid4()) for _ in range(count)]
+
+
+def test_append_rereads_vectors_written_by_other_process(upload_dir):
+    kb_id = str(uuid.uuid4())
+    # 两个实例模拟两个 worker 各自持有的内存副本
+    first, second = VectorStore(kb_id), VectorStore(kb_id)
+    first_ids, second_ids = new_ids(3), new_ids(2)
+    assert first.append(first_ids, unit_vectors(3, seed=1)) == 0
+    assert second.is_stale()
+    assert second.append(second_ids, unit_vectors(2, seed=2)) == 3
+
+    reloaded = VectorStore(kb_id)
+    assert reloaded.chunk_ids == first_ids + second_ids
+    assert reloaded.embeddings.shape == (5, 8)
+
+
+def test_loaded_store_picks_up_appends_of_other_process(upload_dir):
+    kb_id = str(uuid.uuid4())
+    store = get_vector_store(kb_id)
+    vectors = unit_vectors(6)
+    chunk_ids = new_ids(6)
+    VectorStore(kb_id).append(chunk_ids[:4], vectors[:4])
+
+    # 检索前加载新增内容，仍是同一个实例
+    assert store.search(vectors[1], top_k=1)[0][0] == chunk_ids[1]
+    other = VectorStore(kb_id)
+    other.append(chunk_ids[4:], vectors[4:])
+    other.remove(chunk_ids[:1])
+    assert get_loaded_vector_store(kb_id) is store
+    assert get_vector_store(kb_id) is store
+    assert store.chunk_ids == chunk_ids
+    assert chunk_ids[0] not in {chunk_id for chunk_id, _ in store.search(vectors[0], top_k=6)}
+
+
+def test_append_writes_segments_and_compacts_geometrically(upload_dir):
+    kb_id = str(uuid.uuid4())
+    vectors = unit_vectors(40)
+    chunk_ids = new_ids(40)
+    store = VectorStore(kb_id)
+    # 第一批合并为基础文件，之后的追加写入段文件，直到追加行数超过基础文件
+    store.append(chunk_ids[:10], vectors[:10])
+    base = (store.vector_dir / "embeddings.npy").stat().st_ino
+    for start in range(10, 20, 5):
+        store.append(chunk_ids[start:start + 5], vectors[start:start + 5])
+    assert (store.vector_dir / "embeddings.npy").stat().st_ino == base
+    assert len(list(store.segment_dir.glob("*.json"))) == 2
+
+    store.append(chunk_ids[20:], vectors[20:])
+    assert not list(store.segment_dir.glob("*.json"))
+    reloaded = VectorStore(kb_id)
+    assert reloaded.chunk_ids == chunk_ids
+    assert np.allclose(reloaded.embeddings, vectors)
+
+
+def test_search_uses_consistent_snapshot_during_append(upload_dir):
+    kb_id = str(uuid.uuid4())
+    vectors = unit_vectors(30)
+    chunk_ids = new_ids(30)
+    store = VectorStore(kb_id)
+    store.append(chunk_ids[:10], vectors[:10])
+    store.remove(chunk_ids[:1])
+    snapshot = store._snapshot
+    store.append(chunk_ids[10:], vectors[10:])
+
+    # 旧快照的掩码与向量长度一致，不会越界
+    assert len(snapshot.live) == len(snapshot.vectors) == snapshot.count == 10
+    store._snapshot = snapshot
+    hits = store.search(vectors[5], top_k=30)
+    assert len(hits) == 9
+
+
+def test_removed_chunks_are_masked_in_search(upload_dir):
+    kb_id = str(uuid.uuid4())
+    vectors = unit_vectors(6)
+    chunk_ids = new_ids(6)
+    store = VectorStore(kb_id)
+    store.append(chunk_ids, vectors)
+    store.remove(chunk_ids[:2])
+
+    hits = store.search(vectors[0], top_k=6)
+    assert {chunk_id for chunk_id, _ in hits} == set(chunk_ids[2:])
+    assert store.search(vectors[0], top_k=3, candidates=np.array([0, 1])) == []
+
+    # 重新处理：追加新块的同时屏蔽旧块，其他进程重新加载后同样不可见
+    replacement = new_ids(1)
+    store.append(replacement, vectors[2:3], replaced=chunk_ids[2:3])
+    reloaded = VectorStore(kb_id)
+    assert reloaded.search(vectors[2], top_k=1)[0][0] == replacement[0]
+    assert chunk_ids[2] not in {chunk_id for chunk_id, _ in reloaded.search(vectors[2], top_k=10)}
+
+
+def test_quantized_search_skips_removed_chunks(upload_dir):
+    kb_id = str(uuid.uuid4())
+    vectors = unit_vectors(64, seed=3)
+    chunk_ids = new_ids(64)
+    store = VectorStore(kb_id)
+    store.append(chunk_ids, vectors)
+    store.configure_quantization("int8")
+    store.remove(chunk_ids[:1])
+
+    hits = store.search(vectors[0], top_k=5)
+    assert chunk_ids[0] not in {chunk_id for chunk_id, _ in hits}
+    assert len(hits) == 5
+
+
+def test_quantized_append_keeps_embeddings_on_disk(upload_dir):
+    kb_id = str(uuid.uuid4())
+    vectors = unit_vectors(80, seed=4)
+    chunk_ids = new_ids(80)
+    store = VectorStore(kb_id)
+    store.append(chunk_ids[:64], vectors[:64])
+    store.configure_quantization("int8")
+
+    store.append(chunk_ids[64:72], vectors[64:72])
+    store.append(chunk_ids[72:], vectors[72:])
+    # 追加段以 mmap 打开，不在内存中拼接全精度矩阵
+    assert all(isinstance(part, np.memmap) for part in store.embeddings.parts)
+    assert len(store.embeddings.parts) == 3
+
+    reloaded = VectorStore(kb_id)
+    assert np.allclose(np.asarray(reloaded.embeddings), vectors)
+    assert len(reloaded.codes) == 80
+    assert reloaded.search(vectors[75], top_k=1)[0][0] == chunk_ids[75]
+    assert not list((upload_dir).rglob("*.tmp"))
+
+
+def test_stale_worker_append_keeps_codes_consistent(upload_dir):
+    kb_id = str(uuid.uuid4())
+    vectors = unit_vectors(72, seed=5)
+    chunk_ids = new_ids(72)
+    VectorStore(kb_id).append(chunk_ids[:64], vectors[:64])
+    # 该 worker 在设置量化之前加载，没有量化器
+    stale = VectorStore(kb_id)
+    VectorStore(kb_id).configure_quantization("int8")
+
+    stale.append(chunk_ids[64:], vectors[64:])
+    reloaded = VectorStore(kb_id)
+    assert reloaded.quantizer is not None
+    assert len(reloaded.codes) == len(reloaded.chunk_ids) == 72
+    assert reloaded.search(vectors[70], top_k=1, candidates=np.array([69, 70, 71]))[0][0] == chunk_ids[70]
+
+
+def test_codes_are_reencoded_when_out_of_sync(upload_dir):
+    kb_id = str(uuid.uuid4())
+    vectors = unit_vectors(64, seed=6)
+    store = VectorStore(kb_id)
+    store.append(new_ids(64), vectors)
+    store.configure_quantization("int8")
+    np.save(store.vector_dir / "codes.npy", store.codes[:10])
+
+    reloaded = VectorStore(kb_id)
+    assert np.array_equal(reloaded.codes, store.codes)
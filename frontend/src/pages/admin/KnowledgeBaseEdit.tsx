@@ -5,7 +5,7 @@ import {
 } from 'antd';
 import { ArrowLeftOutlined, SaveOutlined, PlusOutlined, DeleteOutlined, PlayCircleOutlined, LoadingOutlined } from '@ant-design/icons';
 import { KnowledgeBaseService, KnowledgeBase } from '../../services/knowledgeBaseService';
-import { DocumentService, Document } from '../../services/documentService';
+import { DocumentService, Document, ProcessingProgress } from '../../services/documentService';
 import DocumentUpload from '../../components/DocumentUpload';
 
 
@@ -19,6 +19,7 @@ const KnowledgeBaseEdit: React.FC = () => {
   const [loading, setLoading] = useState(false);
   const [knowledgeBase, setKnowledgeBase] = useState<KnowledgeBase | null>(null);
   const [documents, setDocuments] = useState<Document[]>([]);
+  const [progress, setProgress] = useState<Record<string, ProcessingProgress>>({});
   const [uploadModalVisible, setUploadModalVisible] = useState(false);
 
   const isNewMode = id === 'new';
@@ -63,6 +64,18 @@ const KnowledgeBaseEdit: React.FC = () => {
     }
   }, [id, isNewMode, form, loadKnowledgeBase]);
 
+  // 通过推送更新文档处理状态，无需轮询文档列表
+  useEffect(() => {
+    if (isNewMode || !id) return;
+    return DocumentService.subscribeProgress(id, (event) => {
+      setProgress(prev => ({ ...prev, [event.document_id]: event }));
+      setDocuments(prev => prev.map(doc => doc.id === event.document_id
+        ? { ...doc, status: event.document_status, error_message: event.error_message || doc.error_message }
+        : doc
+      ));
+    });
+  }, [id, isNewMode]);
+
   const handleSave = async (values: any) => {
     try {
       if (isNewMode) {
@@ -96,7 +109,6 @@ const KnowledgeBaseEdit: React.FC = () => {
     try {
       await DocumentService.processDocument(docId);
       message.success('文档处理已启动');
-      if (id) loadDocuments(id);
     } catch (error) {
       message.error('文档处理启动失败');
     }
@@ -139,7 +151,7 @@ const KnowledgeBaseEdit: React.FC = () => {
       dataIndex: 'status',
       key: 'status',
       width: 120,
-      render: (status: string) => {
+      render: (status: string, record: Document) => {
         const statusConfig = {
           uploaded: { color: 'blue', text: '已上传', icon: null },
           parsing: { color: 'processing', text: '解析中', icon: <LoadingOutlined /> },
@@ -149,9 +161,11 @@ const KnowledgeBaseEdit: React.FC = () => {
           failed: { color: 'error', text: '处理失败', icon: null }
         };
         const config = statusConfig[status as keyof typeof statusConfig] || { color: 'default', text: status, icon: null };
+        const taskProgress = progress[record.id];
+        const showProgress = config.color === 'processing' && taskProgress && taskProgress.status === 'running';
         return (
           <Tag color={config.color} icon={config.icon}>
-            {config.text}
+            {config.text}{showProgress ? ` ${taskProgress.progress}%` : ''}
           </Tag>
         );
       },
@@ -170,7 +184,7 @@ const KnowledgeBaseEdit: React.FC = () => {
       fixed: 'right' as const,
       render: (_: any, record: Document) => (
         <Space size="small">
-          {record.status === 'uploaded' && (
+          {(record.status === 'uploaded' || record.status === 'failed') && (
             <Tooltip title="开始处理文档">
               <Button 
                 type="text" 
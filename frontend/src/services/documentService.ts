@@ -18,6 +18,18 @@ export interface Document {
   processed_at?: string;
 }
 
+export interface ProcessingProgress {
+  document_id: string;
+  task_id: string;
+  task_type: 'parse' | 'vectorize' | 'index';
+  status: 'running' | 'completed' | 'failed';
+  progress: number;
+  document_status: Document['status'];
+  elapsed_ms: number;
+  timestamp: string;
+  error_message?: string;
+}
+
 export class DocumentService {
   static async getDocuments(kbId: string): Promise<Document[]> {
     const response = await axios.get(`${API_BASE}/bases/${kbId}/documents`);
@@ -36,4 +48,11 @@ export class DocumentService {
   static async processDocument(docId: string): Promise<void> {
     await axios.post(`${API_BASE}/documents/${docId}/process`);
   }
+
+  // 订阅知识库文档处理进度（SSE），返回取消订阅函数
+  static subscribeProgress(kbId: string, onProgress: (event: ProcessingProgress) => void): () => void {
+    const source = new EventSource(`${API_BASE}/bases/${kbId}/progress`);
+    source.onmessage = (e) => onProgress(JSON.parse(e.data));
+    return () => source.close();
+  }
 }
\ No newline at end of file